@@ -0,0 +1,150 @@
+import threading
+import tkinter as tk
+from tkinter import ttk, Button, Label
+from typing import Any, Callable, Optional
+
+
+POLL_INTERVAL_MS = 50
+
+
+
+class JobCancelled(Exception):
+    """
+    Raised in the worker of a background job once the job is cancelled.
+    """
+
+
+
+class ProgressWindow:
+    """
+    A small window with the progress of a long operation and a button that cancels it.
+    It isn't modal, so the user can keep drawing meanwhile.
+    """
+    def __init__(self, widget: tk.Misc, title: str, on_cancel: Callable[[], None]) -> None:
+        """
+        A constructor of the progress window.
+        """
+        self.window = tk.Toplevel(widget)
+        self.window.title(title)
+        self.window.protocol("WM_DELETE_WINDOW", on_cancel)
+
+        self.label = Label(self.window, text=f"{title}...")
+        self.label.pack(padx=10, pady=(10, 0))
+        self.progress_bar = ttk.Progressbar(self.window, orient='horizontal', length=300, mode='determinate', maximum=1.0)
+        self.progress_bar.pack(padx=10, pady=10)
+        self.cancel_button = Button(self.window, text="Cancel", command=on_cancel)
+        self.cancel_button.pack(pady=(0, 10))
+
+
+
+    def show(self, fraction: float) -> None:
+        self.progress_bar['value'] = fraction
+
+
+    def cancelling(self) -> None:
+        self.label.config(text="Cancelling...")
+        self.cancel_button.config(state='disabled')
+
+
+    def close(self) -> None:
+        self.window.destroy()
+
+
+
+class BackgroundJob:
+    """
+    Runs work on a worker thread while the Tk main loop goes on, with a progress window that can cancel it.
+    Tk is only touched from the main thread: the worker leaves its progress in plain attributes,
+    and the main thread polls them with after.
+    work gets a progress(fraction) function to call now and then, which raises JobCancelled once the job is cancelled.
+    Then on_done(result), on_error(error) or on_cancel() is called on the main thread.
+    """
+    def __init__(self, widget: tk.Misc, title: str, work: Callable[[Callable[[float], None]], Any],
+                 on_done: Optional[Callable[[Any], None]] =None, on_error: Optional[Callable[[Exception], None]] =None,
+                 on_cancel: Optional[Callable[[], None]] =None) -> None:
+        """
+        A constructor of the background job.
+        """
+        self.widget = widget
+        self.title = title
+        self.work = work
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancel = on_cancel
+
+        self.fraction = 0.0
+        self.cancelled = False
+        self.finished = False
+        self.completed = False
+        self.result: Any = None
+        self.error: Optional[Exception] = None
+        self.thread: Optional[threading.Thread] = None
+        self.window: Optional[ProgressWindow] = None
+
+
+
+    def start(self) -> None:
+        """
+        Opens the progress window and starts the worker.
+        """
+        self.window = ProgressWindow(self.widget, self.title, self.cancel)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        self.widget.after(POLL_INTERVAL_MS, self.poll)
+
+
+
+    def run(self) -> None:
+        """
+        The worker thread.
+        """
+        try:
+            self.result = self.work(self.progress)
+            self.completed = True
+        except JobCancelled:
+            pass
+        except Exception as error:
+            self.error = error
+        finally:
+            self.finished = True
+
+
+
+    def progress(self, fraction: float) -> None:
+        """
+        Called by the work from the worker thread.
+        """
+        if self.cancelled:
+            raise JobCancelled()
+        self.fraction = fraction
+
+
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        if self.window is not None:
+            self.window.cancelling()
+
+
+
+    def poll(self) -> None:
+        """
+        Shows the progress of the worker, and once it's finished, closes the window and calls back.
+        Work that finished before it saw the cancel counts as done.
+        """
+        if not self.finished:
+            self.window.show(self.fraction)
+            self.widget.after(POLL_INTERVAL_MS, self.poll)
+            return
+
+        self.window.close()
+        self.window = None
+
+        if self.error is not None:
+            if self.on_error:
+                self.on_error(self.error)
+        elif not self.completed:
+            if self.on_cancel:
+                self.on_cancel()
+        elif self.on_done:
+            self.on_done(self.result)
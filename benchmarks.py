@@ -0,0 +1,1086 @@
+import tkinter as tk
+import tkinter.font
+import argparse
+import contextlib
+import math
+import random
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from canvas import DrawingCanvas
+from shapes import Shapes
+from brush import Brush
+from geometry import simplify_points, cut_polyline, dot_positions
+import numpy as np
+from spatial_index import SpatialIndex
+from scene import Scene, SceneItem
+from file_manager import FileManager
+from drawing_file import write_drawing, read_drawing, EXTENSION
+from scene_raster import flood_fill_mask, ItemPainter
+from history import record_bytes
+from journal import Journal
+from background_job import BackgroundJob
+from drawing_loader import DrawingLoader
+from image_cache import image_cache, ImageCache
+from image_transform import transformed
+from tiled_export import TiledExport
+from converter import convert, color_rgb, record_bbox
+from font_resolver import FontResolver, font_resolver, parse_tk_font
+from font_picker import FamilySearch, FontPicker
+from export_pipeline import ExportPipeline, PaletteCache, EXPORT_EXTENSIONS, export_formats
+from PIL import Image, ImageDraw, ImageFont
+
+
+
+def timed(action: Callable[[], None], repeat: int =5) -> float:
+    """
+    Returns the best run time of the action in milliseconds.
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        action()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+
+def scribble(stroke_index: int, points: int) -> List[Tuple[int, int]]:
+    """
+    Creates the mouse positions of a synthetic freehand stroke.
+    """
+    center_x, center_y = 100 + (stroke_index * 37) % 600, 100 + (stroke_index * 53) % 400
+    return [(int(center_x + 80 * math.cos(step / 15) + step % 7), int(center_y + 60 * math.sin(step / 11)))
+            for step in range(points)]
+
+
+
+def make_drawing_canvas(root: tk.Tk) -> DrawingCanvas:
+    """
+    Creates a drawing canvas with a brush, like the main window does.
+    """
+    drawing_canvas = DrawingCanvas(root, width=800, height=600)
+    drawing_canvas.set_brush(Brush())
+    root.update()
+    return drawing_canvas
+
+
+
+def draw_stroke(drawing_canvas: DrawingCanvas, positions: List[Tuple[int, int]]) -> None:
+    """
+    Feeds the positions of a stroke to the canvas as mouse events.
+    """
+    drawing_canvas.start_drawing(SimpleNamespace(x=positions[0][0], y=positions[0][1]))
+    for x, y in positions[1:]:
+        drawing_canvas.draw(SimpleNamespace(x=x, y=y))
+    drawing_canvas.stop_drawing(SimpleNamespace(x=positions[-1][0], y=positions[-1][1]))
+
+
+
+def draw_stroke_per_segment(drawing_canvas: DrawingCanvas, positions: List[Tuple[int, int]]) -> None:
+    """
+    The previous drawing behaviour: one line item for every motion event.
+    """
+    canvas = drawing_canvas.canvas
+    for (start_x, start_y), (x, y) in zip(positions, positions[1:]):
+        canvas.create_line(start_x, start_y, x, y, fill='black', width=2.0, tags=("movable", "erasable", "line"))
+
+
+
+def drag_frames(drawing_canvas: DrawingCanvas, item: int, frames: int) -> None:
+    """
+    Drags a group back and forth like ObjectManipulator does: one canvas call on the group per frame,
+    and its scene records moved once when the drag ends.
+    """
+    members = drawing_canvas.scene.group_members(item)
+    for frame in range(frames):
+        step = 1 if frame % 2 == 0 else -1
+        drawing_canvas.move_group(item, step, step, records=False)
+        drawing_canvas.canvas.update_idletasks()
+
+    drawing_canvas.move_indexed(members, frames % 2, frames % 2)
+
+
+
+def draw_dotted_figure(drawing_canvas: DrawingCanvas, shapes: Shapes, positions: List[Tuple[float, float]]) -> int:
+    """
+    Draws a dotted figure through the positions the way Shapes does: one line whose dashes are the dots.
+    """
+    options = shapes.dot_options()
+    tags = options.pop('tags')
+    return drawing_canvas.draw_record(SceneItem(0, 'line', [coord for point in positions for coord in point], options, tags))
+
+
+
+def segment_scene(count: int) -> Scene:
+    """
+    Creates a scene of short freehand segments in three colors, with the options the canvas gives lines.
+    """
+    scene = Scene()
+    random.seed(0)
+    for item in range(1, count + 1):
+        x, y = random.randint(0, 800), random.randint(0, 600)
+        coords = [x, y, x + random.uniform(-8, 8), y + random.uniform(-8, 8), x + 5, y + 5]
+        scene.put(SceneItem(item, 'line', coords, {'fill': random.choice(['black', 'red', 'blue']), 'width': '2.0',
+                                                   'capstyle': 'round', 'joinstyle': 'round', 'smooth': '0', 'splinesteps': '12'},
+                            ("movable", "erasable", "line")), (x - 8, y - 8, x + 8, y + 8))
+    return scene
+
+
+
+def canvas_costs(canvas: tk.Canvas) -> Dict[str, float]:
+    """
+    Measures the item count and the cost of the common canvas operations.
+    """
+    def redraw() -> None:
+        canvas.config(bg='white' if canvas['bg'] != 'white' else 'ivory')
+        canvas.update_idletasks()
+
+    return {'items': len(canvas.find_all()),
+            'redraw_ms': timed(redraw),
+            'find_all_ms': timed(canvas.find_all),
+            'find_overlapping_ms': timed(lambda: canvas.find_overlapping(390, 290, 410, 310))}
+
+
+
+def bench_strokes(args: argparse.Namespace) -> None:
+    """
+    Compares one item per motion event with one polyline item per stroke.
+    """
+    strokes, points = args.strokes, args.points
+    root = tk.Tk()
+    results = {}
+
+    for label, draw_method in [('per segment', draw_stroke_per_segment), ('per stroke', draw_stroke)]:
+        drawing_canvas = make_drawing_canvas(root)
+
+        start = time.perf_counter()
+        for stroke_index in range(strokes):
+            draw_method(drawing_canvas, scribble(stroke_index, points))
+        draw_ms = (time.perf_counter() - start) * 1000
+
+        results[label] = dict(canvas_costs(drawing_canvas.canvas), draw_ms=draw_ms)
+        drawing_canvas.canvas.destroy()
+
+    root.destroy()
+
+    print(f"{strokes} strokes x {points} points")
+    print(f"{'':<12}{'items':>10}{'draw ms':>12}{'redraw ms':>12}{'find_all ms':>14}{'overlap ms':>12}")
+    for label, result in results.items():
+        print(f"{label:<12}{result['items']:>10}{result['draw_ms']:>12.1f}{result['redraw_ms']:>12.2f}"
+              f"{result['find_all_ms']:>14.2f}{result['find_overlapping_ms']:>12.3f}")
+
+
+
+def bench_simplify(args: argparse.Namespace) -> None:
+    """
+    Reports the stroke points and saved size left by each simplification tolerance.
+    """
+    strokes = [[(x + step % 3 / 10, y) for step, (x, y) in enumerate(scribble(stroke_index, args.points))]
+               for stroke_index in range(args.strokes)]
+    total_points = sum(len(stroke) for stroke in strokes)
+    full_size = len(json.dumps(strokes))
+
+    print(f"{args.strokes} strokes x {args.points} points")
+    print(f"{'tolerance':>10}{'points':>10}{'kept %':>10}{'json KB':>10}{'ms':>10}")
+    for tolerance in [0.0, 0.25, 0.5, 1.0, 2.0, 4.0]:
+        start = time.perf_counter()
+        simplified = [simplify_points(stroke, tolerance) for stroke in strokes]
+        simplify_ms = (time.perf_counter() - start) * 1000
+
+        kept_points = sum(len(stroke) for stroke in simplified)
+        size = len(json.dumps(simplified))
+        print(f"{tolerance:>10}{kept_points:>10}{kept_points / total_points * 100:>10.1f}{size / 1024:>10.0f}{simplify_ms:>10.1f}")
+    print(f"unsimplified json: {full_size / 1024:.0f} KB")
+
+
+
+def bench_index(args: argparse.Namespace) -> None:
+    """
+    Measures the spatial index behind the eraser and picking on a canvas of many small items.
+    """
+    generator = random.Random(1)
+    bboxes = []
+    for _ in range(args.items):
+        x, y = generator.uniform(0, 3840), generator.uniform(0, 2160)
+        bboxes.append((x, y, x + generator.uniform(2, 40), y + generator.uniform(2, 40)))
+
+    spatial_index = SpatialIndex()
+    start = time.perf_counter()
+    for item, bbox in enumerate(bboxes):
+        spatial_index.insert(item, bbox)
+    insert_ms = (time.perf_counter() - start) * 1000
+
+    points = [(generator.uniform(0, 3840), generator.uniform(0, 2160)) for _ in range(1000)]
+    def point_queries() -> None:
+        for x, y in points:
+            spatial_index.query(x - 5, y - 5, x + 5, y + 5)
+    def region_queries() -> None:
+        for x, y in points[:100]:
+            spatial_index.query(x, y, x + 200, y + 200, topmost_first=False)
+    def moves() -> None:
+        for item in range(1000):
+            spatial_index.move(item, 3, 3)
+
+    print(f"{args.items} items on a 3840x2160 canvas")
+    print(f"build:                    {insert_ms:.0f} ms")
+    print(f"eraser/pick query (10px): {timed(point_queries) / len(points) * 1000:.1f} us")
+    print(f"region query (200px):     {timed(region_queries) / 100 * 1000:.1f} us")
+    print(f"move:                     {timed(moves) / 1000 * 1000:.1f} us")
+
+
+
+def bench_cut(args: argparse.Namespace) -> None:
+    """
+    Measures one pass of the partial eraser over a dense stroke, against a 60 fps frame budget.
+    """
+    print(f"{'points':>10}{'cut ms':>10}{'pieces':>10}{'frame %':>10}")
+    for points in [1000, 10000, args.points * 100]:
+        steps = np.linspace(0, 40 * np.pi, points)
+        stroke = np.column_stack([400 + 300 * np.cos(steps) + steps, 300 + 200 * np.sin(steps * 1.01)])
+
+        cut_ms = timed(lambda: cut_polyline(stroke, (400, 300), 20))
+        pieces = cut_polyline(stroke, (400, 300), 20)
+        print(f"{points:>10}{cut_ms:>10.2f}{len(pieces or []):>10}{cut_ms / (1000 / 60) * 100:>10.1f}")
+
+
+
+def bench_fill(args: argparse.Namespace) -> None:
+    """
+    Measures the bucket fill on a 4K raster of scribbled strokes: a small enclosed region and the whole background.
+    """
+    image = Image.new('RGBA', (3840, 2160), (255, 255, 255, 255))
+    draw = ImageDraw.Draw(image)
+    for stroke_index in range(args.strokes):
+        draw.line(scribble(stroke_index, args.points), fill=(0, 0, 0, 255), width=3)
+    draw.rectangle((1000, 1000, 1200, 1150), outline=(0, 0, 0, 255), fill=(250, 250, 250, 255), width=3)
+    pixels = np.asarray(image).view(np.uint32)[:, :, 0].copy()
+
+    print(f"{'region':>12}{'tolerance':>10}{'pixels':>12}{'fill ms':>10}")
+    for name, (x, y) in [('small', (1100, 1075)), ('background', (5, 5))]:
+        for tolerance in (0, 16):
+            mask = flood_fill_mask(pixels, x, y, tolerance)[0]
+            fill_ms = timed(lambda: flood_fill_mask(pixels, x, y, tolerance), repeat=3)
+            print(f"{name:>12}{tolerance:>10}{int(mask.sum()):>12}{fill_ms:>10.1f}")
+
+
+
+def bench_drag(args: argparse.Namespace) -> None:
+    """
+    Measures the frame time of dragging a stroke and a dotted figure (one dotted line) as they grow.
+    """
+    root = tk.Tk()
+    drawing_canvas = make_drawing_canvas(root)
+    shapes = Shapes(drawing_canvas)
+    frames = 20
+
+    def frame_ms(item: int) -> float:
+        return timed(lambda: drag_frames(drawing_canvas, item, frames), repeat=3) / frames
+
+    print(f"{'points':>10}{'stroke ms':>12}{'dots':>8}{'dots ms':>10}")
+    for points in [100, 1000, 10000, 100000]:
+        drawing_canvas.reset_canvas()
+        positions = scribble(0, points)
+        stroke = drawing_canvas.draw_record(SceneItem(0, 'line', [coord for point in positions for coord in point],
+                                                      {'fill': 'black', 'width': 2.0}, ("movable", "erasable", "line")))
+
+        figure = draw_dotted_figure(drawing_canvas, shapes, positions)
+        dots = dot_positions(np.array(positions, dtype=float), shapes.dot_spacing)
+
+        stroke_ms = frame_ms(stroke)
+        dots_ms = frame_ms(figure)
+        print(f"{points:>10}{stroke_ms:>12.2f}{len(dots):>8}{dots_ms:>10.2f}")
+
+    root.destroy()
+
+
+
+def bench_memory(args: argparse.Namespace) -> None:
+    """
+    Compares the memory per point of stroke coordinates on a synthetic session:
+    lists of (x, y) tuples (the previous storage), flat lists, and the float32 buffers of the scene records.
+    """
+    stroke_count = max(1, args.total_points // args.points)
+
+    def traced_bytes(build: Callable[[], Any]) -> int:
+        tracemalloc.start()
+        kept = build()
+        used = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        del kept
+        return used
+
+    storages = {
+        'tuple lists': lambda: {stroke: scribble(stroke, args.points) for stroke in range(stroke_count)},
+        'flat lists': lambda: {stroke: [float(coord) for point in scribble(stroke, args.points) for coord in point]
+                               for stroke in range(stroke_count)},
+        'scene records': lambda: {stroke: SceneItem(stroke, 'line', [coord for point in scribble(stroke, args.points) for coord in point],
+                                                    {}, ("movable", "erasable", "line")) for stroke in range(stroke_count)}}
+
+    total_points = stroke_count * args.points
+    print(f"{stroke_count} strokes x {args.points} points = {total_points} points")
+    print(f"{'storage':<16}{'MB':>10}{'bytes/point':>14}")
+    for name, build in storages.items():
+        used = traced_bytes(build)
+        print(f"{name:<16}{used / 2 ** 20:>10.1f}{used / total_points:>14.1f}")
+
+
+
+def bench_undo(args: argparse.Namespace) -> None:
+    """
+    Measures undoing and redoing an erase of 5000 segments and a drag of a dotted figure of 10000 dots on top of a drawing,
+    with the memory the history keeps for each, next to the memory of the whole drawing.
+    """
+    root = tk.Tk()
+    drawing_canvas = make_drawing_canvas(root)
+    history = drawing_canvas.history
+    shapes = Shapes(drawing_canvas)
+
+    for stroke_index in range(args.strokes):
+        draw_stroke(drawing_canvas, scribble(stroke_index, args.points))
+
+    segments = [drawing_canvas.draw_record(SceneItem(0, 'line', [x, y, x + 5, y + 5], {'fill': 'black', 'width': 2.0}, ("movable", "erasable", "line")))
+                for x in range(0, 800, 8) for y in range(0, 400, 8)]
+    rows = [(50, 420 + row * 10) if row % 2 == 0 else (750, 420 + row * 10) for row in range(143)]
+    figure = draw_dotted_figure(drawing_canvas, shapes, [point for x, y in rows for point in ((x, y), (800 - x, y))])
+    document_kb = sum(record_bytes(record) for record in drawing_canvas.scene.items.values()) / 1024
+
+    def erase() -> None:
+        history.begin_batch()
+        drawing_canvas.delete_items(segments)
+        history.end_batch()
+
+    def drag() -> None:
+        drawing_canvas.move_group(figure, 30, 30)
+
+    print(f"drawing: {len(drawing_canvas.scene)} items, {document_kb:.0f} KB")
+    print(f"{'change':<22}{'undo ms':>10}{'redo ms':>10}{'history KB':>12}")
+    for name, change in [(f"erase {len(segments)} segments", erase), ("drag 10000 dots", drag)]:
+        history.clear()
+        change()
+        drawing_canvas.canvas.update_idletasks()
+
+        start = time.perf_counter()
+        history.undo()
+        drawing_canvas.canvas.update_idletasks()
+        undo_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        history.redo()
+        drawing_canvas.canvas.update_idletasks()
+        redo_ms = (time.perf_counter() - start) * 1000
+        print(f"{name:<22}{undo_ms:>10.1f}{redo_ms:>10.1f}{history.memory / 1024:>12.0f}")
+
+    root.destroy()
+
+
+
+def bench_export(args: argparse.Namespace) -> None:
+    """
+    Measures exporting a drawing of 30000 items: rendered from scratch, and rendered again
+    after a one-stroke edit and after moving an item, when only the changed tiles are drawn.
+    """
+    root = tk.Tk()
+    drawing_canvas = make_drawing_canvas(root)
+    scene_raster = drawing_canvas.scene_raster
+    random.seed(0)
+
+    for _ in range(30000):
+        x, y = random.uniform(0, 790), random.uniform(0, 590)
+        drawing_canvas.draw_record(SceneItem(0, 'line', [x, y, x + random.uniform(-10, 10), y + random.uniform(-10, 10), x + 5, y + 5],
+                                             {'fill': random.choice(['black', 'red', 'blue']), 'width': 2.0}, ("movable", "erasable", "line")))
+
+    def full() -> None:
+        scene_raster.invalidate()
+        scene_raster.image()
+
+    def after_stroke() -> None:
+        draw_stroke(drawing_canvas, [(300 + step, 300 + step % 5) for step in range(40)])
+        scene_raster.image()
+
+    def after_move() -> None:
+        drawing_canvas.move_group(drawing_canvas.scene.ordered()[-1].id, 3, 3)
+        scene_raster.image()
+
+    def encode() -> None:
+        scene_raster.image().save(io.BytesIO(), format='JPEG')
+
+    scene_raster.image()
+    print(f"{len(drawing_canvas.scene)} items, {scene_raster.pixels.shape[1]}x{scene_raster.pixels.shape[0]} pixels")
+    print(f"{'export':<24}{'ms':>10}")
+    for name, action in [('full render', full), ('after one stroke', after_stroke), ('after moving an item', after_move),
+                         ('JPEG encode (unchanged)', encode)]:
+        print(f"{name:<24}{timed(action, repeat=3):>10.1f}")
+
+    root.destroy()
+
+
+
+def bench_save(args: argparse.Namespace) -> None:
+    """
+    Compares collecting and writing a save of 100000 segments: the previous format with the type, tags and full options
+    of every item (written indented), and the style table that items with identical ones share.
+    """
+    scene = segment_scene(100000)
+    file_manager = FileManager(SimpleNamespace(scene=scene))
+
+    def per_item() -> str:
+        items_data = [{'type': record.kind, 'coords': list(record.coords), 'tags': record.tags, 'config': dict(record.style)}
+                      for record in scene.ordered()]
+        return json.dumps({'drawings': items_data, 'images': []}, indent=4)
+
+    def style_table() -> str:
+        items_data, images_data, styles = file_manager.objects_data_collector()
+        return json.dumps({'styles': styles, 'drawings': items_data, 'images': images_data}, separators=(',', ':'))
+
+    print(f"{'format':<14}{'save ms':>10}{'MB':>10}")
+    for name, save in [('per item', per_item), ('style table', style_table)]:
+        print(f"{name:<14}{timed(save, repeat=3):>10.0f}{len(save()) / 2 ** 20:>10.1f}")
+
+
+
+def bench_binary(args: argparse.Namespace) -> None:
+    """
+    Compares saving and loading 100000 segments as JSON and in the binary drawing format
+    (float32 coords, or fixed-point coords with a step, compressed with zlib or lzma),
+    and checks that every binary file loads back what was saved.
+    """
+    scene = segment_scene(100000)
+    scene.put(SceneItem(100001, 'image', [10, 10], {'anchor': 'nw'}, ("movable", "erasable", "fill"), Image.new('RGBA', (50, 40), (255, 0, 0, 255))),
+              (10, 10, 60, 50))
+    items_data, images_data, styles = FileManager(SimpleNamespace(scene=scene)).objects_data_collector()
+    path = os.path.join(tempfile.mkdtemp(), 'benchmark')
+
+    def save_json() -> None:
+        with open(path + '.json', 'w') as file:
+            json.dump({'styles': styles, 'drawings': items_data, 'images': images_data}, file, separators=(',', ':'))
+
+    def load_json() -> Dict[str, Any]:
+        with open(path + '.json') as file:
+            return json.load(file)
+
+    print(f"{'format':<24}{'save ms':>10}{'load ms':>10}{'MB':>8}{'max error':>11}")
+    print(f"{'json':<24}{timed(save_json, repeat=3):>10.0f}{timed(load_json, repeat=3):>10.0f}{os.path.getsize(path + '.json') / 2 ** 20:>8.2f}{0:>11}")
+
+    for compression, step in [('none', None), ('zlib', None), ('lzma', None), ('zlib', 0.01), ('lzma', 0.01)]:
+        file_path = path + EXTENSION
+        save_ms = timed(lambda: write_drawing(file_path, items_data, images_data, styles, compression, step), repeat=3)
+        load_ms = timed(lambda: read_drawing(file_path), repeat=3)
+
+        loaded = read_drawing(file_path)
+        assert loaded['styles'] == json.loads(json.dumps(styles)) and loaded['images'] == images_data
+        assert [item['style'] for item in loaded['drawings']] == [item['style'] for item in items_data]
+        assert [item.get('fill_image') for item in loaded['drawings']] == [item.get('fill_image') for item in items_data]
+        error = max(max(abs(a - b) for a, b in zip(item['coords'], original['coords'])) for item, original in zip(loaded['drawings'], items_data))
+        assert error <= (step / 2 if step else 0.001) + 1e-9
+
+        name = f"binary {compression}" + (f" step {step}" if step else "")
+        print(f"{name:<24}{save_ms:>10.0f}{load_ms:>10.0f}{os.path.getsize(file_path) / 2 ** 20:>8.2f}{error:>11.4f}")
+
+
+
+def bench_journal(args: argparse.Namespace) -> None:
+    """
+    Measures what the autosave journal adds to drawing: the strokes are drawn without a journal, then with one
+    for each fsync policy, written after every stroke (more often than the once a second it's written in the program).
+    """
+    root = tk.Tk()
+    drawing_canvas = make_drawing_canvas(root)
+    strokes = [scribble(stroke_index, args.points) for stroke_index in range(args.strokes)]
+    journal_directory = tempfile.mkdtemp()
+
+    def draw_all(journal) -> float:
+        drawing_canvas.reset_canvas()
+        drawing_canvas.canvas.update_idletasks()
+        start = time.perf_counter()
+        for positions in strokes:
+            draw_stroke(drawing_canvas, positions)
+            if journal:
+                journal.flush()
+        drawing_canvas.canvas.update_idletasks()
+        return time.perf_counter() - start
+
+    draw_all(None)
+    base = draw_all(None)
+    events = len(strokes) * args.points
+    print(f"{args.strokes} strokes, {events} motion events")
+    print(f"{'journal':<12}{'total ms':>10}{'us/event':>10}{'overhead':>10}{'file KB':>10}")
+    print(f"{'none':<12}{base * 1000:>10.0f}{base / events * 1e6:>10.1f}{'':>10}{'':>10}")
+
+    for fsync in ('never', 'interval', 'always'):
+        journal = Journal(drawing_canvas, journal_directory, fsync)
+        journal.start()
+        total = draw_all(journal)
+        size_kb = os.path.getsize(journal.path) / 1024
+        journal.close()
+        print(f"{fsync:<12}{total * 1000:>10.0f}{total / events * 1e6:>10.1f}{(total - base) / base:>10.1%}{size_kb:>10.0f}")
+
+    root.destroy()
+
+
+
+def bench_background(args: argparse.Namespace) -> None:
+    """
+    Measures saving and exporting a drawing of 30000 items in the background: the snapshot taken on the main thread,
+    the whole job, and the longest frame of the main loop while the job runs (the freeze the user sees),
+    next to doing all of it on the main thread, which freezes the window for the whole time.
+    The export is rendered from scratch, and again after a small edit.
+    """
+    root = tk.Tk()
+    drawing_canvas = make_drawing_canvas(root)
+    scene_raster = drawing_canvas.scene_raster
+    file_manager = FileManager(drawing_canvas)
+    directory = tempfile.mkdtemp()
+    random.seed(0)
+
+    for _ in range(30000):
+        x, y = random.uniform(0, 790), random.uniform(0, 590)
+        drawing_canvas.draw_record(SceneItem(0, 'line', [x, y, x + random.uniform(-10, 10), y + random.uniform(-10, 10), x + 5, y + 5],
+                                             {'fill': random.choice(['black', 'red', 'blue']), 'width': 2.0}, ("movable", "erasable", "line")))
+
+    def frames_while(work: Callable[[], None]) -> Tuple[float, float]:
+        thread = threading.Thread(target=BackgroundJob(root, "Benchmark", lambda progress: work()).run)
+        start = last = time.perf_counter()
+        longest = 0.0
+        thread.start()
+        while thread.is_alive():
+            time.sleep(1 / 60)
+            now = time.perf_counter()
+            longest, last = max(longest, now - last), now
+        return (time.perf_counter() - start) * 1000, longest * 1000
+
+    def save(extension: str) -> Tuple[Callable[[], None], Callable[[], Callable[[], None]]]:
+        file_path = os.path.join(directory, 'drawing' + extension)
+        foreground = lambda: file_manager.write_file(file_path, drawing_canvas.scene.ordered(), lambda fraction: None)
+
+        def snapshot() -> Callable[[], None]:
+            records = drawing_canvas.scene.snapshot()
+            return lambda: file_manager.write_file(file_path, records, lambda fraction: None)
+        return foreground, snapshot
+
+    def export(bbox: Optional[Tuple[float, float, float, float]] =None) -> Tuple[Callable[[], None], Callable[[], Callable[[], None]]]:
+        file_path = os.path.join(directory, 'drawing.jpeg')
+
+        def foreground() -> None:
+            scene_raster.invalidate(bbox)
+            scene_raster.image().save(file_path, format='JPEG')
+
+        def snapshot() -> Callable[[], None]:
+            scene_raster.invalidate(bbox)
+            raster_snapshot = scene_raster.snapshot()
+            return lambda: scene_raster.to_image(scene_raster.render_snapshot(raster_snapshot)).save(file_path, format='JPEG')
+        return foreground, snapshot
+
+    scene_raster.image()
+    print(f"{len(drawing_canvas.scene)} items")
+    print(f"{'job':<14}{'main thread ms':>16}{'snapshot ms':>13}{'background ms':>15}{'longest frame ms':>18}")
+    for name, (foreground, snapshot) in [('save JSON', save('.json')), ('save binary', save(EXTENSION)), ('export JPEG', export()),
+                                             ('export edited', export((300, 300, 340, 305)))]:
+        foreground_ms = timed(foreground, repeat=3)
+        start = time.perf_counter()
+        work = snapshot()
+        snapshot_ms = (time.perf_counter() - start) * 1000
+        total_ms, longest_ms = frames_while(work)
+        print(f"{name:<14}{foreground_ms:>16.0f}{snapshot_ms:>13.1f}{total_ms:>15.0f}{longest_ms:>18.1f}")
+
+    root.destroy()
+
+
+
+def bench_load(args: argparse.Namespace) -> None:
+    """
+    Compares loading a drawing of 30000 segments and 16 photos in one synchronous loop, which decodes the photos
+    one after another on the main thread, with the progressive loader: the time to the first items on the canvas,
+    the total load time, and the longest frame of the main loop meanwhile (the whole load, for the synchronous loop).
+    """
+    root = tk.Tk()
+    drawing_canvas = make_drawing_canvas(root)
+    file_manager = FileManager(drawing_canvas)
+    directory = tempfile.mkdtemp()
+    random.seed(0)
+
+    for index in range(16):
+        photo = Image.fromarray(np.random.default_rng(index).integers(0, 255, (1500, 2000, 3), dtype=np.uint8).cumsum(axis=1, dtype=np.uint8))
+        photo.save(os.path.join(directory, f'photo{index}.jpeg'), quality=90)
+    for _ in range(30000):
+        x, y = random.uniform(0, 790), random.uniform(0, 590)
+        drawing_canvas.draw_record(SceneItem(0, 'line', [x, y, x + random.uniform(-10, 10), y + random.uniform(-10, 10), x + 5, y + 5],
+                                             {'fill': random.choice(['black', 'red', 'blue']), 'width': 2.0}, ("movable", "erasable", "line")))
+    items_data, images_data, styles = file_manager.objects_data_collector()
+    images_data = [{'image_id': index, 'path': os.path.join(directory, f'photo{index}.jpeg'), 'coords': [50 * index, 300]} for index in range(16)]
+    file_path = os.path.join(directory, 'drawing.json')
+    file_manager.write_json(file_path, items_data, images_data, styles)
+
+    def synchronous() -> Tuple[float, float]:
+        start = time.perf_counter()
+        with open(file_path, 'r') as file:
+            data = json.load(file)
+        drawing_canvas.reset_canvas()
+        for item_data in data['drawings']:
+            file_manager.create_item(item_data, data['styles'])
+        for image_data in data['images']:
+            file_manager.open_image(image_data['path'], image_data['coords'])
+        drawing_canvas.canvas.update()
+        total_ms = (time.perf_counter() - start) * 1000
+        return total_ms, total_ms
+
+    def progressive() -> Tuple[float, float, float]:
+        loader = DrawingLoader(file_manager, file_path)
+        loader.start(show_window=False)
+        longest, last = 0.0, time.perf_counter()
+        while not loader.finished:
+            drawing_canvas.canvas.update()
+            time.sleep(0.001)
+            now = time.perf_counter()
+            longest, last = max(longest, now - last), now
+        return loader.first_paint_ms, loader.total_ms, longest * 1000
+
+    print(f"{len(items_data)} segments, {len(images_data)} photos of 2000x1500")
+    print(f"{'load':<14}{'first items ms':>16}{'total ms':>10}{'longest frame ms':>18}")
+    total_ms, longest_ms = synchronous()
+    print(f"{'synchronous':<14}{total_ms:>16.0f}{total_ms:>10.0f}{longest_ms:>18.0f}")
+    first_ms, total_ms, longest_ms = progressive()
+    print(f"{'progressive':<14}{first_ms:>16.0f}{total_ms:>10.0f}{longest_ms:>18.1f}")
+    print(f"{len(drawing_canvas.scene)} items loaded")
+
+    root.destroy()
+
+
+
+def bench_images(args: argparse.Namespace) -> None:
+    """
+    Measures opening the same 12MP photo 50 times, decoding it every time vs through the image cache,
+    and pasting it 50 times (as paste_object does), with the counters of the cache and the number of Tk images made.
+    """
+    root = tk.Tk()
+    drawing_canvas = make_drawing_canvas(root)
+    file_manager = FileManager(drawing_canvas)
+    directory = tempfile.mkdtemp()
+    photo_path = os.path.join(directory, 'photo.jpeg')
+    Image.fromarray(np.random.default_rng(0).integers(0, 255, (3000, 4000, 3), dtype=np.uint8).cumsum(axis=1, dtype=np.uint8)).save(photo_path, quality=90)
+    image_cache.clear()
+
+    def uncached() -> None:
+        for _ in range(50):
+            ImageCache.decode(photo_path, (400, 400))
+
+    def cached() -> None:
+        for index in range(50):
+            file_manager.open_image(photo_path, (index * 10, 200))
+
+    def paste() -> None:
+        copied = drawing_canvas.scene.ordered()[-1].copy()
+        for _ in range(50):
+            drawing_canvas.draw_record(copied.copy())
+
+    print(f"{'50 times':<26}{'ms':>10}")
+    for name, action in [('decode every time', uncached), ('open through the cache', cached), ('paste', paste)]:
+        start = time.perf_counter()
+        action()
+        print(f"{name:<26}{(time.perf_counter() - start) * 1000:>10.0f}")
+
+    photo_images = {id(photo_image) for photo_image in drawing_canvas.photo_images.values()}
+    print(f"{len(drawing_canvas.photo_images)} image items, {len(photo_images)} Tk images, cache: {image_cache.stats()}")
+
+    root.destroy()
+
+
+
+def bench_transforms(args: argparse.Namespace) -> None:
+    """
+    Measures opening a 40MP photo and the click times of rotating, mirroring and resizing it: applied to the full-size photo,
+    applied to the last result (as the image buttons used to), and composed on the image's transform and rendered from a proxy.
+    Each result ends mirrored at 800 pixels wide after shrinking to 100, and its mean error is measured against mirroring and resizing the photo once.
+    """
+    root = tk.Tk()
+    drawing_canvas = make_drawing_canvas(root)
+    file_manager = FileManager(drawing_canvas)
+    directory = tempfile.mkdtemp()
+    photo_path = os.path.join(directory, 'photo.jpeg')
+    Image.fromarray(np.random.default_rng(0).integers(0, 255, (5184, 7744, 3), dtype=np.uint8).cumsum(axis=1, dtype=np.uint8)).save(photo_path, quality=90)
+    image_cache.clear()
+    clicks = [('rotate', None)] * 4 + [('mirror', None), ('resize', 100), ('resize', 800)]
+
+    def apply(image: Image.Image, action: str, width: Optional[int]) -> Image.Image:
+        if action == 'rotate':
+            return image.rotate(90, expand=True)
+        if action == 'mirror':
+            return image.transpose(Image.FLIP_LEFT_RIGHT)
+        return image.resize((width, round(width * image.height / image.width)), Image.LANCZOS)
+
+    def full_size() -> Tuple[Image.Image, Callable]:
+        image = Image.open(photo_path)
+        image.load()
+        return image, lambda image, action, width: apply(image, action, width)
+
+    def accumulated() -> Tuple[Image.Image, Callable]:
+        return ImageCache.decode(photo_path, (400, 400)), apply
+
+    def composed() -> Tuple[int, Callable]:
+        def click(item: int, action: str, width: Optional[int]) -> int:
+            if action == 'resize':
+                source = transformed(drawing_canvas.scene[item].source, action, width)
+                drawing_canvas.update_image(item, file_manager.read_image(source), source)
+            else:
+                file_manager.image_manipulation(item, action)
+            return item
+
+        file_manager.open_image(photo_path)
+        return drawing_canvas.scene.ordered()[-1].id, click
+
+    reference = Image.open(photo_path).transpose(Image.FLIP_LEFT_RIGHT)
+    reference = np.asarray(reference.resize((800, round(800 * reference.height / reference.width)), Image.LANCZOS), dtype=np.float32)
+    print(f"{'edits':<14}{'open ms':>10}{'rotate ms':>11}{'mirror ms':>11}{'resize ms':>11}{'mean error':>12}")
+    for name, edit in [('full size', full_size), ('accumulated', accumulated), ('composed', composed)]:
+        start = time.perf_counter()
+        result, click = edit()
+        times = [(time.perf_counter() - start) * 1000]
+        for action, width in clicks:
+            start = time.perf_counter()
+            result = click(result, action, width)
+            times.append((time.perf_counter() - start) * 1000)
+
+        result = drawing_canvas.scene[result].image if isinstance(result, int) else result
+        error = np.abs(np.asarray(result.resize(reference.shape[1::-1]), dtype=np.float32) - reference).mean()
+        print(f"{name:<14}{times[0]:>10.0f}{sum(times[1:5]) / 4:>11.1f}{times[5]:>11.1f}{(times[6] + times[7]) / 2:>11.1f}{error:>12.2f}")
+    print(f"cache: {image_cache.stats()}")
+
+    root.destroy()
+
+
+
+def peak_memory(action: Callable[[], None]) -> Tuple[float, Optional[float]]:
+    """
+    Runs an action and returns its time (ms) and how much the peak resident memory of the process grew meanwhile (MB),
+    which Linux lets reset through /proc; None elsewhere.
+    """
+    def memory(field: str) -> Optional[float]:
+        try:
+            with open('/proc/self/status') as status:
+                return next(int(line.split()[1]) / 1024 for line in status if line.startswith(field))
+        except OSError:
+            return None
+
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+    except OSError:
+        pass
+    resident = memory('VmRSS')
+    start = time.perf_counter()
+    action()
+    elapsed_ms, peak = (time.perf_counter() - start) * 1000, memory('VmHWM')
+    return elapsed_ms, peak - resident if peak is not None and resident is not None else None
+
+
+
+def bench_print(args: argparse.Namespace) -> None:
+    """
+    Measures exporting a drawing of 30000 items at a print resolution (--dpi): drawn whole into one image and saved,
+    vs the tiled export to PNG and JPEG on one process and on a pool of all the cores, with the peak memory of each.
+    The pool's processes are measured apart from this one.
+    """
+    root = tk.Tk()
+    drawing_canvas = make_drawing_canvas(root)
+    random.seed(0)
+    for _ in range(30000):
+        x, y = random.uniform(0, 790), random.uniform(0, 590)
+        drawing_canvas.draw_record(SceneItem(0, 'line', [x, y, x + random.uniform(-10, 10), y + random.uniform(-10, 10), x + 5, y + 5],
+                                             {'fill': random.choice(['black', 'red', 'blue']), 'width': 2.0}, ("movable", "erasable", "line")))
+    directory = tempfile.mkdtemp()
+
+    def whole() -> None:
+        tiled_export = TiledExport(dpi=args.dpi)
+        tiled_export.take_snapshot(drawing_canvas)
+        painter = ItemPainter(tiled_export.colors, tiled_export.scale)
+        image = Image.new('RGB', tiled_export.size, tiled_export.background)
+        draw = ImageDraw.Draw(image)
+        for record in tiled_export.records:
+            painter.paint(image, draw, record, 0, 0)
+        image.save(os.path.join(directory, 'whole.png'))
+
+    def tiled(export_format: str, workers: int) -> Callable[[], None]:
+        def export() -> None:
+            tiled_export = TiledExport(dpi=args.dpi, workers=workers)
+            tiled_export.take_snapshot(drawing_canvas)
+            tiled_export.write(os.path.join(directory, f'tiled.{export_format.lower()}'), export_format)
+        return export
+
+    cores = os.cpu_count() or 1
+    size = TiledExport(dpi=args.dpi)
+    size.take_snapshot(drawing_canvas)
+    print(f"{len(drawing_canvas.scene)} items at {args.dpi} DPI: {size.size[0]}x{size.size[1]} pixels")
+    print(f"{'export':<28}{'ms':>10}{'peak +MB':>10}")
+    for name, action in [('whole image, PNG', whole), ('tiled PNG, 1 process', tiled('PNG', 1)),
+                         ('tiled JPEG, 1 process', tiled('JPEG', 1)), (f'tiled PNG, {cores} processes', tiled('PNG', cores))]:
+        elapsed_ms, peak_mb = peak_memory(action)
+        print(f"{name:<28}{elapsed_ms:>10.0f}{peak_mb if peak_mb is not None else float('nan'):>10.0f}")
+
+    root.destroy()
+
+
+
+def bench_encoders(args: argparse.Namespace) -> None:
+    """
+    Measures exporting a drawing of 30000 items and a photo in JPEG, GIF, PNG and WebP: one export per format, each rendering
+    the whole drawing again and quantizing the GIF from scratch, vs the export pipeline, which renders once and encodes
+    every format in parallel processes; then again after a one-stroke edit, when the GIF palette is reused.
+    """
+    root = tk.Tk()
+    drawing_canvas = make_drawing_canvas(root)
+    scene_raster = drawing_canvas.scene_raster
+    file_manager = FileManager(drawing_canvas)
+    random.seed(0)
+    for _ in range(30000):
+        x, y = random.uniform(0, 790), random.uniform(0, 590)
+        drawing_canvas.draw_record(SceneItem(0, 'line', [x, y, x + random.uniform(-10, 10), y + random.uniform(-10, 10), x + 5, y + 5],
+                                             {'fill': random.choice(['black', 'red', 'blue']), 'width': 2.0}, ("movable", "erasable", "line")))
+    directory = tempfile.mkdtemp()
+    photo_path = os.path.join(directory, 'photo.jpeg')
+    Image.fromarray(np.random.default_rng(0).integers(0, 255, (300, 400, 3), dtype=np.uint8).cumsum(axis=1, dtype=np.uint8)).save(photo_path)
+    file_manager.open_image(photo_path, (400, 300))
+    formats = export_formats()
+    pipeline = ExportPipeline()
+
+    def per_format() -> Dict[str, float]:
+        timings = {}
+        for export_format in formats:
+            start = time.perf_counter()
+            scene_raster.invalidate()
+            image = scene_raster.image()
+            image.save(os.path.join(directory, 'drawing' + EXPORT_EXTENSIONS[export_format]), format=export_format)
+            timings[export_format] = (time.perf_counter() - start) * 1000
+        return timings
+
+    def pipelined(full: bool) -> Dict[str, float]:
+        start = time.perf_counter()
+        if full:
+            scene_raster.invalidate()
+        image = scene_raster.image()
+        timings = {'render': (time.perf_counter() - start) * 1000}
+        encoded = pipeline.encode(image, formats)
+        timings.update(pipeline.timings)
+        start = time.perf_counter()
+        for export_format, data in encoded.items():
+            with open(os.path.join(directory, 'drawing' + EXPORT_EXTENSIONS[export_format]), 'wb') as file:
+                file.write(data)
+        timings['write'] = (time.perf_counter() - start) * 1000
+        return timings
+
+    pipelined(True)
+    pipeline.palette_cache = PaletteCache()
+    print(f"{len(drawing_canvas.scene)} items, formats: {', '.join(formats)}, {pipeline.workers} encoder processes")
+    for name, export in [('one export per format', per_format), ('pipeline', lambda: pipelined(True)),
+                         ('pipeline after an edit', lambda: draw_stroke(drawing_canvas, [(300 + step, 300 + step % 5) for step in range(40)]) or pipelined(False))]:
+        start = time.perf_counter()
+        timings = export()
+        total_ms = (time.perf_counter() - start) * 1000
+        print(f"{name:<24}{total_ms:>8.0f} ms  " + ", ".join(f"{stage} {ms:.0f}" for stage, ms in timings.items()))
+
+    root.destroy()
+
+
+
+def bench_convert(args: argparse.Namespace) -> None:
+    """
+    Measures the headless converter on 40 saved drawings of 3000 segments each, to PNG at twice the canvas size:
+    one process, and a pool of all the cores. Only the summary of each run is printed.
+    """
+    directory = tempfile.mkdtemp()
+    random.seed(0)
+    styles = [{'type': 'line', 'tags': ["movable", "erasable", "line"], 'config': {'fill': color, 'width': 2.0}}
+              for color in ('black', 'red', 'light blue')]
+    for index in range(40):
+        items_data = []
+        for _ in range(3000):
+            x, y = random.uniform(0, 790), random.uniform(0, 590)
+            items_data.append({'style': random.randrange(len(styles)), 'coords': [x, y, x + random.uniform(-10, 10), y + random.uniform(-10, 10)]})
+        FileManager.write_json(os.path.join(directory, f'drawing{index}.json'), items_data, [], styles)
+
+    for workers in sorted({1, os.cpu_count() or 1}):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            convert([os.path.join(directory, '*.json')], 'PNG', 2.0, os.path.join(directory, f'out{workers}'), workers)
+        print(output.getvalue().splitlines()[-1])
+
+
+
+def bench_fonts(args: argparse.Namespace) -> None:
+    """
+    Measures the fonts of exporting 5000 labels in 12 fonts (4 families, 3 sizes, with styles): scanning the font
+    directories vs reading the index from its cache file, loading a font for every label as before,
+    and two exports through the font resolver, with the number of fonts it loaded.
+    """
+    directory = tempfile.mkdtemp()
+    index_path = os.path.join(directory, 'fonts.json')
+    scan_ms = timed(lambda: FontResolver(index_path).index(), 1)
+    cached_ms = timed(lambda: FontResolver(index_path).index(), 5)
+    print(f"{len(FontResolver(index_path).index())} families: scan {scan_ms:.1f} ms, from the cache file {cached_ms:.1f} ms")
+
+    random.seed(0)
+    fonts = [f"{family} {size}{style}" for family, style in (('Arial', ''), ('{Times New Roman}', ' bold'), ('Courier', ''), ('Helvetica', ' bold italic'))
+             for size in (10, 14, 24)]
+    records = [SceneItem(index, 'text', [random.uniform(0, 750), random.uniform(0, 580)],
+                         {'text': f"Label {index}", 'font': random.choice(fonts), 'fill': 'black', 'anchor': 'nw'}, ("movable", "text"))
+               for index in range(5000)]
+
+    def per_label() -> None:
+        for record in records:
+            family, size, style = parse_tk_font(record.style['font'])
+            ImageFont.truetype(font_resolver.font_file(family, style), size)
+
+    def export() -> None:
+        label_fonts: Dict[str, Any] = {}
+        bboxes = [record_bbox(record, label_fonts) for record in records]
+        tiled_export = TiledExport(scale=2.0, workers=1)
+        tiled_export.set_drawing(records, bboxes, color_rgb, 'white', (800, 600))
+        tiled_export.write(os.path.join(directory, 'labels.png'), 'PNG')
+
+    print(f"a font loaded for each label: {timed(per_label, 1):.0f} ms")
+    font_resolver.fonts.clear()
+    for run in (1, 2):
+        loads = font_resolver.loads
+        elapsed_ms = timed(export, 1)
+        print(f"export {run} through the font resolver: {elapsed_ms:.0f} ms, {font_resolver.loads - loads} fonts loaded")
+
+
+
+def bench_picker(args: argparse.Namespace) -> None:
+    """
+    Measures opening the font picker with 3000 families (the installed ones, and made-up names for the rest):
+    listing Tk's families into a Listbox one by one as before, vs the picker on its first opening, in a later session
+    (the list read from the cache file) and when opened again, and the time of filtering as a search is typed.
+    """
+    root = tk.Tk()
+    random.seed(0)
+    words = ['Sans', 'Serif', 'Mono', 'Noto', 'Display', 'Condensed', 'Text', 'Pro', 'Grotesk', 'Garamond', 'Arabic', 'Hebrew']
+    installed = list(tk.font.families(root))
+    families = installed + [f"{' '.join(random.sample(words, 3))} {index}" for index in range(3000 - len(installed))]
+
+    def listbox() -> None:
+        window = tk.Toplevel(root)
+        font_listbox = tk.Listbox(window)
+        font_listbox.pack(side="right", fill="both", expand=True)
+        tk.font.families(root)
+        for family in families:
+            font_listbox.insert("end", family)
+        root.update()
+        window.destroy()
+
+    index_path = os.path.join(tempfile.mkdtemp(), 'fonts.json')
+    family_search: Optional[FamilySearch] = None
+
+    def picker(resolver: FontResolver, keep: bool) -> Callable[[], None]:
+        def open_picker() -> None:
+            nonlocal family_search
+            if family_search is None or not keep:
+                family_search = FamilySearch(resolver.tk_families(lambda: list(tk.font.families(root)) + families))
+            font_picker = FontPicker(root, family_search, lambda family: None)
+            root.update()
+            font_picker.window.destroy()
+        return open_picker
+
+    print(f"{'open':<36}{'ms':>10}")
+    print(f"{'Listbox of every family':<36}{timed(listbox, 3):>10.1f}")
+    print(f"{'picker, first opening':<36}{timed(picker(FontResolver(index_path), False), 1):>10.1f}")
+    print(f"{'picker, later session':<36}{timed(picker(FontResolver(index_path), False), 1):>10.1f}")
+    print(f"{'picker, opened again':<36}{timed(picker(FontResolver(index_path), True), 5):>10.1f}")
+
+    font_picker = FontPicker(root, family_search, lambda family: None)
+    for query in ('g', 'ga', 'gar', 'gara', 'garamond s'):
+        elapsed_ms = timed(lambda: (font_picker.search_text.set(query), root.update()), 1)
+        print(f"search {query!r:<28}{elapsed_ms:>10.1f}  {len(font_picker.matches)} matches")
+    root.destroy()
+
+
+
+def bench_dots(args: argparse.Namespace) -> None:
+    """
+    Measures drawing dotted polygons with long edges (spacing 2, so thousands of dots), the previous way
+    (an oval per dot, placed in a Python loop and grouped) vs as one dotted line: the time, the canvas items,
+    and the time of dragging the figure. Also the time of computing the dot positions in a loop vs vectorized.
+    """
+    root = tk.Tk()
+    drawing_canvas = make_drawing_canvas(root)
+    shapes = Shapes(drawing_canvas)
+    shapes.dot_spacing = 2
+
+    def per_dot(vertices: List[Tuple[int, int]]) -> int:
+        group = drawing_canvas.scene.new_group()
+        radius = shapes.dot_radius
+        for start, end in zip(vertices, vertices[1:] + vertices[:1]):
+            dx, dy = end[0] - start[0], end[1] - start[1]
+            steps = max(1, int((dx ** 2 + dy ** 2) ** 0.5 / shapes.dot_spacing))
+            for step in range(steps + 1):
+                x, y = start[0] + dx * step / steps, start[1] + dy * step / steps
+                dot = drawing_canvas.canvas.create_oval(x - radius, y - radius, x + radius, y + radius, fill="black", outline="black",
+                                                        tags=("movable", "erasable", "polygon"))
+                drawing_canvas.add_to_group(group, dot)
+                drawing_canvas.index_item(dot)
+        return dot
+
+    def single_item(vertices: List[Tuple[int, int]]) -> int:
+        shapes.set_current_shape('polygon')
+        for x, y in vertices:
+            shapes.add_polygon_vertex(SimpleNamespace(x=x, y=y))
+        figure = shapes.current_figure
+        shapes.complete_polygon(None)
+        return figure
+
+    random.seed(0)
+    print(f"{'figure':<28}{'ms':>10}{'items':>8}{'drag frame ms':>15}")
+    for edges in (4, 16, 64):
+        vertices = [(random.randint(20, 780), random.randint(20, 580)) for _ in range(edges)]
+        for name, draw_figure in (('oval per dot', per_dot), ('one dotted line', single_item)):
+            drawing_canvas.reset_canvas()
+            items = len(drawing_canvas.scene)
+            start = time.perf_counter()
+            figure = draw_figure(vertices)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            root.update()
+            drag_ms = timed(lambda: drag_frames(drawing_canvas, figure, 20), repeat=3) / 20
+            print(f"{f'{edges} edges, {name}':<28}{elapsed_ms:>10.1f}{len(drawing_canvas.scene) - items:>8}{drag_ms:>15.2f}")
+
+    points = np.array(scribble(0, 100000), dtype=float)
+
+    def loop() -> None:
+        dots = []
+        for start, end in zip(points[:-1].tolist(), points[1:].tolist()):
+            dx, dy = end[0] - start[0], end[1] - start[1]
+            steps = max(1, int((dx ** 2 + dy ** 2) ** 0.5 / 10))
+            dots += [(start[0] + dx * step / steps, start[1] + dy * step / steps) for step in range(steps + 1)]
+
+    print(f"dot positions of a 100000-point path: loop {timed(loop, 3):.1f} ms, vectorized {timed(lambda: dot_positions(points, 10), 3):.1f} ms")
+    root.destroy()
+
+
+
+BENCHMARKS = {'strokes': bench_strokes, 'simplify': bench_simplify, 'index': bench_index, 'cut': bench_cut, 'fill': bench_fill,
+              'memory': bench_memory, 'drag': bench_drag, 'undo': bench_undo, 'export': bench_export,
+              'save': bench_save, 'binary': bench_binary, 'journal': bench_journal,
+              'background': bench_background, 'load': bench_load,
+              'images': bench_images, 'transforms': bench_transforms, 'print': bench_print,
+              'encoders': bench_encoders, 'convert': bench_convert, 'fonts': bench_fonts,
+              'picker': bench_picker, 'dots': bench_dots}
+
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description="""Performance benchmarks of the graphic design program.
+                The canvas benchmarks open a Tk window, so they need a display.""")
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS), help="The benchmark to run.")
+    parser.add_argument('--strokes', type=int, default=200, help="Number of synthetic strokes.")
+    parser.add_argument('--points', type=int, default=500, help="Number of mouse positions per stroke.")
+    parser.add_argument('--items', type=int, default=100000, help="Number of canvas items.")
+    parser.add_argument('--dpi', type=int, default=1200, help="Resolution of the print export benchmark (the canvas is 96 DPI).")
+    parser.add_argument('--total-points', type=int, default=1000000, help="Number of stroke points in the memory benchmark.")
+    args = parser.parse_args()
+
+    BENCHMARKS[args.benchmark](args)
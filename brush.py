@@ -6,12 +6,15 @@ class Brush:
     """
     Class of brush object, can be used for illustration programs.
     """
-    def __init__(self, color: str ='black', thickness: float =2.0) -> None:
+    def __init__(self, color: str ='black', thickness: float =2.0, simplify_tolerance: float =0.0) -> None:
         """
         A constructor of the brush object.
+        simplify_tolerance is the distance in pixels under which points of a finished stroke
+        are removed, 0 keeps every point.
         """
         self.color = color
         self.thickness = thickness
+        self.simplify_tolerance = simplify_tolerance
 
 
     def choose_color(self) -> None:
@@ -52,5 +55,21 @@ class Brush:
 
 
 
+    def set_simplify_tolerance(self) -> None:
+        """
+        Open a new dialog with the user, gets new value and changes the stroke simplification tolerance.
+        """
+        def update_tolerance() -> None:
+            self.simplify_tolerance = float(scale.get() / 10)
+            tolerance_dialog.destroy()
+
+        tolerance_dialog = tk.Toplevel()
+        tolerance_dialog.title("Set Stroke Simplification")
 
 
+        scale = Scale(tolerance_dialog, from_=0, to=50, orient='horizontal', label=f"Currrent Tolerance: {self.simplify_tolerance * 10}", length=300)
+        scale.set(self.simplify_tolerance * 10)
+        scale.pack(padx=10, pady=10)
+
+        ok_button = Button(tolerance_dialog, text="OK", command=update_tolerance)
+        ok_button.pack()
@@ -1,7 +1,18 @@
 import tkinter as tk
 from tkinter import colorchooser, Scale, Button
 from brush import Brush
-from typing import List, Tuple, Dict
+from geometry import simplify_points, cut_polyline
+import numpy as np
+from scene import Scene, SceneItem
+from scene_raster import SceneRaster, flood_fill_mask
+from PIL import Image, ImageTk
+from input_coalescer import InputCoalescer, DEFAULT_FRAME_RATE
+from history import History, DEFAULT_MEMORY_CAP
+from journal import Journal
+from bisect import bisect_left, bisect_right
+from typing import List, Tuple, Dict, Optional, Any, Deque
+from collections import deque
+import weakref
 
 
 
@@ -11,28 +22,40 @@ class  DrawingCanvas:
     Handles creation of simple lines and the erasion of objects.
     """
 
-    def __init__(self, master, width: int, height: int, bg: str="white", mode: str ='brush') -> None:
+    def __init__(self, master, width: int, height: int, bg: str="white", mode: str ='brush', frame_rate: int =DEFAULT_FRAME_RATE,
+                 history_cap: int =DEFAULT_MEMORY_CAP) -> None:
         """
         A cunstractor of the canvas object.
+        frame_rate caps how often the drag-driven handlers do their canvas work.
+        history_cap is the memory (in bytes) that the undo history may keep.
         """
         self.root = master
         self.canvas = tk.Canvas(self.root, width=width, height=height, bg=bg, highlightthickness=0)
         self.canvas.pack(fill=tk.BOTH, expand=True)
+        self.input_coalescer = InputCoalescer(self.canvas, frame_rate)
         self.bg = bg
         self.width = width
         self.height = height
         self.mode = mode
         self.eraser_size: float = 5.0
+        self.eraser_mode = 'object'
         self.eraser_detector = self.canvas.create_oval(0, 0, 0, 0, outline="black", fill='white', state="hidden")
 
         self.is_drawing = False
         self.start_x, self.start_y = None, None
 
 
-        self.current_segment: List[int] = []
-        self.item_to_segment_group: Dict[int, List[int]] = {}
-        self.current_segment_coord: List[Tuple[int, int]] = []
-        self.segment_groups_coord: Dict[int, List[Tuple[int, int]]]= {}
+        self.current_stroke: Optional[int] = None
+        self.simplification_log: Deque[Dict[str, Any]] = deque(maxlen=500)
+
+        self.scene = Scene()
+        self.photo_images: Dict[int, ImageTk.PhotoImage] = {}
+        self.shared_photo_images: Dict[int, Tuple[weakref.ref, ImageTk.PhotoImage]] = {}
+
+        self.fill_tolerance = 16
+        self.scene_raster = SceneRaster(self)
+        self.history = History(self, history_cap)
+        self.journal: Optional[Journal] = None
 
         self.begin_drawing()
 
@@ -61,8 +84,12 @@ class  DrawingCanvas:
         """
         Updates the background color of the canvas.
         """
+        self.history.record({'action': 'background', 'color': self.bg})
         self.bg = new_bg
         self.canvas.config(bg=new_bg)   
+        self.scene_raster.invalidate()
+        if self.journal is not None:
+            self.journal.background_updated()
 
 
     def set_brush(self, brush: Brush) -> None:
@@ -77,6 +104,8 @@ class  DrawingCanvas:
         Unbind drawings and erasing binds.
         Used in transitioning between modes.
         """
+        self.input_coalescer.flush()
+        self.history.close_batch()
         self.canvas.unbind("<Motion>")
         self.canvas.unbind("<B1-Motion>")
         self.canvas.unbind("<Button-1>")
@@ -89,7 +118,7 @@ class  DrawingCanvas:
         """
         self.canvas.bind("<Button-1>", self.start_drawing)
         self.canvas.bind("<ButtonRelease-1>", self.stop_drawing)
-        self.canvas.bind("<B1-Motion>", self.draw)
+        self.canvas.bind("<B1-Motion>", self.input_coalescer.wrap(self.draw_points, keep_all=True))
 
     
 
@@ -100,26 +129,54 @@ class  DrawingCanvas:
         """
         self.is_drawing = True
         self.start_x, self.start_y = event.x, event.y
-        self.current_segment = []
-        self.current_segment_coord = []
+        self.current_stroke = None
 
     def draw(self, event) -> None:
+        """
+        Responsible for the drawing proccess of a single mouse position.
+        """
+        self.draw_points([event])
+
+
+
+    def draw_points(self, events: List[Any]) -> None:
         """
         Responsible for the drawing proccess;
-        Creats the line.
+        Creates the stroke's line on the first motion and extends its coords afterwards,
+        so every stroke is a single canvas item. All the positions of a frame are added in one call.
         """
-        if self.is_drawing and self.start_x and self.start_y:
+        if self.is_drawing and self.start_x is not None and self.start_y is not None:
 
-            segment = self.canvas.create_line(self.start_x, self.start_y, event.x, event.y,
-                        fill=self.current_brush.color, width=self.current_brush.thickness, tags=("movable", "erasable", "line"))
-            
-            self.current_segment.append(segment)
-            self.current_segment_coord.append((event.x, event.y))
+            if self.current_stroke is None:
+                first_event, events = events[0], events[1:]
+                self.current_stroke = self.canvas.create_line(self.start_x, self.start_y, first_event.x, first_event.y,
+                            fill=self.current_brush.color, width=self.current_brush.thickness,
+                            capstyle=tk.ROUND, joinstyle=tk.ROUND, tags=("movable", "erasable", "line"))
 
-            self.item_to_segment_group[segment] = self.current_segment
-            self.segment_groups_coord[segment] = self.current_segment_coord
+                self.index_item(self.current_stroke)
+                self.start_x, self.start_y = first_event.x, first_event.y
 
-            self.start_x, self.start_y = event.x, event.y
+            if events:
+                points = [(event.x, event.y) for event in events]
+                self.append_points(self.current_stroke, points)
+                self.start_x, self.start_y = points[-1]
+
+
+
+    def append_points(self, item: int, points: List[Tuple[float, float]]) -> None:
+        """
+        Appends points to a line being drawn (a stroke or a dotted figure), on the canvas and in its record, in one call.
+        """
+        coords = [coord for point in points for coord in point]
+        self.canvas.insert(item, "end", coords)
+
+        margin = float(self.scene[item].style.get('width', 1)) / 2 + 1
+        xs, ys = [point[0] for point in points], [point[1] for point in points]
+        new_bbox = (min(xs) - margin, min(ys) - margin, max(xs) + margin, max(ys) + margin)
+        self.scene.extend(item, coords, new_bbox)
+        self.scene_raster.item_changed(item, new_bbox)
+        if self.journal is not None:
+            self.journal.item_extended(item)
 
 
 
@@ -127,8 +184,372 @@ class  DrawingCanvas:
         """
         Stops the drawing action.
         """
+        self.input_coalescer.flush(self.draw_points)
         self.is_drawing = False
-        
+        if self.current_stroke is not None and self.current_brush.simplify_tolerance > 0:
+            self.simplify_stroke(self.current_stroke, self.current_brush.simplify_tolerance)
+        self.current_stroke = None
+
+
+
+    def simplify_stroke(self, stroke: int, tolerance: float) -> Dict[str, Any]:
+        """
+        Removes the near-collinear points of a stroke from its stored points and canvas geometry.
+        The points count before and after is added to the simplification log.
+        """
+        record = self.scene[stroke]
+        points = record.points()
+        simplified = simplify_points(points, tolerance)
+
+        report = {'stroke': stroke, 'thickness': float(record.style.get('width', 1)),
+                  'tolerance': tolerance, 'points_before': len(points), 'points_after': len(simplified)}
+        self.simplification_log.append(report)
+
+        if len(simplified) < len(points):
+            record.set_coords([coord for point in simplified for coord in point])
+            self.canvas.coords(stroke, record.coords.tolist())
+            self.scene_raster.item_changed(stroke, self.scene.bbox(stroke))
+            if self.journal is not None:
+                self.journal.item_changed(stroke)
+
+        return report
+
+
+
+    def forget_item(self, item: int) -> None:
+        """
+        Removes the scene record (and group membership) of a deleted item.
+        """
+        self.scene_raster.item_changed(item, self.scene.bbox(item))
+        self.scene.remove(item)
+        self.photo_images.pop(item, None)
+        if self.journal is not None:
+            self.journal.item_deleted(item)
+
+
+
+    def delete_items(self, items: List[int]) -> None:
+        """
+        Deletes items from the canvas in one call, and forgets them.
+        """
+        if items:
+            self.record_deletion(items)
+            self.canvas.delete(*items)
+            for item in items:
+                self.forget_item(item)
+
+
+
+    def record_deletion(self, items: List[int]) -> None:
+        """
+        Records items that are about to be deleted in the history, with their places in the stack and their groups.
+        """
+        self.history.record({'action': 'items', 'present': False, 'records': [self.scene[item] for item in items],
+                             'placements': [self.placement(item) for item in items]})
+
+
+
+    def placement(self, item: int) -> Tuple[int, Optional[int]]:
+        """
+        Returns the stacking place and group of an item, to put it back there after it was deleted.
+        """
+        return self.scene.index.stacking.get(item, 0), self.scene.group_of.get(item)
+
+
+
+    @staticmethod
+    def group_tag(group: int) -> str:
+        """
+        The canvas tag that all the items of a group carry.
+        """
+        return f"group-{group}"
+
+
+
+    def add_to_group(self, group: int, item: int) -> None:
+        """
+        Adds an item to a scene group, and tags it on the canvas with the group's tag.
+        """
+        self.scene.add_to_group(group, item)
+        self.canvas.addtag_withtag(self.group_tag(group), item)
+        if self.journal is not None:
+            self.journal.item_changed(item)
+
+
+
+    def group_target(self, item: int) -> Any:
+        """
+        Returns what canvas calls should act on to reach the whole group of an item:
+        the group's tag, or the item itself if it isn't grouped.
+        """
+        group = self.scene.group_of.get(item)
+        return self.group_tag(group) if group is not None else item
+
+
+
+    def delete_group(self, item: int) -> None:
+        """
+        Deletes an item with its group, in one canvas call.
+        """
+        if item in self.scene:
+            members = self.scene.group_members(item)
+            self.record_deletion(members)
+            self.canvas.delete(self.group_target(item))
+            for member in members:
+                self.forget_item(member)
+
+
+
+    def move_group(self, item: int, dx: float, dy: float, records: bool =True) -> None:
+        """
+        Moves an item with its group, in one canvas call.
+        The scene records are moved too, unless records is False (a drag moves them once, when it ends).
+        """
+        self.canvas.move(self.group_target(item), dx, dy)
+        if records:
+            self.move_indexed(self.scene.group_members(item), dx, dy)
+
+
+
+    def index_item(self, item: int, image: Optional[Image.Image] =None, source: Optional[Dict[str, Any]] =None) -> None:
+        """
+        Records an item in the scene from its canvas state, after it was created on the canvas
+        or its geometry, size, font or colors were changed. All its options are read in one call.
+        The image and source of an image item are kept unless new ones are given.
+        The record of a changed item is updated in place, and its previous state goes to the history.
+        """
+        bbox = self.canvas.bbox(item)
+        if not bbox:
+            return
+
+        config = self.canvas.itemconfig(item)
+        style = {option: values[-1] for option, values in config.items() if values[-1] not in ('', None) and option not in ('tags', 'image')}
+        tags = tuple(tag for tag in self.canvas.gettags(item) if tag != 'current' and not tag.startswith('group-'))
+
+        record = self.scene.get(item)
+        if record is None:
+            record = SceneItem(item, self.canvas.type(item), self.canvas.coords(item), style, tags, image, source)
+
+        else:
+            self.history.record({'action': 'change', 'record': record, 'state': record.copy()})
+            record.set_coords(self.canvas.coords(item))
+            record.style, record.tags = style, tags
+            record.image = image if image is not None else record.image
+            record.source = source if source is not None else record.source
+
+        self.put_record(record, bbox)
+
+
+
+    def put_record(self, record: SceneItem, bbox: Tuple[float, float, float, float]) -> None:
+        """
+        Adds a record to the scene, or replaces the record of the same item,
+        and marks its old and new regions for the scene raster. New records are added to the history.
+        """
+        if record.id not in self.scene:
+            self.history.record({'action': 'items', 'present': True, 'records': [record], 'placements': []})
+        self.scene_raster.item_changed(record.id, self.scene.bbox(record.id), bbox)
+        self.scene.put(record, bbox)
+        if self.journal is not None:
+            self.journal.item_changed(record.id)
+
+
+
+    def draw_record(self, record: SceneItem) -> int:
+        """
+        Shows a record that isn't on the canvas yet (loaded, pasted or a piece of a cut stroke),
+        and adds it to the scene under its new canvas item, which is returned.
+        """
+        if record.kind == 'image':
+            photo_image = self.photo_image_of(record.image)
+            item = self.canvas.create_image(*record.coords, image=photo_image, anchor=record.style.get('anchor', 'center'), tags=record.tags)
+            self.photo_images[item] = photo_image
+        else:
+            item = getattr(self.canvas, f"create_{record.kind}")(*record.coords, **record.style, tags=record.tags)
+
+        record.id = item
+        self.put_record(record, self.canvas.bbox(item))
+
+        return item
+
+
+
+    def update_image(self, item: int, image: Image.Image, source: Optional[Dict[str, Any]] =None) -> None:
+        """
+        Replaces the image shown by an image item (and the information about its file, if given).
+        """
+        photo_image = self.photo_image_of(image)
+        self.canvas.itemconfig(item, image=photo_image)
+        self.photo_images[item] = photo_image
+        self.index_item(item, image=image, source=source)
+
+
+
+    def photo_image_of(self, image: Image.Image) -> ImageTk.PhotoImage:
+        """
+        Returns the Tk image of a PIL image, made once for all the items that show it (a photo pasted many times,
+        or opened again from the image cache). It's forgotten together with the PIL image.
+        """
+        key = id(image)
+        shared = self.shared_photo_images.get(key)
+        if shared is not None and shared[0]() is image:
+            return shared[1]
+
+        photo_image = ImageTk.PhotoImage(image)
+        self.shared_photo_images[key] = (weakref.ref(image, lambda ref: self.shared_photo_images.pop(key, None)), photo_image)
+        return photo_image
+
+
+
+    def move_indexed(self, items: List[int], dx: float, dy: float) -> None:
+        """
+        Moves the scene records of items that were moved on the canvas.
+        """
+        self.history.record({'action': 'move', 'records': [self.scene[item] for item in items if item in self.scene], 'dx': dx, 'dy': dy})
+        for item in items:
+            self.scene_raster.item_moved(item, self.scene.bbox(item), dx, dy)
+            self.scene.move(item, dx, dy)
+            if self.journal is not None:
+                self.journal.item_moved(item, dx, dy)
+
+
+
+    def item_at(self, x: float, y: float, halo: float =1.0, tag: Optional[str] =None) -> Optional[int]:
+        """
+        Returns the topmost item under the point (with the given tag), or None.
+        """
+        return self.scene.item_at(x, y, halo, tag)
+
+
+
+    def undo(self, event=None) -> None:
+        """
+        Reverses the last change of the drawing (not in the middle of a stroke).
+        """
+        if not self.is_drawing:
+            self.input_coalescer.flush()
+            self.history.undo()
+
+
+
+    def redo(self, event=None) -> None:
+        """
+        Makes the last undone change of the drawing again.
+        """
+        if not self.is_drawing:
+            self.input_coalescer.flush()
+            self.history.redo()
+
+
+
+    def remove_records(self, records: List[SceneItem]) -> List[Tuple[int, Optional[int]]]:
+        """
+        Deletes the items of records (undoing their creation), and returns their places in the stack and groups.
+        """
+        placements = [self.placement(record.id) for record in records]
+        self.delete_items([record.id for record in records])
+        return placements
+
+
+
+    def restore_records(self, records: List[SceneItem], placements: List[Tuple[int, Optional[int]]]) -> None:
+        """
+        Draws deleted records again (undoing their deletion), back in their places in the stack and in their groups.
+        """
+        stacking = self.scene.index.stacking
+        for record, (place, group) in sorted(zip(records, placements), key=lambda pair: pair[1][0]):
+            item = self.draw_record(record)
+            stacking[item] = place
+            if group is not None:
+                self.scene.groups.setdefault(group, {})
+                self.add_to_group(group, item)
+
+        self.restack_to_scene([record.id for record in records], created=True)
+
+
+
+    def move_records(self, records: List[SceneItem], dx: float, dy: float) -> None:
+        """
+        Moves the items of records on the canvas and in the scene.
+        The records of a move are whole groups, so every group is moved in one canvas call.
+        """
+        items = [record.id for record in records]
+        for target in dict.fromkeys(self.group_target(item) for item in items):
+            self.canvas.move(target, dx, dy)
+        self.move_indexed(items, dx, dy)
+
+
+
+    def apply_state(self, record: SceneItem, state: SceneItem) -> SceneItem:
+        """
+        Puts a record (and its item on the canvas) back in a saved state, and returns the state it had.
+        """
+        previous = record.copy()
+        record.coords, record.style, record.tags = state.coords, state.style, state.tags
+        record.image, record.source = state.image, state.source
+
+        self.canvas.coords(record.id, *record.coords)
+        self.canvas.itemconfig(record.id, **record.style)
+        if record.kind == 'image' and record.image is not None:
+            photo_image = self.photo_image_of(record.image)
+            self.canvas.itemconfig(record.id, image=photo_image)
+            self.photo_images[record.id] = photo_image
+
+        self.put_record(record, self.canvas.bbox(record.id))
+        return previous
+
+
+
+    def place_records(self, records: List[SceneItem], places: List[int]) -> List[int]:
+        """
+        Puts records at the given places of the stacking order, and returns the places they had.
+        """
+        stacking = self.scene.index.stacking
+        previous = [stacking[record.id] for record in records]
+        for record, place in zip(records, places):
+            stacking[record.id] = place
+            self.scene_raster.invalidate(self.scene.bbox(record.id))
+            if self.journal is not None:
+                self.journal.item_changed(record.id)
+
+        self.restack_to_scene([record.id for record in records])
+        return previous
+
+
+
+    def restack_to_scene(self, items: List[int], created: bool =False) -> None:
+        """
+        Moves items on the canvas to their places in the scene's stacking order, each right above the item below it.
+        Pieces of a cut stroke share their place, so among them the topmost one on the canvas is looked up.
+        Items that were just created are already on top, so if that's their place nothing is moved.
+        """
+        stacking = self.scene.index.stacking
+        items = sorted(items, key=stacking.__getitem__)
+        placed = set(items)
+        others = sorted((place, item) for item, place in stacking.items() if item not in placed)
+
+        if not items or (created and (not others or stacking[items[0]] > others[-1][0])):
+            return
+
+        places = [place for place, _ in others]
+        canvas_order: Optional[Dict[int, int]] = None
+        below, below_place = None, None
+        for item in items:
+            position = bisect_right(places, stacking[item])
+            if position and (below is None or places[position - 1] > below_place):
+                first = bisect_left(places, places[position - 1])
+                if position - first == 1:
+                    below = others[position - 1][1]
+                else:
+                    if canvas_order is None:
+                        canvas_order = {canvas_item: index for index, canvas_item in enumerate(self.canvas.find_all())}
+                    below = max((other for _, other in others[first:position]), key=canvas_order.__getitem__)
+
+            if below is None:
+                self.canvas.tag_lower(item)
+            else:
+                self.canvas.tag_raise(item, below)
+            below, below_place = item, stacking[item]
 
 
     
@@ -137,20 +558,83 @@ class  DrawingCanvas:
         """
         Making the erase action.
         """
-        top_left_x = event.x - self.eraser_size
-        top_left_y = event.y - self.eraser_size
-        bottom_right_x = event.x + self.eraser_size
-        bottom_right_y = event.y + self.eraser_size
-        overlap_items = self.canvas.find_overlapping(top_left_x, top_left_y, bottom_right_x, bottom_right_y)
+        self.erase_points([event])
 
-        for item in overlap_items:
-            if "erasable" in self.canvas.gettags(item):
-                self.canvas.delete(item)
-      
+
+
+    def start_erasing(self, event) -> None:
+        """
+        Starts an eraser stroke; everything it erases is undone together.
+        """
+        self.history.begin_batch()
         self.update_eraser_detector(event)
 
 
 
+    def stop_erasing(self, event) -> None:
+        """
+        Ends the eraser stroke.
+        """
+        self.input_coalescer.flush(self.erase_points)
+        self.history.end_batch()
+
+
+
+    def erase_points(self, events: List[Any]) -> None:
+        """
+        Making the erase action along all the eraser positions of a frame.
+        """
+        erased_items = set()
+        radius = self.eraser_size
+        for event in events:
+            for item in self.scene.index.query(event.x - radius, event.y - radius, event.x + radius, event.y + radius):
+                if item not in erased_items and "erasable" in self.scene[item].tags and self.scene.hit_test(item, event.x, event.y, radius):
+
+                    if self.eraser_mode == 'partial' and self.scene[item].kind == 'line':
+                        self.cut_stroke(item, event.x, event.y, radius)
+                    else:
+                        erased_items.add(item)
+
+        self.delete_items(list(erased_items))
+      
+        self.update_eraser_detector(events[-1])
+
+
+
+    def cut_stroke(self, stroke: int, x: float, y: float, radius: float) -> List[int]:
+        """
+        Erases the part of a stroke under the eraser circle.
+        The remaining pieces become new strokes with the same style and stacking place.
+        Returns the strokes that are left.
+        """
+        record = self.scene[stroke]
+        points = record.coords_array()
+        pieces = cut_polyline(points, (x, y), radius + float(record.style.get('width', 1)) / 2)
+        if pieces is None:
+            return [stroke]
+
+        new_strokes = []
+        for piece in pieces:
+            new_stroke = self.draw_record(SceneItem(0, 'line', piece.ravel().tolist(), dict(record.style), record.tags))
+            self.canvas.tag_raise(new_stroke, stroke)
+            self.scene.stack_like(new_stroke, stroke)
+            new_strokes.append(new_stroke)
+
+        self.delete_items([stroke])
+
+        return new_strokes
+
+
+
+    def set_eraser_mode(self, eraser_mode: str) -> None:
+        """
+        Sets whether the eraser removes whole objects ('object'),
+        or cuts only the parts of strokes under it ('partial').
+        """
+        self.eraser_mode = eraser_mode
+
+
+
     def change_eraser_size(self) -> None:
         """
         Open's dialog window to get a new size value from
@@ -180,24 +664,94 @@ class  DrawingCanvas:
 
 
 
+    def restack_item(self, item: int, command: str) -> None:
+        """
+        Raises ('raise') or lowers ('lower') an item with its group to the top or bottom of the stack,
+        in one canvas call. The items of the group keep their order among themselves.
+        """
+        getattr(self.canvas, f"tag_{command}")(self.group_target(item))
+
+        stacking = self.scene.index.stacking
+        members = sorted(self.scene.group_members(item), key=lambda member: stacking.get(member, 0), reverse=(command == 'lower'))
+        self.history.record({'action': 'restack', 'records': [self.scene[member] for member in members],
+                             'stacking': [stacking[member] for member in members]})
+        for member in members:
+            getattr(self.scene, f"{command}_item")(member)
+            self.scene_raster.invalidate(self.scene.bbox(member))
+            if self.journal is not None:
+                self.journal.item_changed(member)
+
+
+
     def fill_with_color(self, event) -> None:
         """
-        Fill feature that can fill shapes, texts and canvas with color.
+        Fill feature that can fill shapes, texts and any region of the drawing with color.
         """
         if self.fill_color:
-            item = self.canvas.find_closest(event.x, event.y)[0]
-            item_tags = self.canvas.gettags(item)
-
-            if 'line' in item_tags:
-                segment_group = self.segment_groups_coord.get(item, [])
-                if self.is_shape_closed(segment_group):
-                    self.canvas.create_polygon(segment_group, outline="black", fill=self.fill_color, tags=("movable", "erasable", "shape"))
+            item = self.item_at(event.x, event.y)
+            item_tags = self.scene[item].tags if item else ()
 
-            elif 'shape' in item_tags or 'text_box' in item_tags:
+            if 'shape' in item_tags or 'text_box' in item_tags:
                 self.canvas.itemconfig(item, fill=self.fill_color)
+                self.index_item(item)
 
             else:
-                self.canvas.config(bg=self.fill_color)
+                self.bucket_fill(event.x, event.y, self.fill_color)
+
+
+
+    def bucket_fill(self, x: int, y: int, color: str) -> Optional[int]:
+        """
+        Fills the region of similar color around the point, as it's seen on the canvas.
+        The scene is rasterized off-screen (only the parts changed since the last fill are rendered again),
+        and the filled region is placed on the canvas as a single image item.
+        """
+        pixels = self.scene_raster.render()
+        if not (0 <= x < pixels.shape[1] and 0 <= y < pixels.shape[0]):
+            return None
+
+        under_item = self.item_at(x, y, halo=0)
+        mask, left, top = flood_fill_mask(pixels, x, y, self.fill_tolerance)
+
+        fill_image = Image.new('RGBA', (mask.shape[1], mask.shape[0]), self.scene_raster.color(color))
+        fill_image.putalpha(Image.fromarray(mask.view(np.uint8) * 255, 'L'))
+
+        self.history.begin_batch()
+        fill_id = self.create_fill_image(fill_image, left, top)
+        if under_item is None:
+            self.restack_item(fill_id, 'lower')
+        self.history.end_batch()
+
+        return fill_id
+
+
+
+    def create_fill_image(self, image: Image.Image, left: float, top: float) -> int:
+        """
+        Places a filled region (RGBA image) on the canvas, with its top left corner at the given point.
+        """
+        return self.draw_record(SceneItem(0, 'image', [left, top], {'anchor': 'nw'}, ("movable", "erasable", "fill"), image))
+
+
+
+    def change_fill_tolerance(self) -> None:
+        """
+        Open's dialog window to get a new fill tolerance value from the user,
+        the maximal difference of a color channel from the clicked pixel.
+        """
+        def update_tolerance() -> None:
+            self.fill_tolerance = int(scale.get())
+            tolerance_dialog.destroy()
+
+        tolerance_dialog = tk.Toplevel()
+        tolerance_dialog.title("Set Fill Tolerance")
+
+        scale = Scale(tolerance_dialog, from_=0, to=255, orient='horizontal', label=f"Currrent Tolerance: {self.fill_tolerance}", length=300)
+        scale.set(self.fill_tolerance)
+        scale.pack(padx=10, pady=10)
+
+        ok_button = Button(tolerance_dialog, text="OK", command=update_tolerance)
+        ok_button.pack()
 
 
 
@@ -212,9 +766,10 @@ class  DrawingCanvas:
 
         if mode == 'eraser':
             self.canvas.itemconfig(self.eraser_detector, state='normal')
-            self.canvas.bind("<B1-Motion>", self.erase)
-            self.canvas.bind("<Motion>", self.update_eraser_detector)
-            self.canvas.bind("<Button-1>", self.update_eraser_detector)
+            self.canvas.bind("<B1-Motion>", self.input_coalescer.wrap(self.erase_points, keep_all=True))
+            self.canvas.bind("<Motion>", self.input_coalescer.wrap(self.update_eraser_detector))
+            self.canvas.bind("<Button-1>", self.start_erasing)
+            self.canvas.bind("<ButtonRelease-1>", self.stop_erasing)
 
         if mode == 'brush':
             self.begin_drawing()
@@ -234,26 +789,16 @@ class  DrawingCanvas:
         Used for starting again from blank canvas.
         """
         self.canvas.delete("all")
+        self.eraser_detector = self.canvas.create_oval(0, 0, 0, 0, outline="black", fill='white', state="hidden")
+        self.scene.clear()
+        self.photo_images = {}
+        self.scene_raster.invalidate()
+        self.history.clear()
+        if self.journal is not None:
+            self.journal.cleared()
 
         self.is_drawing = False
         self.start_x, self.start_y = None, None
-        self.current_segment = []
-        self.item_to_segment_group = {}
+        self.current_stroke = None
         self.set_mode('brush')
-    
-
-
-    def is_shape_closed(self, points: List[Tuple[int, int]]) -> bool:
-        """
-        Determine if the shape is closed based on the distance between the first and last points.
-        """
-        if len(points) < 3:
-            return False
-
-        start_x, start_y = points[0]
-        end_x, end_y = points[-1]
-
-        distance = ((end_x - start_x) ** 2 + (end_y - start_y) ** 2) ** 0.5
-
-        return distance <= 10
 
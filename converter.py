@@ -0,0 +1,155 @@
+import glob
+import math
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from PIL import ImageColor
+from drawing_file import read_document
+from export_pipeline import EXPORT_EXTENSIONS
+from file_manager import FileManager
+from scene import SceneItem
+from scene_raster import font_to_pil, TEXT_ANCHORS
+from spatial_index import BBox
+from tiled_export import TiledExport
+
+
+CANVAS_SIZE = (800, 600)
+
+
+
+def color_rgb(color: str) -> Tuple[int, int, int]:
+    """
+    Resolves a Tk color without Tk: '#rgb' and '#rrggbb', the color names (which Tk also takes with spaces,
+    like 'light blue'), and the gray levels 'gray0' to 'gray100'.
+    """
+    name = color.replace(' ', '').lower()
+    level = re.fullmatch(r'gr[ae]y(\d{1,3})', name)
+    if level:
+        value = round(min(100, int(level.group(1))) * 255 / 100)
+        return value, value, value
+    return ImageColor.getrgb(name)[:3]
+
+
+
+def record_bbox(record: SceneItem, fonts: Dict[str, Any]) -> BBox:
+    """
+    Computes the bounding box of a record as the canvas would: with half the line width around shapes,
+    the size of an image around its anchor, and the extent of a text in its font.
+    """
+    style = record.style
+    if record.kind == 'image':
+        width, height = record.image.size
+        x, y = record.coords[0], record.coords[1]
+        if style.get('anchor', 'center') == 'center':
+            x, y = x - width // 2, y - height // 2
+        return x, y, x + width, y + height
+
+    if record.kind == 'text':
+        font = style.get('font', 'Arial 12')
+        if font not in fonts:
+            fonts[font] = font_to_pil(font)[0]
+        left, top, right, bottom = fonts[font].getbbox(style.get('text', ''), anchor=TEXT_ANCHORS.get(style.get('anchor'), 'mm'))
+        x, y = record.coords[0], record.coords[1]
+        return x + left, y + top, x + right, y + bottom
+
+    xs, ys = record.coords[0::2], record.coords[1::2]
+    margin = float(style.get('width') or 1) / 2 + 1
+    return min(xs) - margin, min(ys) - margin, max(xs) + margin, max(ys) + margin
+
+
+
+def read_records(file_path: str) -> Tuple[List[SceneItem], List[BBox]]:
+    """
+    Reads a saved drawing into records, from the bottom of the stack to the top, and their bounding boxes, without Tk.
+    """
+    data = read_document(file_path)
+    styles = data.get('styles', [])
+    records = [FileManager.item_record(item_data, styles) for item_data in data.get('drawings', [])]
+    records += [FileManager.item_record(dict(image_data, type='image')) for image_data in data.get('images', [])]
+    records = [record for record in records if record is not None]
+
+    fonts: Dict[str, Any] = {}
+    return records, [record_bbox(record, fonts) for record in records]
+
+
+
+def convert_file(input_path: str, output_path: str, export_format: str, scale: float) -> Dict[str, Any]:
+    """
+    Renders a saved drawing into an image file, at a scale of the canvas. Runs in a worker process.
+    The canvas is the size of the program's, or larger if the drawing goes beyond it; the background is white,
+    as it isn't saved with the drawing.
+    Returns the paths, the size of the image, the time it took (ms), and the error if it failed.
+    """
+    start = time.perf_counter()
+    result: Dict[str, Any] = {'input': input_path, 'output': output_path, 'size': (0, 0), 'error': None}
+    try:
+        records, bboxes = read_records(input_path)
+        canvas_size = (max([CANVAS_SIZE[0]] + [math.ceil(bbox[2]) for bbox in bboxes]),
+                       max([CANVAS_SIZE[1]] + [math.ceil(bbox[3]) for bbox in bboxes]))
+
+        tiled_export = TiledExport(scale=scale, workers=1)
+        tiled_export.set_drawing(records, bboxes, color_rgb, 'white', canvas_size)
+        tiled_export.write(output_path, export_format)
+        result['size'] = tiled_export.size
+    except Exception as error:
+        result['error'] = f"{type(error).__name__}: {error}"
+
+    result['ms'] = (time.perf_counter() - start) * 1000
+    return result
+
+
+
+def output_paths_of(input_paths: List[str], export_format: str, output_directory: Optional[str]) -> List[str]:
+    """
+    Names the image of each drawing after it, in the output directory or next to it.
+    Drawings that would get the same name (like a.json and a.gdraw) keep their extension in it too.
+    """
+    extension = EXPORT_EXTENSIONS[export_format]
+    paths = [os.path.join(output_directory or os.path.dirname(path), os.path.splitext(os.path.basename(path))[0]) for path in input_paths]
+    return [(path if paths.count(path) == 1 else path + os.path.splitext(input_path)[1]) + extension
+            for path, input_path in zip(paths, input_paths)]
+
+
+
+def convert(patterns: Sequence[str], export_format: str ='PNG', scale: float =1.0, output_directory: Optional[str] =None,
+            workers: Optional[int] =None) -> int:
+    """
+    Converts the saved drawings matched by the patterns (paths or globs, ** included) to image files,
+    on a pool of worker processes, without a display. Prints each file with its time, and a summary of the throughput.
+    Returns the exit status: 0, or 1 if any file failed or nothing matched.
+    """
+    input_paths = sorted({path for pattern in patterns for path in (glob.glob(pattern, recursive=True) or [pattern])})
+    input_paths = [path for path in input_paths if os.path.isfile(path)]
+    if not input_paths:
+        print("No drawings matched.")
+        return 1
+    if output_directory:
+        os.makedirs(output_directory, exist_ok=True)
+
+    workers = max(1, workers or os.cpu_count() or 1)
+    jobs = [(input_path, output_path, export_format, scale)
+            for input_path, output_path in zip(input_paths, output_paths_of(input_paths, export_format, output_directory))]
+    start = time.perf_counter()
+    results = []
+
+    def report(result: Dict[str, Any]) -> None:
+        results.append(result)
+        status = f"failed: {result['error']}" if result['error'] else f"{result['size'][0]}x{result['size'][1]}"
+        print(f"{result['input']} -> {result['output']}  {status}  {result['ms']:.0f} ms", flush=True)
+
+    if workers == 1:
+        for job in jobs:
+            report(convert_file(*job))
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            for future in as_completed([pool.submit(convert_file, *job) for job in jobs]):
+                report(future.result())
+
+    elapsed = time.perf_counter() - start
+    failed = sum(1 for result in results if result['error'])
+    megapixels = sum(result['size'][0] * result['size'][1] for result in results) / 1e6
+    print(f"{len(results) - failed} converted, {failed} failed in {elapsed:.2f} s on {workers} processes: "
+          f"{len(results) / elapsed:.1f} files/s, {megapixels / elapsed:.1f} megapixels/s")
+    return 1 if failed else 0
@@ -0,0 +1,212 @@
+import base64
+import json
+import lzma
+import struct
+import zlib
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+import numpy as np
+
+
+MAGIC = b'GDRAW'
+VERSION = 1
+EXTENSION = '.gdraw'
+COMPRESSIONS = {'none': 0, 'zlib': 1, 'lzma': 2}
+HEADER = struct.Struct('<5sBBd')
+CHUNK_SIZE = 2 ** 20
+
+
+
+class CompressedWriter:
+    """
+    Writes to a file through a streaming compressor, so the whole file is never held in memory.
+    """
+    def __init__(self, file: BinaryIO, compression: str) -> None:
+        """
+        A constructor of the compressed writer.
+        """
+        self.file = file
+        if compression == 'zlib':
+            self.compressor = zlib.compressobj(6)
+        elif compression == 'lzma':
+            self.compressor = lzma.LZMACompressor()
+        else:
+            self.compressor = None
+
+
+
+    def write(self, data: bytes) -> None:
+        self.file.write(self.compressor.compress(data) if self.compressor else data)
+
+
+    def write_block(self, data: bytes) -> None:
+        """
+        Writes data with its length before it.
+        """
+        self.write(struct.pack('<I', len(data)))
+        self.write(data)
+
+
+    def close(self) -> None:
+        if self.compressor:
+            self.file.write(self.compressor.flush())
+
+
+
+class CompressedReader:
+    """
+    Reads from a file through a streaming decompressor, one chunk at a time.
+    """
+    def __init__(self, file: BinaryIO, compression: str) -> None:
+        """
+        A constructor of the compressed reader.
+        """
+        self.file = file
+        if compression == 'zlib':
+            self.decompressor = zlib.decompressobj()
+        elif compression == 'lzma':
+            self.decompressor = lzma.LZMADecompressor()
+        else:
+            self.decompressor = None
+        self.buffer = bytearray()
+
+
+
+    def read(self, size: int) -> bytes:
+        """
+        Returns exactly size bytes, or raises ValueError if the file ends before.
+        """
+        while len(self.buffer) < size:
+            chunk = self.file.read(CHUNK_SIZE)
+            if not chunk:
+                raise ValueError("The drawing file is truncated.")
+            self.buffer += self.decompressor.decompress(chunk) if self.decompressor else chunk
+
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+
+    def read_block(self) -> bytes:
+        return self.read(struct.unpack('<I', self.read(4))[0])
+
+
+    def read_array(self, dtype: str, count: int, shuffled: bool =False) -> np.ndarray:
+        """
+        Reads an array of count values, which were written by byte planes if shuffled.
+        """
+        itemsize = np.dtype(dtype).itemsize
+        data = np.frombuffer(self.read(itemsize * count), dtype=np.uint8)
+        if shuffled:
+            data = data.reshape(itemsize, count).T.copy()
+        return data.view(dtype).reshape(count)
+
+
+
+def write_drawing(file_path: str, items_data: List[Dict[str, Any]], images_data: List[Dict[str, Any]], styles: List[Dict[str, Any]],
+                  compression: str ='zlib', coordinate_step: Optional[float] =None, progress: Optional[Callable[[float], None]] =None) -> None:
+    """
+    Writes the data collected by FileManager.objects_data_collector to a binary drawing file.
+    The header (magic, version, compression and coordinate step) isn't compressed; the rest is one compressed stream of:
+    the style table (JSON, where the types, tags and colors of all the items are kept once),
+    the style ID and coords count of every item (uint32 arrays), all the coords in one packed array
+    (written by byte planes: the first bytes of all the values, then the second ones and so on, which compress better),
+    the filled regions as PNG blocks, and the uploaded images (JSON).
+    The coords are float32, or with a coordinate step, fixed-point int32 multiples of the step,
+    stored as the difference from the previous coord of the same axis (small numbers that compress well).
+    progress, if given, is called with the fraction of the file that's written.
+    """
+    if progress is None:
+        progress = lambda fraction: None
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+
+    counts = np.array([len(item_data['coords']) for item_data in items_data], dtype='<u4')
+    style_ids = np.array([item_data['style'] for item_data in items_data], dtype='<u4')
+    coords = np.fromiter((coord for item_data in items_data for coord in item_data['coords']), dtype=float, count=int(counts.sum()))
+
+    if coordinate_step:
+        fixed = np.round(coords / coordinate_step).astype('<i4')
+        packed = fixed.copy()
+        packed[2:] -= fixed[:-2]
+    else:
+        packed = coords.astype('<f4')
+    progress(0.2)
+
+    with open(file_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, COMPRESSIONS[compression], coordinate_step or 0.0))
+        writer = CompressedWriter(file, compression)
+
+        writer.write_block(json.dumps(styles, separators=(',', ':')).encode('utf-8'))
+        writer.write(struct.pack('<I', len(items_data)))
+        writer.write(style_ids.tobytes())
+        writer.write(counts.tobytes())
+        writer.write(packed.view(np.uint8).reshape(-1, 4).T.tobytes())
+        progress(0.8)
+
+        fills = [(index, item_data) for index, item_data in enumerate(items_data) if 'fill_image' in item_data]
+        writer.write(struct.pack('<I', len(fills)))
+        for done, (index, item_data) in enumerate(fills, 1):
+            writer.write(struct.pack('<I', index))
+            writer.write_block(base64.b64decode(item_data['fill_image']))
+            progress(0.8 + 0.2 * done / len(fills))
+
+        writer.write_block(json.dumps(images_data, separators=(',', ':')).encode('utf-8'))
+        writer.close()
+
+
+
+def read_drawing(file_path: str) -> Dict[str, Any]:
+    """
+    Reads a binary drawing file written by write_drawing, and returns its data in the form the JSON files have:
+    {'styles': [...], 'drawings': [...], 'images': [...]}.
+    """
+    with open(file_path, 'rb') as file:
+        header = file.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError("The file isn't a drawing file.")
+
+        magic, version, compression_id, coordinate_step = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError("The file isn't a drawing file.")
+        if version > VERSION:
+            raise ValueError(f"The drawing file has version {version}, newer than this program supports ({VERSION}).")
+
+        compression = {value: name for name, value in COMPRESSIONS.items()}[compression_id]
+        reader = CompressedReader(file, compression)
+
+        styles = json.loads(reader.read_block().decode('utf-8'))
+        item_count = struct.unpack('<I', reader.read(4))[0]
+        style_ids = reader.read_array('<u4', item_count).tolist()
+        counts = reader.read_array('<u4', item_count)
+        total = int(counts.sum())
+
+        if coordinate_step:
+            fixed = reader.read_array('<i4', total, shuffled=True).astype(np.int64)
+            for axis in (0, 1):
+                fixed[axis::2] = np.cumsum(fixed[axis::2])
+            coords = fixed * coordinate_step
+        else:
+            coords = reader.read_array('<f4', total, shuffled=True).astype(float)
+
+        flat_coords = coords.tolist()
+        ends = np.cumsum(counts).tolist()
+        items_data = [{'style': style_id, 'coords': flat_coords[end - count:end]} for style_id, count, end in zip(style_ids, counts.tolist(), ends)]
+
+        for _ in range(struct.unpack('<I', reader.read(4))[0]):
+            index = struct.unpack('<I', reader.read(4))[0]
+            items_data[index]['fill_image'] = base64.b64encode(reader.read_block()).decode('ascii')
+
+        images_data = json.loads(reader.read_block().decode('utf-8'))
+
+    return {'styles': styles, 'drawings': items_data, 'images': images_data}
+
+
+
+def read_document(file_path: str) -> Dict[str, Any]:
+    """
+    Reads a saved drawing, binary (by its extension) or JSON, in the form the JSON files have.
+    """
+    if file_path.endswith(EXTENSION):
+        return read_drawing(file_path)
+    with open(file_path, 'r') as file:
+        return json.load(file)
@@ -0,0 +1,166 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from tkinter import messagebox
+from typing import Any, Dict, List, Optional, Tuple
+from background_job import ProgressWindow
+from drawing_file import read_document
+from input_coalescer import DEFAULT_FRAME_RATE
+from scene import paused_gc
+
+
+FRAME_BUDGET_MS = 1000 / DEFAULT_FRAME_RATE / 2
+POLL_INTERVAL_MS = 50
+IMAGE_WORKERS = 4
+
+
+
+class DrawingLoader:
+    """
+    Loads a drawing file without freezing the window: a worker thread parses the file, a pool of threads
+    decodes its images (PIL lets go of the interpreter lock while it decodes), and the main thread creates
+    the items in chunks that take half a frame each, scheduled with after, so the canvas fills in
+    as the window keeps responding. The items are created in the order of the file, so an item whose image
+    isn't decoded yet waits for it.
+    The garbage collector is paused while each chunk is created (see paused_gc).
+    The time to the first chunk of items (first_paint_ms) and the total load time (total_ms) are kept.
+    """
+    def __init__(self, file_manager, file_path: str, frame_budget_ms: float =FRAME_BUDGET_MS) -> None:
+        """
+        A constructor of the drawing loader.
+        """
+        self.file_manager = file_manager
+        self.drawing_canvas = file_manager.canvas
+        self.file_path = file_path
+        self.frame_budget = frame_budget_ms / 1000
+
+        self.pool = ThreadPoolExecutor(max_workers=IMAGE_WORKERS)
+        self.entries: Optional[List[Tuple[Dict[str, Any], Optional[Future]]]] = None
+        self.styles: List[Dict[str, Any]] = []
+        self.error: Optional[Exception] = None
+        self.created = 0
+        self.creating = False
+        self.cancelled = False
+        self.finished = False
+        self.window: Optional[ProgressWindow] = None
+
+        self.start_time = 0.0
+        self.first_paint_ms: Optional[float] = None
+        self.total_ms: Optional[float] = None
+
+
+
+    def start(self, show_window: bool =True) -> None:
+        """
+        Starts parsing the file on a worker thread, and creating the items as they're ready.
+        """
+        self.start_time = time.perf_counter()
+        if show_window:
+            self.window = ProgressWindow(self.drawing_canvas.canvas, "Loading", self.cancel)
+        threading.Thread(target=self.parse, daemon=True).start()
+        self.drawing_canvas.canvas.after(POLL_INTERVAL_MS, self.step)
+
+
+
+    def parse(self) -> None:
+        """
+        The worker thread: reads the file, and sends the images of its items to be decoded.
+        """
+        try:
+            data = read_document(self.file_path)
+            entries = [(item_data, self.decode(item_data)) for item_data in data.get('drawings', [])]
+            for image_data in data.get('images', []):
+                image_data = dict(image_data, type='image')
+                entries.append((image_data, self.decode(image_data)))
+
+            self.styles = data.get('styles', [])
+            self.entries = entries
+        except Exception as error:
+            self.error = error
+
+
+
+    def decode(self, item_data: Dict[str, Any]) -> Optional[Future]:
+        """
+        Sends the image of an item to the pool, if it has one: a filled region, or an uploaded image.
+        """
+        if self.cancelled:
+            return None
+        if 'fill_image' in item_data:
+            return self.pool.submit(self.file_manager.decode_image, item_data['fill_image'])
+        if item_data.get('type') == 'image':
+            item_data['transform'] = self.file_manager.image_source(item_data['path'], item_data.get('transform'))
+            return self.pool.submit(self.file_manager.read_image, item_data['transform'])
+        return None
+
+
+
+    def step(self) -> None:
+        """
+        Creates the next chunk of items on the main thread, for as long as the frame budget allows, and schedules the next one.
+        The canvas is cleared only when the file is parsed, so a file that fails to parse doesn't lose the drawing.
+        """
+        if self.finished:
+            return
+        if self.error is not None:
+            self.finish(f"Failed to load canvas data. Error: {self.error}")
+            return
+        if self.entries is None:
+            self.drawing_canvas.canvas.after(POLL_INTERVAL_MS, self.step)
+            return
+
+        if not self.creating:
+            self.creating = True
+            self.drawing_canvas.reset_canvas()
+
+        entries = self.entries
+        deadline = time.perf_counter() + self.frame_budget
+        try:
+            with paused_gc():
+                while self.created < len(entries) and time.perf_counter() < deadline:
+                    item_data, image = entries[self.created]
+                    if image is not None and not image.done():
+                        break
+                    self.file_manager.create_item(item_data, self.styles, image.result() if image is not None else None)
+                    self.created += 1
+        except Exception as error:
+            self.finish(f"Failed to load canvas data. Error: {error}")
+            return
+
+        if self.first_paint_ms is None and self.created:
+            self.first_paint_ms = (time.perf_counter() - self.start_time) * 1000
+
+        if self.created == len(entries):
+            self.finish()
+            return
+
+        if self.window is not None:
+            self.window.show(self.created / len(entries))
+        self.drawing_canvas.canvas.after(1, self.step)
+
+
+
+    def cancel(self) -> None:
+        """
+        Stops the loading. If the items were being created, the ones created so far are cleared.
+        """
+        self.cancelled = True
+        if not self.finished:
+            if self.creating:
+                self.drawing_canvas.reset_canvas()
+            self.finish()
+
+
+
+    def finish(self, error: Optional[str] =None) -> None:
+        self.finished = True
+        self.total_ms = (time.perf_counter() - self.start_time) * 1000
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        if self.window is not None:
+            self.window.close()
+            self.window = None
+
+        if self.creating:
+            self.drawing_canvas.history.clear()
+        if error:
+            messagebox.showerror("Error", error)
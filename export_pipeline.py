@@ -0,0 +1,147 @@
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from PIL import Image, features
+
+
+EXPORT_EXTENSIONS = {'JPEG': '.jpeg', 'GIF': '.gif', 'PNG': '.png', 'WEBP': '.webp'}
+PALETTE_CACHE_SIZE = 8
+
+encoder_pool: Optional[ProcessPoolExecutor] = None
+
+
+
+def export_formats() -> Tuple[str, ...]:
+    """
+    The formats the pipeline can encode; WebP only when PIL was built with it.
+    """
+    return tuple(export_format for export_format in EXPORT_EXTENSIONS if export_format != 'WEBP' or features.check('webp'))
+
+
+
+def encode_export(image: Image.Image, export_format: str, options: Dict[str, Any]) -> Tuple[bytes, float]:
+    """
+    Encodes an image in a format and returns the bytes of the file and the time it took (ms). Runs in a worker process.
+    """
+    start = time.perf_counter()
+    buffer = io.BytesIO()
+    image.save(buffer, format=export_format, **options)
+    return buffer.getvalue(), (time.perf_counter() - start) * 1000
+
+
+
+def shared_encoder_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Returns the pool of encoder processes, started once and kept for the session, so only the first export waits for it.
+    Its processes are spawned, so they don't inherit Tk.
+    """
+    global encoder_pool
+    if encoder_pool is None:
+        encoder_pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+    return encoder_pool
+
+
+
+class PaletteCache:
+    """
+    Adaptive GIF palettes kept with the colors of the image they were made for: a bitmap of the 24-bit colors
+    of all its pixels. A palette is reused for an image that has no colors its image didn't have
+    (moves, strokes in the colors the drawing already had, strokes that cover part of a photo),
+    and quantizing then only maps the pixels to it. Any new color, even of one pixel, makes a new palette.
+    """
+    def __init__(self, size: int =PALETTE_CACHE_SIZE) -> None:
+        """
+        A constructor of the palette cache.
+        """
+        self.size = size
+        self.palettes: List[Tuple[np.ndarray, Image.Image]] = []
+        self.hits = 0
+        self.misses = 0
+
+
+
+    @staticmethod
+    def colors_of(image: Image.Image) -> np.ndarray:
+        """
+        Returns the colors of an RGB image as a packed bitmap of the 2 ** 24 colors (2 MB).
+        """
+        pixels = np.asarray(image).astype(np.uint32)
+        present = np.zeros(1 << 24, dtype=bool)
+        present[((pixels[..., 0] << 16) | (pixels[..., 1] << 8) | pixels[..., 2]).ravel()] = True
+        return np.packbits(present)
+
+
+
+    def quantize(self, image: Image.Image) -> Image.Image:
+        """
+        Converts an RGB image to 256 colors, with a cached palette if there is one for its colors.
+        """
+        colors = self.colors_of(image)
+        for index, (palette_colors, palette) in enumerate(self.palettes):
+            if not np.any(colors & ~palette_colors):
+                self.palettes.insert(0, self.palettes.pop(index))
+                self.hits += 1
+                return image.quantize(palette=palette, dither=Image.Dither.NONE)
+
+        self.misses += 1
+        quantized = image.quantize(256)
+        self.palettes.insert(0, (colors, quantized))
+        del self.palettes[self.size:]
+        return quantized
+
+
+
+class ExportPipeline:
+    """
+    Encodes one rendered image in several formats at once: the encoders run in parallel in a pool of processes
+    (or one after the other on this thread when there's a single core), and GIF palettes come from a PaletteCache.
+    options holds the encoder options of each format, like JPEG's quality and progressive.
+    The time of each stage is kept in timings (ms): quantize, and encode for each format.
+    """
+    def __init__(self, workers: Optional[int] =None) -> None:
+        """
+        A constructor of the export pipeline.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.options: Dict[str, Dict[str, Any]] = {'JPEG': {'quality': 75, 'progressive': False, 'optimize': False},
+                                                   'GIF': {}, 'PNG': {'compress_level': 6}, 'WEBP': {'quality': 80, 'method': 4}}
+        self.palette_cache = PaletteCache()
+        self.timings: Dict[str, float] = {}
+
+
+
+    def encode(self, image: Image.Image, formats: Sequence[str], progress: Optional[Callable[[float], None]] =None) -> Dict[str, bytes]:
+        """
+        Encodes an RGB image in each of the formats and returns the bytes of each file.
+        """
+        self.timings = {}
+        images = {}
+        for export_format in formats:
+            if export_format not in EXPORT_EXTENSIONS:
+                raise ValueError(f"Unknown export format: {export_format}")
+            if export_format == 'GIF':
+                start = time.perf_counter()
+                images[export_format] = self.palette_cache.quantize(image)
+                self.timings['quantize'] = (time.perf_counter() - start) * 1000
+            else:
+                images[export_format] = image
+
+        encoded: Dict[str, bytes] = {}
+        if self.workers <= 1 or len(formats) == 1:
+            results = (encode_export(images[export_format], export_format, self.options[export_format]) for export_format in formats)
+        else:
+            pool = shared_encoder_pool(self.workers)
+            futures = [pool.submit(encode_export, images[export_format], export_format, self.options[export_format]) for export_format in formats]
+            results = (future.result() for future in futures)
+
+        for done, (export_format, (data, encode_ms)) in enumerate(zip(formats, results), 1):
+            encoded[export_format] = data
+            self.timings[f'encode {export_format}'] = encode_ms
+            if progress:
+                progress(done / len(formats))
+
+        return encoded
@@ -1,9 +1,46 @@
 from tkinter.simpledialog import askinteger
 from tkinter import filedialog, messagebox
-from PIL import Image, ImageDraw, ImageFont, ImageTk
-from typing import Tuple, List, Dict, Any, Optional
+from PIL import Image
+from typing import Tuple, List, Dict, Any, Optional, Callable
+import base64
+import io
 import json
+import os
+import stat
+import tempfile
+import time
 from canvas import DrawingCanvas
+from scene import SceneItem
+from drawing_file import write_drawing, EXTENSION
+from background_job import BackgroundJob
+from drawing_loader import DrawingLoader
+from tiled_export import TiledExport
+from export_pipeline import ExportPipeline, EXPORT_EXTENSIONS
+from image_transform import new_source, render_image, transformed
+
+
+FILE_TYPES = [("JSON files", "*.json"), ("Drawing files", f"*{EXTENSION}")]
+IMAGE_SIZE = (400, 400)
+JSON_SLICE = 1000
+PROGRESS_STEP = 4096
+
+
+
+def current_umask() -> int:
+    """
+    Returns the umask of the process. Linux shows it in /proc; elsewhere it can only be read by setting it,
+    which for a moment changes it for the other threads too.
+    """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except OSError:
+        pass
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
 
 
 
@@ -15,119 +52,202 @@ class FileManager:
     def __init__(self, my_canvas: DrawingCanvas) -> None:
         """
         A constructor for the file manager.
+        Drawings saved in the binary format are compressed with binary_compression ('zlib', 'lzma' or 'none'),
+        and their coords are rounded to multiples of coordinate_step, if it's set.
         """
         self.canvas = my_canvas
-        self.uploaded_images: Dict[int, Dict[str, Any]] = {}
+        self.binary_compression = 'zlib'
+        self.coordinate_step: Optional[float] = None
+        self.snapshot_ms = 0.0
+        self.export_pipeline = ExportPipeline()
+        self.export_timings: Dict[str, float] = {}
+        self.loader: Optional[DrawingLoader] = None
 
 
-    def objects_data_collector(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    def objects_data_collector(self, records: Optional[List[SceneItem]] =None,
+                               progress: Optional[Callable[[float], None]] =None) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[Dict[str, Any]]]:
         """
-        Collects all the data of the objects places on the canvas,
+        Collects all the data of the objects placed on the canvas from the scene records (or from a snapshot of them),
         for later creation.
+        Items of the same type, tags and options share one entry of a style table, and reference it by its index.
+        progress, if given, is called with the fraction of the records that are collected.
         """
         items_data = []
         images_data = []
+        styles: List[Dict[str, Any]] = []
+        style_ids: Dict[Tuple[Any, ...], int] = {}
+
+        def style_id(record: SceneItem) -> int:
+            key = (record.kind, record.tags, *record.style.items())
+            if key not in style_ids:
+                style_ids[key] = len(styles)
+                styles.append({'type': record.kind, 'tags': record.tags, 'config': record.style})
+            return style_ids[key]
+
+        if records is None:
+            records = self.canvas.scene.ordered()
 
-        for item in self.canvas.canvas.find_all():
-            item_tags = self.canvas.canvas.gettags(item)
-            item_type = self.canvas.canvas.type(item)
-            item_config = self.get_item_config(item, item_type)
+        for index, record in enumerate(records):
+            if progress and index % PROGRESS_STEP == 0:
+                progress(index / len(records))
 
-            if "image" in item_tags:
+            if "image" in record.tags:
                 images_data.append({
-                    'image_id': item,
-                    'path': self.uploaded_images[item]['path'],
-                    'coords': self.canvas.canvas.coords(item)})                
+                    'image_id': record.id,
+                    'path': record.source['path'],
+                    'coords': list(record.coords),
+                    'transform': {key: value for key, value in record.source.items() if key != 'path'}})
+            elif "fill" in record.tags:
+                items_data.append({
+                    'image_id': record.id,
+                    'style': style_id(record),
+                    'coords': list(record.coords),
+                    'fill_image': self.encode_image(record.image)})
             else:
                 items_data.append({
-                    'type': item_type,
-                    'coords': self.canvas.canvas.coords(item),
-                    'tags': item_tags,
-                    'config': item_config})
+                    'style': style_id(record),
+                    'coords': record.coords.tolist() if record.kind == 'line' else list(record.coords)})
 
                 
-        return items_data, images_data
+        return items_data, images_data, styles
 
 
 
 
-    def get_item_config(self, item, item_type):
+    def save_to_file(self) -> None:
         """
-        This methods creates a dictonary with the configures details of the objects.
+        Making saving file dialog with the user.
+        Saves the canvas's data for later continious editing, as JSON or in the compact binary format.
+        Only a snapshot of the records is taken here; collecting and writing them runs in the background,
+        so the user can keep drawing.
         """
-        config = {option: self.canvas.canvas.itemcget(item, option) for option in self.canvas.canvas.itemconfig(item) if self.canvas.canvas.itemcget(item, option)}
-        if item_type == 'text':
+        file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=FILE_TYPES)
+        if file_path:
 
-            config['text'] = self.canvas.canvas.itemcget(item, 'text')
-            config['font'] = self.canvas.canvas.itemcget(item, 'font')
+            start = time.perf_counter()
+            records = self.canvas.scene.snapshot()
+            self.snapshot_ms = (time.perf_counter() - start) * 1000
 
-        return config
+            BackgroundJob(self.canvas.canvas, "Saving", lambda progress: self.write_file(file_path, records, progress),
+                          on_done=lambda result: messagebox.showinfo("Success", "Canvas saved successfully."),
+                          on_error=lambda error: messagebox.showerror("Error", f"Failed to save canvas. Error: {error}")).start()
 
 
 
+    def write_file(self, file_path: str, records: List[SceneItem], progress: Callable[[float], None]) -> None:
+        """
+        Collects a snapshot of the records and writes it as JSON or in the binary format (by the extension of the path).
+        It doesn't touch Tk.
+        """
+        items_data, images_data, styles = self.objects_data_collector(records, lambda fraction: progress(fraction / 2))
 
-    def save_to_file(self) -> None:
+        if file_path.endswith(EXTENSION):
+            self.replace_file(file_path, lambda path: write_drawing(path, items_data, images_data, styles, self.binary_compression,
+                                                                    self.coordinate_step, lambda fraction: progress(0.5 + fraction / 2)))
+        else:
+            self.replace_file(file_path, lambda path: self.write_json(path, items_data, images_data, styles,
+                                                                      lambda fraction: progress(0.5 + fraction / 2)))
+
+
+
+    @staticmethod
+    def write_json(file_path: str, items_data: List[Dict[str, Any]], images_data: List[Dict[str, Any]], styles: List[Dict[str, Any]],
+                   progress: Optional[Callable[[float], None]] =None) -> None:
         """
-        Making saving file dialog with the user.
-        Saves the canvas's data for later continious editing.
+        Writes what json.dump would, with the drawings encoded a slice at a time, calling progress between the slices.
         """
-        items_data, images_data = self.objects_data_collector()
-        file_path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("JSON files", "*.json")])
-        if file_path:
+        def dumps(data: Any) -> str:
+            return json.dumps(data, separators=(',', ':'))
+
+        with open(file_path, 'w') as file:
+            file.write('{"styles":' + dumps(styles) + ',"drawings":[')
+            for start in range(0, len(items_data), JSON_SLICE):
+                if start:
+                    file.write(',')
+                file.write(dumps(items_data[start:start + JSON_SLICE])[1:-1])
+                if progress:
+                    progress(min(1.0, (start + JSON_SLICE) / len(items_data)))
+            file.write('],"images":' + dumps(images_data) + '}')
 
-            try:
-                with open(file_path, 'w') as file:
-                    json.dump({'drawings': items_data, 'images': images_data}, file, indent=4)
-                messagebox.showinfo("Success", "Canvas saved successfully.")
 
-            except Exception as error:
-                messagebox.showerror("Error", f"Failed to save canvas. Error: {error}")
+
+    @staticmethod
+    def replace_file(file_path: str, write: Callable[[str], None]) -> None:
+        """
+        Writes a file aside and then moves it in place, so a cancelled or failed write leaves the old file as it was.
+        The file keeps the permissions of the file it replaces, and a new file gets those of the umask
+        (mkstemp makes it readable only by its owner).
+        """
+        handle, temporary_path = tempfile.mkstemp(suffix='.part', dir=os.path.dirname(os.path.abspath(file_path)))
+        os.close(handle)
+        try:
+            write(temporary_path)
+            try:
+                mode = stat.S_IMODE(os.stat(file_path).st_mode)
+            except FileNotFoundError:
+                mode = 0o666 & ~current_umask()
+            os.chmod(temporary_path, mode)
+            os.replace(temporary_path, file_path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
 
 
     def load_from_file(self) -> None:
         """
-        Loading data and creation of objects saved in JSON file, to continue editing.
+        Loading data and creation of objects saved in JSON or binary drawing file, to continue editing.
+        The file is loaded progressively by a DrawingLoader, so the window keeps responding.
         """
         response = messagebox.askokcancel("Confirm", "Do you want to save the current canvas?")
         if response:
             self.save_to_file()
 
         else:
-            file_path = filedialog.askopenfilename(filetypes=[("JSON files", "*.json")])
+            file_path = filedialog.askopenfilename(filetypes=FILE_TYPES)
             if file_path:
-
-                try:
-                    with open(file_path, 'r') as file:
-                        items_data = json.load(file)
-                    self.canvas.canvas.delete("all")
-
-                    for item_data in items_data.get('drawings', []):
-                        self.create_item(item_data)
-                    for image_data in items_data.get('images', []):
-                        self.open_image(image_data['path'], image_data['coords'])
-                    
-                except Exception as error:
-                    messagebox.showerror("Error", f"Failed to load canvas data. Error: {error}")
+                self.loader = DrawingLoader(self, file_path)
+                self.loader.start()
 
     
 
 
-    def create_item(self, item_data: Dict[str, Any]) -> None:
+    def create_item(self, item_data: Dict[str, Any], styles: Optional[List[Dict[str, Any]]] =None, image: Optional[Image.Image] =None) -> None:
         """
         Creates objects from data loaded from JSON file.
         """
+        record = self.item_record(item_data, styles, image)
+        if record is not None:
+            self.canvas.draw_record(record)
+
+
+
+    @classmethod
+    def item_record(cls, item_data: Dict[str, Any], styles: Optional[List[Dict[str, Any]]] =None,
+                    image: Optional[Image.Image] =None) -> Optional[SceneItem]:
+        """
+        Makes the record of an item loaded from a file, without touching Tk (the headless converter uses it too).
+        The type, tags and options are taken from the style table, or from the item itself in files saved without one.
+        The image of an image item may be given already decoded; otherwise it's decoded here.
+        """
+        if 'style' in item_data:
+            item_data = dict(styles[item_data['style']], **item_data)
+
         item_type = item_data['type']
         coords = item_data['coords']
-        tags = tuple(item_data['tags'])
-        config = item_data['config']
-        config.pop('tags', None)
 
         if item_type == "image":
-            self.open_image(item_data['path'], coords)
+            if 'fill_image' in item_data:
+                return SceneItem(0, 'image', list(coords), {'anchor': 'nw'}, ("movable", "erasable", "fill"),
+                                 image or cls.decode_image(item_data['fill_image']))
+            source = cls.image_source(item_data['path'], item_data.get('transform'))
+            return cls.image_record(image or cls.read_image(source), source, coords)
 
-        else:
-            if item_type in ['line', 'rectangle', 'oval', 'polygon', 'text', 'triangle']:
-                getattr(self.canvas.canvas, 'create_' + item_type)(coords, **config, tags=tags)
+        tags = tuple(item_data['tags'])
+        config = dict(item_data['config'])
+        config.pop('tags', None)
+        if item_type in ['line', 'rectangle', 'oval', 'polygon', 'text']:
+            return SceneItem(0, item_type, list(coords), config, tags)
+        return None
 
 
 
@@ -143,160 +263,172 @@ class FileManager:
         if not file_path:
             file_path = filedialog.askopenfilename(filetypes=[("Image files", "*.png;*.jpg;*.jpeg;*.gif")])
         if file_path:
-            
-            image_size = (400, 400)
-            image = Image.open(file_path)
-            image.thumbnail(image_size)
-            photo_image = ImageTk.PhotoImage(image)
-            image_id = self.canvas.canvas.create_image(*coords, image=photo_image, anchor='center', tags=("image", "movable"))
-            self.uploaded_images[image_id] = {'photo_image': photo_image, 'path': file_path, 'size': image_size, 'rotation': 0}
-            
-
-    def image_manipulation(self, image_id: int, action: str) -> None:
-        if image_id in self.uploaded_images:
-            image_info = self.uploaded_images[image_id]
-            current_image = image_info.get('current_image') or Image.open(image_info['path'])
-
-            if action == "resize":
-                new_size = askinteger("Resize Image", f"Enter the new width: \n Current: {self.uploaded_images[image_id]['size']}", minvalue=10, maxvalue=1000)
-                if new_size:
-                    current_image = current_image.resize((new_size, new_size))
-                    image_info['size'] = (new_size, new_size)
-
-            if action == "rotate":
-                image_info['rotation'] = (image_info['rotation'] + 90) % 360
-                current_image = current_image.rotate(image_info['rotation'], expand=True)
-            
-            if action == "mirror":
-                current_image = current_image.transpose(Image.FLIP_LEFT_RIGHT)
+            source = self.image_source(file_path)
+            self.place_image(self.read_image(source), source, coords)
 
-        image_info['current_image'] = current_image
-        photo_image = ImageTk.PhotoImage(current_image)
-        self.canvas.canvas.itemconfig(image_id, image=photo_image)
-        self.uploaded_images[image_id]['photo_image'] = photo_image
 
-   
 
-    def export_to_graphic_file(self, export_format: str) -> None:
+    @staticmethod
+    def image_source(file_path: str, transform: Optional[Dict[str, Any]] =None) -> Dict[str, Any]:
         """
-        This method converts the canvas to PIL image, in order
-        to export it to JPEG or GIF files.
+        The source of an uploaded image: its file and the transform composed on it.
+        A new image (or one from a file saved without its transform) is shrunk to fit the size images are placed in.
         """
-        file_ext = ".gif" if export_format == 'GIF' else ".jpeg"
-        file_path = filedialog.asksaveasfilename(defaultextension=file_ext, filetypes=[(f"{export_format} files", f"*{file_ext}")])
-        if not file_path:
-            return
+        if transform is None:
+            return new_source(file_path, IMAGE_SIZE)
+        return dict(transform, path=file_path)
+
+
 
-        items_data, images_data = self.objects_data_collector()
-        canvas_width, canvas_height = self.canvas.canvas.winfo_width(), self.canvas.canvas.winfo_height()
-        canvas_bg = self.canvas.canvas['background']
+    @staticmethod
+    def read_image(source: Dict[str, Any]) -> Image.Image:
+        """
+        Renders an uploaded image from a screen-size proxy of its file, decoded once and then taken from the image cache.
+        It doesn't touch Tk.
+        """
+        return render_image(source)
 
-        pil_image = Image.new('RGB', (canvas_width, canvas_height), canvas_bg)
-        draw = ImageDraw.Draw(pil_image)
 
-        for item_data in items_data:
-            self.draw_item_on_image(draw, item_data)
-        
-        for image_data in images_data:
-            self.paste_image_on_image(pil_image, image_data)
 
+    def place_image(self, image: Image.Image, source: Dict[str, Any], coords: Tuple[int, int]) -> None:
+        self.canvas.draw_record(self.image_record(image, source, coords))
 
-        pil_image.save(file_path, format=export_format.upper())
 
 
+    @staticmethod
+    def image_record(image: Image.Image, source: Dict[str, Any], coords: Tuple[int, int]) -> SceneItem:
+        return SceneItem(0, 'image', list(coords), {'anchor': 'center'}, ("image", "movable"), image, source)
+            
 
-    def draw_item_on_image(self, draw, item_data: Dict[str, Any]) -> None:
+    def image_manipulation(self, image_id: int, action: str) -> None:
         """
-        This method draws all objects on the PIL image.
+        Resizes, rotates or mirrors an uploaded image by composing the edit on its transform,
+        and renders it again from the proxy of its file, so edits cost a small resample and never degrade the image.
         """
-        item_type = item_data['type']
-        coords = item_data['coords']
-        config = item_data.get('config', {})
+        record = self.canvas.scene.get(image_id)
+        if record is None or record.source is None:
+            return
 
+        width = None
+        if action == "resize":
+            width = askinteger("Resize Image", f"Enter the new width: \n Current: {record.source['size'][0]}", minvalue=10, maxvalue=1000)
+            if not width:
+                return
 
-        if item_type == 'text':
-            font, font_size = self.get_font_to_pil(config.get('font', 'Arial 12'))
-            draw.text(coords, config['text'], fill=config.get('fill'), font=font)
-            
+        source = transformed(record.source, action, width)
+        self.canvas.update_image(image_id, self.read_image(source), source)
+
+   
+
+    def export_to_graphic_file(self, *export_formats: str) -> None:
+        """
+        This method exports the canvas to image files, in one or more formats (JPEG, GIF, PNG, WebP).
+        The image comes from the scene raster, which keeps the last rendered drawing
+        and renders again only the tiles that changed since, so exporting again after small edits is quick.
+        The changed tiles are snapshot here, and rendered once and encoded in every format in the background.
+        With several formats the chosen name gets the extension of each one.
+        The time of each stage (collect, render, quantize, encode, write) is kept in export_timings and shown at the end.
+        """
+        extensions = [EXPORT_EXTENSIONS[export_format] for export_format in export_formats]
+        file_path = filedialog.asksaveasfilename(defaultextension=extensions[0],
+                                                 filetypes=[(f"{export_format} files", f"*{extension}") for export_format, extension in zip(export_formats, extensions)])
+        if not file_path:
+            return
+        if len(export_formats) == 1:
+            file_paths = {export_formats[0]: file_path}
         else:
-            draw_method = getattr(self, f"draw_{item_type}", None)
-            if draw_method:
-                draw_method(draw, coords, config)
+            file_paths = {export_format: os.path.splitext(file_path)[0] + extension for export_format, extension in zip(export_formats, extensions)}
 
+        scene_raster = self.canvas.scene_raster
+        start = time.perf_counter()
+        snapshot = scene_raster.snapshot()
+        self.snapshot_ms = (time.perf_counter() - start) * 1000
+        timings = {'collect': self.snapshot_ms}
 
+        def export(progress: Callable[[float], None]) -> None:
+            start = time.perf_counter()
+            pixels = scene_raster.render_snapshot(snapshot, lambda fraction: progress(fraction * 0.5))
+            pil_image = scene_raster.to_image(pixels)
+            timings['render'] = (time.perf_counter() - start) * 1000
 
+            encoded = self.export_pipeline.encode(pil_image, export_formats, lambda fraction: progress(0.5 + fraction * 0.4))
+            timings.update(self.export_pipeline.timings)
 
-    """
-    These methods draw certain shapes on the PIL image.
-    """
-    def draw_line(self, draw, coords: Tuple[int, int], config: Dict[str, Any]) -> None:
-        draw.line(coords, fill=config.get('fill'))
-    def draw_rectangle(self, draw, coords: Tuple[int, int], config: Dict[str, Any]) -> None:
-        draw.rectangle(coords, outline=config.get('outline'), fill=config.get('fill'))
-    def draw_oval(self, draw, coords: Tuple[int, int], config: Dict[str, Any]) -> None:
-        draw.ellipse(coords, outline=config.get('outline'), fill=config.get('fill'))
-    def draw_triangle(self, draw, coords: Tuple[int, int], config: Dict[str, Any]) -> None:
-        draw.polygon(coords, outline=config.get('outline'), fill=config.get('fill'))
-        
+            start = time.perf_counter()
+            for export_format, data in encoded.items():
+                self.replace_file(file_paths[export_format], lambda path: self.write_bytes(path, data))
+            timings['write'] = (time.perf_counter() - start) * 1000
+
+        def done(result: None) -> None:
+            scene_raster.adopt(snapshot)
+            self.export_timings = timings
+            messagebox.showinfo("Success", "Canvas exported to " + ", ".join(os.path.basename(path) for path in file_paths.values()) + ".\n"
+                                + ", ".join(f"{stage} {ms:.0f} ms" for stage, ms in timings.items()))
+
+        def failed(error: Exception) -> None:
+            scene_raster.release(snapshot)
+            messagebox.showerror("Error", f"Failed to export canvas. Error: {error}")
 
+        BackgroundJob(self.canvas.canvas, "Exporting", export, on_done=done,
+                      on_error=failed, on_cancel=lambda: scene_raster.release(snapshot)).start()
 
 
 
-    def paste_image_on_image(self, image, image_data: Dict[str, Any]) -> None:
+    @staticmethod
+    def write_bytes(file_path: str, data: bytes) -> None:
+        with open(file_path, 'wb') as file:
+            file.write(data)
+
+
+
+    def export_for_print(self) -> None:
         """
-        Copies images form canvas to PIL image.
+        Exports the drawing to a PNG or JPEG file at a resolution (DPI) larger than the canvas (96 DPI), for printing.
+        The export is rendered tile by tile in the background by a TiledExport, so its memory stays bounded at any size.
         """
-        image_attr = self.uploaded_images[image_data['image_id']]
-        image_path = image_data['path']
-        coords = image_data['coords']
-        image_size = image_attr['size']
-        rotation = image_attr['rotation']
+        dpi = askinteger("Export For Print", "Resolution in DPI (the canvas is 96 DPI):", initialvalue=300, minvalue=24, maxvalue=2400)
+        if not dpi:
+            return
+        file_path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[("PNG files", "*.png"), ("JPEG files", "*.jpeg;*.jpg")])
+        if not file_path:
+            return
 
-        try:
-           with Image.open(image_path) as img:
+        export_format = 'JPEG' if file_path.lower().endswith(('.jpeg', '.jpg')) else 'PNG'
+        tiled_export = TiledExport(dpi=dpi)
+        start = time.perf_counter()
+        tiled_export.take_snapshot(self.canvas)
+        self.snapshot_ms = (time.perf_counter() - start) * 1000
+
+        def export(progress: Callable[[float], None]) -> None:
+            self.replace_file(file_path, lambda path: tiled_export.write(path, export_format, progress))
 
-            img.thumbnail(image_size)
-            if rotation != 0:
-                img = img.rotate(rotation, expand=True)
+        BackgroundJob(self.canvas.canvas, "Exporting", export,
+                      on_error=lambda error: messagebox.showerror("Error", f"Failed to export canvas. Error: {error}")).start()
 
-            img.mode == "RGBA"
-            paste_coords = (int(coords[0]), int(coords[1]))
-            image.paste(img, paste_coords)
 
-        except Exception as error:
-            messagebox.showerror("Error", f"Failed to load image. Error: {error}")
-  
 
+    @staticmethod
+    def encode_image(image: Image.Image) -> str:
+        """
+        Encodes an image as base64 PNG, to be stored in a JSON file.
+        """
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        return base64.b64encode(buffer.getvalue()).decode('ascii')
 
 
 
-    def get_font_to_pil(self, font_str:str) -> Tuple:
+    @staticmethod
+    def decode_image(data: str) -> Image.Image:
         """
-        Attempts to parse the font specification from Tkinter and convert it
-        to a PIL ImageFont object, including handling for bold and italic.
+        Decodes an image stored by encode_image.
         """
-        font_parts = font_str.split()
-        def_font_name = "arial"
-        font_style = ""
+        image = Image.open(io.BytesIO(base64.b64decode(data)))
+        image.load()
+        return image
 
-        for part in font_parts:
-            if part.isdigit():
-                font_size = int(part)
 
-            elif part.lower() in ['bold', 'italic']:
-                font_style += part.lower().capitalize()
 
-            else:
-                font_name = part
-        font_file_name = f"{font_name}{font_style}.ttf"
-
-        try:
-            font = ImageFont.truetype(font_file_name, font_size)
-        except IOError:
-            font = ImageFont.truetype(f"{def_font_name}.ttf", font_size)
-            
-        return font, font_size
-    
     def reset_canvas_dialog(self) -> None:
         """
         Opens saving canvas dialog before clearing the canvas.
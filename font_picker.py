@@ -0,0 +1,156 @@
+import tkinter as tk
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+ROW_HEIGHT = 28
+VISIBLE_ROWS = 14
+PREVIEW_TEXT = "AaBbCc 123"
+PREVIEW_SIZE = 13
+
+
+
+class FamilySearch:
+    """
+    Finds font families by what's typed in the picker's search box. Queries of one or two letters match the start
+    of any word of a name (so 'sa' finds 'DejaVu Sans'), through the sorted words of all the names;
+    longer ones match anywhere in a name, through an index of the names' three-letter sequences.
+    Names that start with the query come first. The indexes are built on the first search that needs them.
+    """
+    def __init__(self, families: List[str]) -> None:
+        """
+        A constructor of the family search, over a sorted list of family names.
+        """
+        self.families = families
+        self.lowered = [family.lower() for family in families]
+        self.words: Optional[List[Tuple[str, int]]] = None
+        self.trigrams: Optional[Dict[str, Set[int]]] = None
+
+
+
+    def search(self, query: str) -> List[str]:
+        """
+        Returns the families that match the query, or all of them for an empty query.
+        """
+        query = query.strip().lower()
+        if not query:
+            return self.families
+
+        if len(query) < 3:
+            if self.words is None:
+                self.words = sorted((word, index) for index, name in enumerate(self.lowered) for word in set(name.split()))
+            matches = set()
+            for word, index in self.words[bisect_left(self.words, (query,)):]:
+                if not word.startswith(query):
+                    break
+                matches.add(index)
+        else:
+            if self.trigrams is None:
+                self.trigrams = {}
+                for index, name in enumerate(self.lowered):
+                    for start in range(len(name) - 2):
+                        self.trigrams.setdefault(name[start:start + 3], set()).add(index)
+            candidates = set.intersection(*(self.trigrams.get(query[start:start + 3], set()) for start in range(len(query) - 2)))
+            matches = {index for index in candidates if query in self.lowered[index]}
+
+        return [self.families[index] for index in sorted(matches, key=lambda index: (not self.lowered[index].startswith(query), index))]
+
+
+
+class FontPicker:
+    """
+    A window for choosing a font family: a search box that filters the families as you type,
+    and a list that shows each family with a preview in its own font.
+    Only the rows that are in view are drawn, so only their fonts are loaded, however many families there are.
+    """
+    def __init__(self, master: tk.Misc, family_search: FamilySearch, on_choose: Callable[[str], None]) -> None:
+        """
+        A constructor of the font picker; on_choose is called with the family that's clicked.
+        """
+        self.family_search = family_search
+        self.on_choose = on_choose
+        self.matches = family_search.families
+        self.first_row = 0
+
+        self.window = tk.Toplevel(master)
+        self.window.title("Choose Font")
+
+        self.search_text = tk.StringVar(self.window)
+        search_entry = tk.Entry(self.window, textvariable=self.search_text)
+        search_entry.pack(side="top", fill="x")
+        search_entry.focus_set()
+
+        self.scrollbar = tk.Scrollbar(self.window, orient="vertical", command=self.scroll)
+        self.scrollbar.pack(side="right", fill="y")
+        self.rows = tk.Canvas(self.window, width=420, height=ROW_HEIGHT * VISIBLE_ROWS, background="white", highlightthickness=0)
+        self.rows.pack(side="left", fill="both", expand=True)
+
+        self.search_text.trace_add("write", lambda *args: self.filter())
+        search_entry.bind("<Return>", lambda event: self.choose(0))
+        self.window.bind("<Escape>", lambda event: self.window.destroy())
+        self.rows.bind("<Configure>", lambda event: self.draw_rows())
+        self.rows.bind("<Button-1>", lambda event: self.choose(self.first_row + int(event.y // ROW_HEIGHT)))
+        self.rows.bind("<MouseWheel>", lambda event: self.scroll("scroll", -1 if event.delta > 0 else 1, "units"))
+        self.rows.bind("<Button-4>", lambda event: self.scroll("scroll", -1, "units"))
+        self.rows.bind("<Button-5>", lambda event: self.scroll("scroll", 1, "units"))
+        self.draw_rows()
+
+
+
+    def visible_rows(self) -> int:
+        height = self.rows.winfo_height()
+        return (height if height > 1 else ROW_HEIGHT * VISIBLE_ROWS) // ROW_HEIGHT + 1
+
+
+
+    def filter(self) -> None:
+        """
+        Shows the families that match the search box, from the first.
+        """
+        self.matches = self.family_search.search(self.search_text.get())
+        self.first_row = 0
+        self.draw_rows()
+
+
+
+    def scroll(self, action: str, amount: Any, unit: Optional[str] =None) -> None:
+        """
+        Moves the list as the scrollbar asks: to a fraction of it ('moveto'), or by rows or pages ('scroll').
+        """
+        if action == "moveto":
+            first_row = int(float(amount) * len(self.matches))
+        else:
+            first_row = self.first_row + int(amount) * (self.visible_rows() - 1 if unit == "pages" else 1)
+        self.first_row = max(0, min(first_row, len(self.matches) - self.visible_rows() + 1))
+        self.draw_rows()
+
+
+
+    def draw_rows(self) -> None:
+        """
+        Draws the rows in view: each family's name, and the preview in its font.
+        """
+        self.rows.delete("all")
+        width = self.rows.winfo_width() if self.rows.winfo_width() > 1 else 420
+        visible = self.visible_rows()
+        for row, family in enumerate(self.matches[self.first_row:self.first_row + visible]):
+            y = row * ROW_HEIGHT + ROW_HEIGHT / 2
+            self.rows.create_text(8, y, text=family, anchor="w", font="TkDefaultFont")
+            self.rows.create_text(width - 8, y, text=PREVIEW_TEXT, anchor="e", font=(family, PREVIEW_SIZE))
+
+        if self.matches:
+            self.scrollbar.set(self.first_row / len(self.matches), min(1.0, (self.first_row + visible) / len(self.matches)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+            self.rows.create_text(8, ROW_HEIGHT / 2, text="No fonts match.", anchor="w", font="TkDefaultFont")
+
+
+
+    def choose(self, row: int) -> None:
+        """
+        Closes the picker with the family in a row of the matches, if there's one.
+        """
+        if 0 <= row < len(self.matches):
+            family = self.matches[row]
+            self.window.destroy()
+            self.on_choose(family)
@@ -0,0 +1,307 @@
+import json
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from PIL import ImageFont
+
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser("~"), ".graphic_design_fonts.json")
+FONT_EXTENSIONS = ('.ttf', '.otf', '.ttc')
+FONT_CACHE_SIZE = 64
+FALLBACK_FAMILIES = {'sans': ('arial', 'helvetica', 'liberation sans', 'dejavu sans', 'freesans', 'noto sans'),
+                     'serif': ('times new roman', 'times', 'liberation serif', 'dejavu serif', 'freeserif', 'noto serif'),
+                     'mono': ('courier new', 'courier', 'liberation mono', 'dejavu sans mono', 'freemono', 'noto mono')}
+SERIF_HINTS = ('times', 'serif', 'georgia', 'garamond', 'roman', 'cambria')
+MONO_HINTS = ('courier', 'mono', 'consolas', 'fixed', 'typewriter')
+BASIC_STYLE_WORDS = {'regular', 'normal', 'book', 'roman', 'plain', 'bold', 'italic', 'oblique'}
+INDEX_VERSION = 1
+
+FontKey = Tuple[str, int, str]
+
+
+
+def font_directories() -> List[str]:
+    """
+    The directories the system keeps fonts in, for the user and for everyone.
+    """
+    home = os.path.expanduser("~")
+    if sys.platform.startswith('win'):
+        return [os.path.join(os.environ.get('WINDIR', r'C:\Windows'), 'Fonts'),
+                os.path.join(os.environ.get('LOCALAPPDATA', home), 'Microsoft', 'Windows', 'Fonts')]
+    if sys.platform == 'darwin':
+        return ['/System/Library/Fonts', '/Library/Fonts', os.path.join(home, 'Library', 'Fonts')]
+    return ['/usr/share/fonts', '/usr/local/share/fonts', os.path.join(home, '.fonts'), os.path.join(home, '.local', 'share', 'fonts')]
+
+
+
+def parse_tk_font(font: str) -> Tuple[str, int, str]:
+    """
+    Parses a Tk font string, like 'Arial 12 bold' or '{Times New Roman} 14 bold italic', into its family, size and style
+    ('regular', 'bold', 'italic' or 'bold italic'). Negative sizes (pixels in Tk) are taken as they are.
+    """
+    family_parts: List[str] = []
+    size = 12
+    bold = italic = False
+
+    for part in re.findall(r'\{[^}]*\}|\S+', font):
+        if part.startswith('{'):
+            family_parts.append(part[1:-1])
+        elif part.lstrip('-').isdigit():
+            size = abs(int(part)) or size
+        elif part.lower() == 'bold':
+            bold = True
+        elif part.lower() == 'italic':
+            italic = True
+        elif part.lower() not in ('normal', 'roman', 'underline', 'overstrike'):
+            family_parts.append(part)
+
+    style = ' '.join(word for word, present in (('bold', bold), ('italic', italic)) if present) or 'regular'
+    return ' '.join(family_parts) or 'Arial', size, style
+
+
+
+def fallback_families(family: str) -> Tuple[str, ...]:
+    """
+    The common families to use instead of a family that isn't installed: monospace ones for what looks like
+    a monospace family, serif ones for a serif family, and sans-serif ones otherwise.
+    """
+    name = family.lower()
+    if any(hint in name for hint in MONO_HINTS):
+        return FALLBACK_FAMILIES['mono'] + FALLBACK_FAMILIES['sans']
+    if any(hint in name for hint in SERIF_HINTS) and 'sans' not in name:
+        return FALLBACK_FAMILIES['serif'] + FALLBACK_FAMILIES['sans']
+    return FALLBACK_FAMILIES['sans']
+
+
+
+def style_key(style_name: str) -> Optional[str]:
+    """
+    Maps the style name of a font face ('Bold Oblique', 'Regular', 'Book'...) to the styles Tk has,
+    or None for the other weights and widths (Light, Condensed...).
+    """
+    words = set(style_name.lower().replace('-', ' ').split())
+    if not words <= BASIC_STYLE_WORDS:
+        return None
+    italic = 'italic' in words or 'oblique' in words
+    return ' '.join(word for word, present in (('bold', 'bold' in words), ('italic', italic)) if present) or 'regular'
+
+
+
+class FontResolver:
+    """
+    Finds and loads the font files of Tk fonts, for drawing texts with PIL.
+    The system font directories are scanned once into an index of family, style and file, which is kept in a small
+    cache file and scanned again only when the directories change. Loaded fonts are kept by (family, size, style),
+    evicting the least recently used, so a face is loaded once however many texts use it.
+    A family that isn't installed falls back to a common sans-serif family, and then to PIL's own font.
+    The cache file also keeps the font families Tk lists, for the font picker.
+    It's safe to use from several threads.
+    """
+    def __init__(self, index_path: Optional[str] =DEFAULT_INDEX_PATH, directories: Optional[List[str]] =None,
+                 cache_size: int =FONT_CACHE_SIZE) -> None:
+        """
+        A constructor of the font resolver. Without an index path the index isn't kept between sessions.
+        """
+        self.index_path = index_path
+        self.directories = directories if directories is not None else font_directories()
+        self.cache_size = cache_size
+        self.families: Optional[Dict[str, Dict[str, Any]]] = None
+        self.tk_family_names: Optional[List[str]] = None
+        self.stamp_value: Optional[Dict[str, int]] = None
+        self.fonts: 'OrderedDict[FontKey, Any]' = OrderedDict()
+        self.lock = threading.RLock()
+
+        self.scans = 0
+        self.loads = 0
+        self.hits = 0
+
+
+
+    def stamp(self) -> Dict[str, int]:
+        """
+        The modification times of the font directories and their subdirectories, which change when fonts are added or removed.
+        """
+        stamp = {}
+        for directory in self.directories:
+            for path, _, _ in os.walk(directory):
+                try:
+                    stamp[path] = os.stat(path).st_mtime_ns
+                except OSError:
+                    pass
+        return stamp
+
+
+
+    def load(self) -> None:
+        """
+        Reads the cache file once per session, and keeps what it holds if the directories haven't changed since it was written.
+        """
+        if self.stamp_value is not None:
+            return
+        self.stamp_value = self.stamp()
+        if not self.index_path:
+            return
+        try:
+            with open(self.index_path, encoding='utf-8') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == INDEX_VERSION and data.get('stamp') == self.stamp_value:
+            self.families = data.get('families')
+            self.tk_family_names = data.get('tk_families')
+
+
+
+    def write_index(self) -> None:
+        """
+        Writes the cache file aside and moves it in place; a cache that can't be written is only a slower next start.
+        """
+        if not self.index_path:
+            return
+        try:
+            temporary_path = self.index_path + '.tmp'
+            with open(temporary_path, 'w', encoding='utf-8') as file:
+                json.dump({'version': INDEX_VERSION, 'stamp': self.stamp_value, 'families': self.families,
+                           'tk_families': self.tk_family_names}, file)
+            os.replace(temporary_path, self.index_path)
+        except OSError:
+            pass
+
+
+
+    def index(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns the index of the installed fonts: for each family (lowercase), its name and the file of each style.
+        It's read from the cache file if the directories haven't changed since it was written, and scanned otherwise.
+        """
+        with self.lock:
+            self.load()
+            if self.families is None:
+                self.families = self.scan()
+                self.write_index()
+            return self.families
+
+
+
+    def tk_families(self, compute: Callable[[], Iterable[str]]) -> List[str]:
+        """
+        Returns the font families Tk has (compute is tkinter.font.families), without duplicates or the vertical '@' variants,
+        sorted. They're computed once and kept in the cache file with the index, so later sessions don't ask Tk again
+        until fonts are installed or removed.
+        """
+        with self.lock:
+            self.load()
+            if self.tk_family_names is None:
+                names: Dict[str, str] = {}
+                for name in compute():
+                    if name and not name.startswith('@'):
+                        names.setdefault(name.lower(), name)
+                self.tk_family_names = sorted(names.values(), key=str.lower)
+                self.write_index()
+            return self.tk_family_names
+
+
+
+    def scan(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Opens every font file in the directories to read its family and style names.
+        The first file found for a family and style is kept; other weights are kept under their own style names.
+        """
+        self.scans += 1
+        families: Dict[str, Dict[str, Any]] = {}
+        for directory in self.directories:
+            for path, _, file_names in os.walk(directory):
+                for file_name in sorted(file_names):
+                    if not file_name.lower().endswith(FONT_EXTENSIONS):
+                        continue
+                    file_path = os.path.join(path, file_name)
+                    try:
+                        family, style_name = ImageFont.truetype(file_path, 12).getname()
+                    except (OSError, ValueError):
+                        continue
+                    if not family:
+                        continue
+
+                    entry = families.setdefault(family.lower(), {'family': family, 'styles': {}})
+                    style = style_key(style_name or 'Regular') or (style_name or '').lower()
+                    entry['styles'].setdefault(style, file_path)
+        return families
+
+
+
+    def font_file(self, family: str, style: str ='regular') -> Optional[str]:
+        """
+        Returns the file of a family in a style, or of the closest style it has (bold for bold italic, then regular),
+        or of a fallback family (see fallback_families); None when no font is installed at all.
+        """
+        families = self.index()
+        fallback_styles = [style, style.split()[0], 'regular'] if style != 'regular' else ['regular']
+        for name in (family.lower(),) + fallback_families(family):
+            styles = families.get(name, {}).get('styles', {})
+            for candidate in fallback_styles:
+                if candidate in styles:
+                    return styles[candidate]
+            if name == family.lower() and styles:
+                return next(iter(styles.values()))
+        for entry in families.values():
+            if 'regular' in entry['styles']:
+                return entry['styles']['regular']
+        return None
+
+
+
+    def font(self, family: str, size: int, style: str ='regular') -> Any:
+        """
+        Returns the PIL font of a family, size and style, loading it only if it isn't cached.
+        """
+        key = (family.lower(), size, style)
+        with self.lock:
+            font = self.fonts.get(key)
+            if font is not None:
+                self.fonts.move_to_end(key)
+                self.hits += 1
+                return font
+
+            file_path = self.font_file(family, style)
+            font = None
+            if file_path:
+                try:
+                    font = ImageFont.truetype(file_path, size)
+                except OSError:
+                    pass
+            if font is None:
+                try:
+                    font = ImageFont.load_default(size)
+                except TypeError:
+                    font = ImageFont.load_default()
+
+            self.loads += 1
+            self.fonts[key] = font
+            if len(self.fonts) > self.cache_size:
+                self.fonts.popitem(last=False)
+            return font
+
+
+
+    def tk_font(self, font: str, scale: float =1.0) -> Tuple[Any, int]:
+        """
+        Returns the PIL font of a Tk font string at a scale of its size, and the scaled size.
+        """
+        family, size, style = parse_tk_font(font)
+        size = max(1, round(size * scale))
+        return self.font(family, size, style), size
+
+
+
+    def family_names(self) -> List[str]:
+        """
+        Returns the names of the installed families, sorted.
+        """
+        return sorted((entry['family'] for entry in self.index().values()), key=str.lower)
+
+
+
+font_resolver = FontResolver()
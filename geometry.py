@@ -0,0 +1,168 @@
+from typing import List, Optional, Tuple
+import numpy as np
+
+
+Point = Tuple[float, float]
+
+
+
+def point_to_segment_distance(point: Point, start: Point, end: Point) -> float:
+    """
+    Returns the distance of a point from the segment between start and end.
+    """
+    dx, dy = end[0] - start[0], end[1] - start[1]
+    length_sq = dx * dx + dy * dy
+
+    if length_sq == 0:
+        return ((point[0] - start[0]) ** 2 + (point[1] - start[1]) ** 2) ** 0.5
+
+    t = max(0.0, min(1.0, ((point[0] - start[0]) * dx + (point[1] - start[1]) * dy) / length_sq))
+    closest_x, closest_y = start[0] + t * dx, start[1] + t * dy
+
+    return ((point[0] - closest_x) ** 2 + (point[1] - closest_y) ** 2) ** 0.5
+
+
+
+def simplify_points(points: List[Point], tolerance: float) -> List[Point]:
+    """
+    Ramer-Douglas-Peucker simplification of a polyline.
+    Removes every point that is closer than the tolerance to the line kept around it.
+    """
+    if tolerance <= 0 or len(points) < 3:
+        return list(points)
+
+    keep = [False] * len(points)
+    keep[0] = keep[-1] = True
+    ranges = [(0, len(points) - 1)]
+
+    while ranges:
+        first, last = ranges.pop()
+        start_x, start_y = points[first]
+        dx, dy = points[last][0] - start_x, points[last][1] - start_y
+        length_sq = dx * dx + dy * dy
+        farthest_index, farthest_distance_sq = first, 0.0
+
+        for index in range(first + 1, last):
+            offset_x, offset_y = points[index][0] - start_x, points[index][1] - start_y
+
+            if length_sq:
+                t = (offset_x * dx + offset_y * dy) / length_sq
+                t = 0.0 if t < 0 else 1.0 if t > 1 else t
+                offset_x, offset_y = offset_x - t * dx, offset_y - t * dy
+
+            distance_sq = offset_x * offset_x + offset_y * offset_y
+            if distance_sq > farthest_distance_sq:
+                farthest_index, farthest_distance_sq = index, distance_sq
+
+        if farthest_distance_sq > tolerance * tolerance:
+            keep[farthest_index] = True
+            ranges.append((first, farthest_index))
+            ranges.append((farthest_index, last))
+
+    return [point for point, kept in zip(points, keep) if kept]
+
+
+
+def is_near_polyline(point: Point, points: List[Point], distance: float) -> bool:
+    """
+    Checks if a point is within the distance from any segment of a polyline.
+    Segments whose bounding box is too far are skipped without computing the distance.
+    """
+    x, y = point
+    if len(points) == 1:
+        points = [points[0], points[0]]
+
+    for (x1, y1), (x2, y2) in zip(points, points[1:]):
+        if (x < x1 - distance and x < x2 - distance) or (x > x1 + distance and x > x2 + distance) or \
+           (y < y1 - distance and y < y2 - distance) or (y > y1 + distance and y > y2 + distance):
+            continue
+
+        if point_to_segment_distance(point, (x1, y1), (x2, y2)) <= distance:
+            return True
+
+    return False
+
+
+
+def point_in_polygon(point: Point, coords: List[float]) -> bool:
+    """
+    Ray casting test of a point inside a polygon given by flat coords.
+    """
+    x, y = point
+    inside = False
+    vertices = list(zip(coords[::2], coords[1::2]))
+
+    for (x1, y1), (x2, y2) in zip(vertices, vertices[1:] + vertices[:1]):
+        if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+            inside = not inside
+
+    return inside
+
+
+
+def cut_polyline(points: np.ndarray, center: Point, radius: float) -> Optional[List[np.ndarray]]:
+    """
+    Cuts the part of a polyline (an N x 2 array) that lies inside a circle.
+    Returns the pieces left outside the circle, or None if the circle doesn't touch the polyline.
+    The segment-circle intersections are solved for all segments at once.
+    """
+    if len(points) < 2:
+        inside = len(points) == 1 and np.hypot(*(points[0] - center)) <= radius
+        return [] if inside else None
+
+    starts = points[:-1]
+    directions = points[1:] - starts
+    offsets = starts - np.asarray(center, dtype=float)
+
+    a = (directions * directions).sum(axis=1)
+    b = 2 * (offsets * directions).sum(axis=1)
+    c = (offsets * offsets).sum(axis=1) - radius * radius
+    discriminant = b * b - 4 * a * c
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        root = np.sqrt(np.maximum(discriminant, 0))
+        enter = np.clip((-b - root) / (2 * a), 0, 1)
+        leave = np.clip((-b + root) / (2 * a), 0, 1)
+
+    degenerate = a == 0
+    enter[degenerate], leave[degenerate] = 0, 1
+    hit = np.where(degenerate, c <= 0, (discriminant > 0) & (enter < leave))
+
+    hit_segments = np.flatnonzero(hit)
+    if not len(hit_segments):
+        return None
+
+    pieces = []
+    head: List[np.ndarray] = []
+    run_start = 0
+
+    for segment in hit_segments:
+        piece = head + [points[run_start:segment + 1]]
+        if enter[segment] > 0:
+            piece.append((starts[segment] + enter[segment] * directions[segment])[np.newaxis])
+        pieces.append(np.concatenate(piece))
+
+        if leave[segment] < 1:
+            head = [(starts[segment] + leave[segment] * directions[segment])[np.newaxis]]
+        else:
+            head = []
+        run_start = segment + 1
+
+    pieces.append(np.concatenate(head + [points[run_start:]]))
+
+    return [piece for piece in pieces if len(piece) >= 2]
+
+
+
+def dot_positions(points: np.ndarray, spacing: float) -> np.ndarray:
+    """
+    Returns the centers of the dots of a dotted polyline (an N x 2 array), as the canvas draws its dashes:
+    one at its start and then one every spacing along it, across the vertices.
+    The distances along all the segments are computed at once.
+    """
+    if not len(points):
+        return np.empty((0, 2))
+
+    distances = np.concatenate(([0.0], np.cumsum(np.hypot(*np.diff(points, axis=0).T))))
+    along = np.arange(0.0, distances[-1] + 1e-9, max(spacing, 1.0))
+    return np.column_stack((np.interp(along, distances, points[:, 0]), np.interp(along, distances, points[:, 1])))
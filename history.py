@@ -0,0 +1,260 @@
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+from scene import SceneItem
+
+
+DEFAULT_MEMORY_CAP = 64 * 2 ** 20
+STYLE_ENTRY_BYTES = 100
+COMMAND_BYTES = 200
+
+
+
+def record_bytes(record: SceneItem) -> int:
+    """
+    Estimates the memory a record keeps alive: its coords, options and image pixels.
+    """
+    coords = record.coords
+    size = COMMAND_BYTES + STYLE_ENTRY_BYTES * len(record.style)
+    size += len(coords) * (coords.itemsize if hasattr(coords, 'itemsize') else 32)
+    if record.image is not None:
+        size += record.image.width * record.image.height * len(record.image.getbands())
+    return size
+
+
+
+class History:
+    """
+    Undo and redo of the drawing, kept as a log of small commands that hold only what is needed
+    to reverse a change: the records that were added or deleted, the offset of a move, the state
+    of a record before it was changed. A command reverses itself when it's applied, so the same command
+    goes back and forth between the undo and redo stacks.
+    When the log grows over its memory cap, its older half is coalesced, and the oldest commands are dropped.
+    """
+    def __init__(self, drawing_canvas, memory_cap: int =DEFAULT_MEMORY_CAP) -> None:
+        """
+        A constructor of the history.
+        """
+        self.drawing_canvas = drawing_canvas
+        self.memory_cap = memory_cap
+        self.undo_stack: Deque[Dict[str, Any]] = deque()
+        self.redo_stack: List[Dict[str, Any]] = []
+        self.memory = 0
+        self.batch: Optional[Dict[str, Any]] = None
+        self.batch_depth = 0
+        self.applying = False
+
+
+
+    def record(self, command: Dict[str, Any]) -> None:
+        """
+        Adds the command of a change that was just made.
+        Inside a batch, adjacent additions or deletions are merged into one command.
+        Changes made by undo and redo themselves aren't recorded.
+        """
+        if self.applying:
+            return
+
+        if self.batch is None:
+            self.push(command)
+            return
+
+        commands = self.batch['commands']
+        previous = commands[-1] if commands else None
+        if previous is not None and previous['action'] == command['action'] == 'items' and previous['present'] == command['present']:
+            previous['records'].extend(command['records'])
+            previous['placements'].extend(command['placements'])
+        else:
+            commands.append(command)
+
+
+
+    def push(self, command: Dict[str, Any]) -> None:
+        """
+        Puts a command on the undo stack. A new change can't be redone after, so the redo stack is cleared.
+        """
+        command['size'] = self.command_bytes(command)
+        self.undo_stack.append(command)
+        self.memory += command['size'] - sum(old['size'] for old in self.redo_stack)
+        self.redo_stack.clear()
+
+        if self.memory > self.memory_cap:
+            self.enforce_cap()
+
+
+
+    def begin_batch(self) -> None:
+        """
+        Starts collecting the following changes as one command (a whole stroke of the eraser, a pasted group).
+        Batches may be nested; only the outer one makes a command.
+        """
+        self.batch_depth += 1
+        if self.batch is None:
+            self.batch = {'action': 'batch', 'commands': []}
+
+
+
+    def end_batch(self) -> None:
+        """
+        Ends a batch, and records it if it has any changes.
+        """
+        self.batch_depth = max(0, self.batch_depth - 1)
+        if self.batch_depth == 0:
+            self.close_batch()
+
+
+
+    def close_batch(self) -> None:
+        """
+        Ends the open batch no matter how deeply it's nested (a mode switch in the middle of a figure).
+        """
+        batch, self.batch, self.batch_depth = self.batch, None, 0
+        if batch is not None and batch['commands']:
+            self.push(batch['commands'][0] if len(batch['commands']) == 1 else batch)
+
+
+
+    def undo(self) -> bool:
+        """
+        Reverses the last change. Returns False if there is nothing to undo.
+        """
+        self.close_batch()
+        if not self.undo_stack:
+            return False
+
+        command = self.undo_stack.pop()
+        self.apply(command)
+        self.redo_stack.append(command)
+        return True
+
+
+
+    def redo(self) -> bool:
+        """
+        Makes the last undone change again. Returns False if there is nothing to redo.
+        """
+        self.close_batch()
+        if not self.redo_stack:
+            return False
+
+        command = self.redo_stack.pop()
+        self.apply(command)
+        self.undo_stack.append(command)
+        return True
+
+
+
+    def clear(self) -> None:
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.memory = 0
+        self.batch, self.batch_depth = None, 0
+
+
+
+    def apply(self, command: Dict[str, Any]) -> None:
+        """
+        Applies a command on the drawing and turns it into its reverse.
+        """
+        self.applying = True
+        try:
+            self.apply_command(command)
+        finally:
+            self.applying = False
+
+
+
+    def apply_command(self, command: Dict[str, Any]) -> None:
+        action = command['action']
+        drawing_canvas = self.drawing_canvas
+
+        if action == 'batch':
+            for sub_command in reversed(command['commands']):
+                self.apply_command(sub_command)
+            command['commands'].reverse()
+
+        elif action == 'items':
+            if command['present']:
+                command['placements'] = drawing_canvas.remove_records(command['records'])
+            else:
+                drawing_canvas.restore_records(command['records'], command['placements'])
+            command['present'] = not command['present']
+
+        elif action == 'move':
+            command['dx'], command['dy'] = -command['dx'], -command['dy']
+            drawing_canvas.move_records(command['records'], command['dx'], command['dy'])
+
+        elif action == 'change':
+            command['state'] = drawing_canvas.apply_state(command['record'], command['state'])
+
+        elif action == 'restack':
+            command['stacking'] = drawing_canvas.place_records(command['records'], command['stacking'])
+
+        elif action == 'background':
+            command['color'], color = drawing_canvas.bg, command['color']
+            drawing_canvas.update_background(color)
+
+
+
+    def command_bytes(self, command: Dict[str, Any]) -> int:
+        """
+        Estimates the memory a command keeps alive. Moved and restacked records are in the drawing anyway,
+        so only their references count.
+        """
+        action = command['action']
+        if action == 'batch':
+            return sum(self.command_bytes(sub_command) for sub_command in command['commands'])
+        if action == 'items':
+            return COMMAND_BYTES + sum(record_bytes(record) for record in command['records'])
+        if action == 'change':
+            return COMMAND_BYTES + record_bytes(command['state'])
+        return COMMAND_BYTES + 16 * len(command.get('records', ()))
+
+
+
+    def enforce_cap(self) -> None:
+        """
+        Brings the log back under its memory cap: the older half of the undo stack is coalesced,
+        and if it isn't enough, the oldest commands are dropped until the log takes three quarters of the cap.
+        """
+        older = [self.undo_stack.popleft() for _ in range(len(self.undo_stack) // 2)]
+        self.undo_stack.extendleft(reversed(self.coalesce(older)))
+        self.memory = sum(command['size'] for command in self.undo_stack) + sum(command['size'] for command in self.redo_stack)
+
+        while self.undo_stack and self.memory > self.memory_cap * 3 // 4:
+            self.memory -= self.undo_stack.popleft()['size']
+
+
+
+    @staticmethod
+    def coalesce(commands: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Merges adjacent commands that can be undone as one:
+        moves of the same records add up, changes of the same record keep only the oldest state,
+        and records that were added and then deleted leave nothing to undo.
+        """
+        def same_records(first: Dict[str, Any], second: Dict[str, Any]) -> bool:
+            return len(first['records']) == len(second['records']) and \
+                all(record is other for record, other in zip(first['records'], second['records']))
+
+        coalesced: List[Dict[str, Any]] = []
+        for command in commands:
+            previous = coalesced[-1] if coalesced else None
+            action = command['action']
+
+            if previous is None or previous['action'] != action:
+                coalesced.append(command)
+
+            elif action == 'move' and same_records(previous, command):
+                previous['dx'] += command['dx']
+                previous['dy'] += command['dy']
+
+            elif action == 'change' and previous['record'] is command['record']:
+                pass
+
+            elif action == 'items' and previous['present'] and not command['present'] and same_records(previous, command):
+                coalesced.pop()
+
+            else:
+                coalesced.append(command)
+
+        return coalesced
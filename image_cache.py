@@ -0,0 +1,144 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from PIL import Image
+
+
+DEFAULT_MEMORY_BUDGET = 256 * 2 ** 20
+
+CacheKey = Tuple[str, int, Optional[Tuple[int, int]]]
+
+
+
+def image_bytes(image: Image.Image) -> int:
+    return image.width * image.height * len(image.getbands())
+
+
+
+class ImageCache:
+    """
+    A cache of decoded image files shared by everything that opens them (uploading, loading, recovery),
+    keyed by the file's path, modification time and the size it's shrunk to, so a changed file is decoded again.
+    The least recently used images are evicted once the decoded pixels take more than the memory budget.
+    The images are shared, so they must not be changed in place (PIL's resize, rotate and transpose return new ones).
+    It's safe to use from several threads; a file that's being decoded by one thread is waited for, not decoded again.
+    A smaller size of a file that's cached is shrunk from the cached image instead of decoding the file.
+    """
+    def __init__(self, memory_budget: int =DEFAULT_MEMORY_BUDGET) -> None:
+        """
+        A constructor of the image cache.
+        """
+        self.memory_budget = memory_budget
+        self.images: 'OrderedDict[CacheKey, Image.Image]' = OrderedDict()
+        self.decoding: Dict[CacheKey, threading.Event] = {}
+        self.lock = threading.Lock()
+        self.memory = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+
+
+    def get(self, file_path: str, size: Optional[Tuple[int, int]] =None) -> Image.Image:
+        """
+        Returns the image of a file, shrunk to fit the size if one is given, decoding it only if it isn't cached.
+        """
+        key = (os.path.abspath(file_path), os.stat(file_path).st_mtime_ns, tuple(size) if size else None)
+
+        while True:
+            with self.lock:
+                image = self.images.get(key)
+                if image is not None:
+                    self.images.move_to_end(key)
+                    self.hits += 1
+                    return image
+
+                decoding = self.decoding.get(key)
+                if decoding is None:
+                    self.decoding[key] = threading.Event()
+                    self.misses += 1
+                    larger = self.larger_image(key)
+                    break
+
+            decoding.wait()
+
+        try:
+            if larger is not None:
+                image = larger.copy()
+                image.thumbnail(size)
+            else:
+                image = self.decode(file_path, size)
+            with self.lock:
+                self.put(key, image)
+        finally:
+            with self.lock:
+                self.decoding.pop(key).set()
+
+        return image
+
+
+
+    def larger_image(self, key: CacheKey) -> Optional[Image.Image]:
+        """
+        Finds a cached image of the same file that's at least as large as the size of the key, to shrink instead of decoding the file.
+        Called with the lock held.
+        """
+        path, mtime, size = key
+        if size is None:
+            return None
+        for (cached_path, cached_mtime, cached_size), image in self.images.items():
+            if cached_path == path and cached_mtime == mtime and (cached_size is None or (cached_size[0] >= size[0] and cached_size[1] >= size[1])):
+                return image
+        return None
+
+
+
+    @staticmethod
+    def decode(file_path: str, size: Optional[Tuple[int, int]]) -> Image.Image:
+        """
+        Decodes an image file. JPEG files are decoded at a reduced scale when they're shrunk anyway.
+        """
+        image = Image.open(file_path)
+        if size:
+            image.thumbnail(size)
+        else:
+            image.load()
+        return image
+
+
+
+    def put(self, key: CacheKey, image: Image.Image) -> None:
+        """
+        Adds a decoded image and evicts the least recently used ones over the budget (never the new one).
+        Called with the lock held.
+        """
+        self.images[key] = image
+        self.memory += image_bytes(image)
+
+        while self.memory > self.memory_budget and len(self.images) > 1:
+            _, evicted = self.images.popitem(last=False)
+            self.memory -= image_bytes(evicted)
+            self.evictions += 1
+
+
+
+    def clear(self) -> None:
+        with self.lock:
+            self.images.clear()
+            self.memory = 0
+
+
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the counters of the cache: hits, misses, evictions, cached images and their memory.
+        """
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'images': len(self.images), 'memory': self.memory}
+
+
+
+image_cache = ImageCache()
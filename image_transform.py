@@ -0,0 +1,80 @@
+import math
+from typing import Any, Dict, Optional, Tuple
+from PIL import Image
+from image_cache import image_cache
+
+
+MIN_PROXY_SIDE = 256
+FULL_CROP = (0.0, 0.0, 1.0, 1.0)
+
+
+
+def new_source(file_path: str, fit: Tuple[int, int]) -> Dict[str, Any]:
+    """
+    The source of a newly uploaded image: its file and an identity transform that shrinks it (never enlarges it) to fit the box.
+    Only the header of the file is read.
+    """
+    with Image.open(file_path) as image:
+        width, height = image.size
+    ratio = min(1.0, fit[0] / width, fit[1] / height)
+    return {'path': file_path, 'size': (max(1, round(width * ratio)), max(1, round(height * ratio))),
+            'rotation': 0, 'flip': False, 'crop': None}
+
+
+
+def proxy_box(width: float, height: float) -> Tuple[int, int]:
+    """
+    Returns the box a file is decoded into for a result of the given size: the next power of two,
+    so a handful of decodes (kept by the image cache) serve every size the image is shown at.
+    """
+    side = max(MIN_PROXY_SIDE, 2 ** math.ceil(math.log2(max(width, height, 1))))
+    return side, side
+
+
+
+def render_image(source: Dict[str, Any], scale: float =1.0) -> Image.Image:
+    """
+    Applies the transform composed on an uploaded image to its file, at a scale of its size on the canvas:
+    crop (fractions of the file), resize to the size, mirror, then rotate (by multiples of 90 degrees, which lose nothing).
+    Every transform starts from the decoded file and not from the last result, so edits never add up resampling loss.
+    The file is decoded (through the image cache) only as large as the result needs.
+    """
+    crop = tuple(source.get('crop') or FULL_CROP)
+    width, height = source['size'][0] * scale, source['size'][1] * scale
+    crop_width, crop_height = crop[2] - crop[0], crop[3] - crop[1]
+
+    image = image_cache.get(source['path'], proxy_box(width / crop_width, height / crop_height))
+    if crop != FULL_CROP:
+        image = image.crop((round(crop[0] * image.width), round(crop[1] * image.height),
+                            round(crop[2] * image.width), round(crop[3] * image.height)))
+
+    size = (max(1, round(width)), max(1, round(height)))
+    if image.size != size:
+        image = image.resize(size, Image.LANCZOS)
+    if source.get('flip'):
+        image = image.transpose(Image.FLIP_LEFT_RIGHT)
+    if source.get('rotation'):
+        image = image.rotate(source['rotation'], expand=True)
+    return image
+
+
+
+def transformed(source: Dict[str, Any], action: str, width: Optional[int] =None) -> Dict[str, Any]:
+    """
+    Returns the source with an edit composed on its transform:
+    'resize' to a new width (keeping the proportions), 'rotate' by 90 degrees, or 'mirror' left to right.
+    The image is mirrored before it's rotated, so mirroring a rotated image also turns its rotation the other way.
+    """
+    source = dict(source)
+    rotation = source.get('rotation', 0)
+
+    if action == 'resize' and width:
+        old_width, old_height = source['size']
+        source['size'] = (width, max(1, round(width * old_height / old_width)))
+    elif action == 'rotate':
+        source['rotation'] = (rotation + 90) % 360
+    elif action == 'mirror':
+        source['flip'] = not source.get('flip', False)
+        source['rotation'] = -rotation % 360
+
+    return source
@@ -0,0 +1,103 @@
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+DEFAULT_FRAME_RATE = 60
+
+
+
+class InputCoalescer:
+    """
+    Buffers the motion events of drag-driven handlers and delivers them once per display frame,
+    so the Tk work of a handler doesn't grow with the mouse polling rate.
+    """
+    def __init__(self, widget, frame_rate: int =DEFAULT_FRAME_RATE) -> None:
+        """
+        A constructor of the input coalescer.
+        A frame rate of 0 turns coalescing off and delivers every event immediately.
+        """
+        self.widget = widget
+        self.frame_rate = frame_rate
+        self.keep_all: Dict[Callable, bool] = {}
+        self.pending: Dict[Callable, List[Any]] = {}
+        self.scheduled_flush: Optional[str] = None
+        self.last_flush = 0.0
+
+
+
+    def wrap(self, handler: Callable, keep_all: bool =False) -> Callable[[Any], None]:
+        """
+        Returns an event callback to bind instead of the handler.
+        With keep_all the handler gets the list of every buffered event (strokes must not lose points),
+        otherwise it gets only the latest event of the frame.
+        """
+        self.keep_all[handler] = keep_all
+
+        def on_event(event) -> None:
+            self.push(handler, event)
+
+        return on_event
+
+
+
+    def push(self, handler: Callable, event) -> None:
+        """
+        Buffers an event of the handler and makes sure a flush is scheduled.
+        """
+        if self.frame_rate <= 0:
+            self.deliver(handler, [event])
+            return
+
+        events = self.pending.setdefault(handler, [])
+        if self.keep_all[handler]:
+            events.append(event)
+        else:
+            events[:] = [event]
+
+        if self.scheduled_flush is None:
+            self.schedule_flush()
+
+
+
+    def schedule_flush(self) -> None:
+        """
+        Schedules the next flush, no sooner than one frame after the previous one.
+        """
+        wait_ms = (self.last_flush + 1 / self.frame_rate - time.perf_counter()) * 1000
+
+        if wait_ms >= 1:
+            self.scheduled_flush = self.widget.after(int(wait_ms), self.flush)
+        else:
+            self.scheduled_flush = self.widget.after_idle(self.flush)
+
+
+
+    def flush(self, handler: Optional[Callable] =None) -> None:
+        """
+        Delivers the buffered events now, of all the handlers or only of the given one.
+        Used on button release and mode changes, so no buffered event is applied late.
+        """
+        if handler is None:
+            if self.scheduled_flush is not None:
+                self.widget.after_cancel(self.scheduled_flush)
+                self.scheduled_flush = None
+
+            pending, self.pending = self.pending, {}
+            self.last_flush = time.perf_counter()
+
+        else:
+            pending = {handler: self.pending.pop(handler)} if handler in self.pending else {}
+
+        for pending_handler, events in pending.items():
+            self.deliver(pending_handler, events)
+
+
+
+    def deliver(self, handler: Callable, events: List[Any]) -> None:
+        """
+        Calls the handler with its buffered events.
+        """
+        if self.keep_all[handler]:
+            handler(events)
+        else:
+            handler(events[-1])
@@ -0,0 +1,442 @@
+import base64
+import io
+import json
+import os
+import sys
+import threading
+import time
+from typing import IO, Any, Dict, List, Optional, Set, Tuple
+from PIL import Image
+from scene import SceneItem
+from image_transform import render_image
+if sys.platform.startswith('win'):
+    import msvcrt
+else:
+    import fcntl
+
+
+DEFAULT_JOURNAL_DIRECTORY = os.path.join(os.path.expanduser("~"), ".graphic_design_journals")
+JOURNAL_PREFIX = 'journal-'
+JOURNAL_EXTENSION = '.jsonl'
+FSYNC_POLICIES = ('always', 'interval', 'never')
+FLUSH_INTERVAL_MS = 1000
+MIN_COMPACT_BYTES = 4 * 2 ** 20
+
+
+
+def lock_path(journal_path: str) -> str:
+    return os.path.splitext(journal_path)[0] + '.lock'
+
+
+
+def lock_file(path: str) -> Optional[IO[str]]:
+    """
+    Opens a lock file and locks it without waiting, or returns None when another process holds it.
+    The system lets go of the lock when the file is closed or the process ends, even by a crash.
+    """
+    file = open(path, 'a')
+    try:
+        if sys.platform.startswith('win'):
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        file.close()
+        return None
+    return file
+
+
+
+class Journal:
+    """
+    An append-only autosave journal of the drawing, one JSON operation per line:
+    'put' (the full state of a created or changed item), 'extend' (the coords appended to a line since it was last written),
+    'move', 'delete', 'background',
+    and 'snapshot' (the whole drawing, which the journal is compacted into now and then, and when the drawing is cleared).
+    The snapshot is written on a worker thread.
+    The canvas only marks what changed; the operations are written once a second, so drawing pays
+    a set insertion per change. Items are keyed by their canvas ID at the time, which is never reused.
+    fsync is 'always' (after every write), 'interval' (at most every fsync_interval seconds) or 'never'.
+    Each session keeps its own journal in the directory, named by its process ID, and holds the lock file next to it
+    while it runs; a journal whose lock nobody holds was left by a session that didn't end normally.
+    """
+    def __init__(self, drawing_canvas, directory: str =DEFAULT_JOURNAL_DIRECTORY, fsync: str ='interval',
+                 fsync_interval: float =5.0) -> None:
+        """
+        A constructor of the journal.
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+
+        self.drawing_canvas = drawing_canvas
+        self.directory = directory
+        self.path = os.path.join(directory, f"{JOURNAL_PREFIX}{os.getpid()}{JOURNAL_EXTENSION}")
+        self.lock_file: Optional[IO[str]] = None
+        self.recovered: List[str] = []
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.last_fsync = time.monotonic()
+
+        self.changed_items: Set[int] = set()
+        self.extended_items: Set[int] = set()
+        self.written_coords: Dict[int, int] = {}
+        self.moved_items: Dict[int, List[float]] = {}
+        self.deleted_items: Set[int] = set()
+        self.background_changed = False
+        self.flush_scheduled = False
+
+        self.file = None
+        self.snapshot_bytes = 0
+        self.lock = threading.Lock()
+        self.compactor: Optional[threading.Thread] = None
+        self.pending: Optional[List[str]] = None
+
+
+
+    def orphans(self) -> List[str]:
+        """
+        Returns the journals left by sessions that didn't end normally (no session holds their lock), the newest first.
+        """
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+
+        orphans = []
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if not (name.startswith(JOURNAL_PREFIX) and name.endswith(JOURNAL_EXTENSION)):
+                continue
+            try:
+                lock = lock_file(lock_path(path))
+                if lock is not None:
+                    lock.close()
+                    if os.path.getsize(path) > 0:
+                        orphans.append((os.path.getmtime(path), path))
+            except OSError:
+                pass
+        return [path for _, path in sorted(orphans, reverse=True)]
+
+
+
+    def discard(self, path: str) -> None:
+        """
+        Removes an orphaned journal and its lock file, unless it's this session's own (a reused process ID).
+        """
+        if path == self.path:
+            return
+        for file_path in (path, lock_path(path)):
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+
+
+
+    def start(self) -> None:
+        """
+        Starts a new journal from the current drawing, and locks it for this session.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        self.lock_file = lock_file(lock_path(self.path))
+        self.compact()
+        self.drawing_canvas.journal = self
+
+
+
+    def close(self) -> None:
+        """
+        Ends the journal on a normal exit; there is nothing to recover then.
+        """
+        self.drawing_canvas.journal = None
+        if self.compactor is not None:
+            self.compactor.join()
+        if self.file:
+            self.file.close()
+            self.file = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        if self.lock_file:
+            self.lock_file.close()
+            self.lock_file = None
+            os.remove(lock_path(self.path))
+
+
+
+    def item_changed(self, item: int) -> None:
+        """
+        Marks an item to be written whole. A stroke being drawn is marked on every motion, so that costs a lookup.
+        """
+        if item not in self.changed_items:
+            self.changed_items.add(item)
+            self.extended_items.discard(item)
+            self.moved_items.pop(item, None)
+            self.schedule_flush()
+
+
+    def item_extended(self, item: int) -> None:
+        """
+        Marks a line that had points appended, so only its new coords are written (a stroke being drawn grows on every motion).
+        """
+        if item not in self.changed_items and item not in self.extended_items:
+            self.extended_items.add(item)
+            self.schedule_flush()
+
+
+    def item_moved(self, item: int, dx: float, dy: float) -> None:
+        """
+        Adds up the moves of an item, unless its whole state is written anyway.
+        """
+        if item not in self.changed_items:
+            offset = self.moved_items.setdefault(item, [0.0, 0.0])
+            offset[0] += dx
+            offset[1] += dy
+            self.schedule_flush()
+
+
+    def item_deleted(self, item: int) -> None:
+        self.deleted_items.add(item)
+        self.changed_items.discard(item)
+        self.extended_items.discard(item)
+        self.written_coords.pop(item, None)
+        self.moved_items.pop(item, None)
+        self.schedule_flush()
+
+
+    def background_updated(self) -> None:
+        self.background_changed = True
+        self.schedule_flush()
+
+
+
+    def cleared(self) -> None:
+        """
+        The drawing was cleared: the pending operations are dropped, and the journal starts from a new snapshot.
+        """
+        self.changed_items.clear()
+        self.extended_items.clear()
+        self.moved_items.clear()
+        self.deleted_items.clear()
+        self.background_changed = False
+        self.compact()
+
+
+
+    def schedule_flush(self) -> None:
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.drawing_canvas.canvas.after(FLUSH_INTERVAL_MS, self.flush)
+
+
+
+    def flush(self) -> None:
+        """
+        Appends the pending operations to the journal, and compacts it when it has grown to twice its last snapshot.
+        The coords appended to a line come after its moves, which only moved the coords written before.
+        """
+        self.flush_scheduled = False
+        if self.drawing_canvas.journal is not self:
+            return
+
+        scene = self.drawing_canvas.scene
+        operations = [{'op': 'delete', 'items': sorted(self.deleted_items)}] if self.deleted_items else []
+        operations += [{'op': 'move', 'item': item, 'offset': offset} for item, offset in self.moved_items.items() if item in scene]
+        operations += [self.extend_operation(scene[item]) for item in sorted(self.extended_items) if item in scene]
+        operations += [self.put(scene[item]) for item in sorted(self.changed_items) if item in scene]
+        if self.background_changed:
+            operations.append({'op': 'background', 'color': self.drawing_canvas.bg})
+
+        self.changed_items.clear()
+        self.extended_items.clear()
+        self.moved_items.clear()
+        self.deleted_items.clear()
+        self.background_changed = False
+
+        if operations:
+            self.write(''.join(json.dumps(operation, separators=(',', ':')) + '\n' for operation in operations))
+            if not self.compacting() and self.file.tell() > max(MIN_COMPACT_BYTES, 2 * self.snapshot_bytes):
+                self.compact()
+
+
+
+    def write(self, text: str) -> None:
+        """
+        Appends to the journal file and syncs it to the disk by the fsync policy.
+        While a snapshot is being written, the text is also kept to be added after it.
+        """
+        with self.lock:
+            if self.pending is not None:
+                self.pending.append(text)
+            if self.file is None:
+                self.file = open(self.path, 'a', encoding='utf-8')
+
+            self.file.write(text)
+            self.file.flush()
+
+            now = time.monotonic()
+            if self.fsync == 'always' or (self.fsync == 'interval' and now - self.last_fsync >= self.fsync_interval):
+                os.fsync(self.file.fileno())
+                self.last_fsync = now
+
+
+
+    def compacting(self) -> bool:
+        return self.compactor is not None and self.compactor.is_alive()
+
+
+
+    def compact(self) -> None:
+        """
+        Replaces the journal with a snapshot of the whole drawing. The records are copied here, on the main thread,
+        and written by write_snapshot on a worker thread; a compaction still running is waited for first.
+        """
+        if self.compactor is not None:
+            self.compactor.join()
+
+        scene = self.drawing_canvas.scene
+        stacking, group_of = scene.index.stacking, scene.group_of
+        items = [(record, stacking.get(record.id, 0), group_of.get(record.id)) for record in scene.snapshot()]
+        self.written_coords = {record.id: len(record.coords) for record, _, _ in items if record.kind == 'line'}
+
+        self.pending = []
+        recovered, self.recovered = self.recovered, []
+        self.compactor = threading.Thread(target=self.write_snapshot, args=(items, self.drawing_canvas.bg, recovered), daemon=True)
+        self.compactor.start()
+
+
+
+    def write_snapshot(self, items: List[Tuple[SceneItem, int, Optional[int]]], background: str, recovered: List[str]) -> None:
+        """
+        The worker thread of compact: writes the snapshot aside, adds the operations written since it was taken,
+        and moves it in the place of the journal. Until then the operations go on to the old journal,
+        so a snapshot that can't be written leaves the journal whole.
+        The journals the drawing was recovered from are removed once it's in this one.
+        """
+        temporary_path = self.path + '.tmp'
+        try:
+            snapshot = {'op': 'snapshot', 'background': background,
+                        'items': [self.put_operation(record, place, group) for record, place, group in items]}
+            with open(temporary_path, 'w', encoding='utf-8') as file:
+                file.write(json.dumps(snapshot, separators=(',', ':')) + '\n')
+
+            with self.lock:
+                with open(temporary_path, 'a', encoding='utf-8') as file:
+                    file.write(''.join(self.pending))
+                    file.flush()
+                    if self.fsync != 'never':
+                        os.fsync(file.fileno())
+                if self.file:
+                    self.file.close()
+                    self.file = None
+                os.replace(temporary_path, self.path)
+                self.snapshot_bytes = os.path.getsize(self.path)
+            for path in recovered:
+                self.discard(path)
+        except OSError:
+            pass
+        finally:
+            with self.lock:
+                self.pending = None
+
+
+
+    def put(self, record: SceneItem) -> Dict[str, Any]:
+        """
+        The put operation of a record as it's placed in the drawing now.
+        """
+        scene = self.drawing_canvas.scene
+        if record.kind == 'line':
+            self.written_coords[record.id] = len(record.coords)
+        return self.put_operation(record, scene.index.stacking.get(record.id, 0), scene.group_of.get(record.id))
+
+
+
+    @staticmethod
+    def put_operation(record: SceneItem, place: int, group: Optional[int]) -> Dict[str, Any]:
+        """
+        The full state of an item: its record, stacking place and group.
+        Filled regions keep their image (PNG); uploaded images keep the file they came from.
+        """
+        operation = {'op': 'put', 'item': record.id, 'kind': record.kind,
+                     'coords': record.coords.tolist() if record.kind == 'line' else list(record.coords),
+                     'style': record.style, 'tags': record.tags, 'place': place, 'group': group}
+
+        if record.source is not None:
+            operation['source'] = record.source
+        elif record.image is not None:
+            buffer = io.BytesIO()
+            record.image.save(buffer, format='PNG')
+            operation['image'] = base64.b64encode(buffer.getvalue()).decode('ascii')
+
+        return operation
+
+
+
+    def extend_operation(self, record: SceneItem) -> Dict[str, Any]:
+        """
+        The coords appended to a line since it was last written, or its full state if it wasn't written yet.
+        """
+        written = self.written_coords.get(record.id)
+        if written is None or written > len(record.coords):
+            return self.put(record)
+        self.written_coords[record.id] = len(record.coords)
+        return {'op': 'extend', 'item': record.id, 'coords': record.coords[written:].tolist()}
+
+
+
+    def recover(self, path: str) -> int:
+        """
+        Replays an orphaned journal onto a cleared canvas, and returns the number of recovered items.
+        The items are drawn in their stacking order. A line cut by a crash in the middle is ignored.
+        The orphaned journal is removed once the first snapshot of this journal is written.
+        """
+        items: Dict[int, Dict[str, Any]] = {}
+        background = None
+
+        with open(path, encoding='utf-8') as file:
+            for line in file:
+                try:
+                    operation = json.loads(line)
+                except ValueError:
+                    break
+
+                if operation['op'] == 'snapshot':
+                    items = {put['item']: put for put in operation['items']}
+                    background = operation['background']
+                elif operation['op'] == 'put':
+                    items[operation['item']] = operation
+                elif operation['op'] == 'extend' and operation['item'] in items:
+                    items[operation['item']]['coords'] += operation['coords']
+                elif operation['op'] == 'move' and operation['item'] in items:
+                    dx, dy = operation['offset']
+                    put = items[operation['item']]
+                    put['coords'] = [coord + (dx if index % 2 == 0 else dy) for index, coord in enumerate(put['coords'])]
+                elif operation['op'] == 'delete':
+                    for item in operation['items']:
+                        items.pop(item, None)
+                elif operation['op'] == 'background':
+                    background = operation['color']
+
+        drawing_canvas = self.drawing_canvas
+        drawing_canvas.reset_canvas()
+        if background:
+            drawing_canvas.update_background(background)
+
+        groups: Dict[int, int] = {}
+        for put in sorted(items.values(), key=lambda put: put['place']):
+            image, source = None, put.get('source')
+            if source is not None:
+                image = render_image(source)
+            elif 'image' in put:
+                image = Image.open(io.BytesIO(base64.b64decode(put['image'])))
+                image.load()
+
+            item = drawing_canvas.draw_record(SceneItem(0, put['kind'], put['coords'], put['style'], tuple(put['tags']), image, source))
+            if put['group'] is not None:
+                if put['group'] not in groups:
+                    groups[put['group']] = drawing_canvas.scene.new_group()
+                drawing_canvas.add_to_group(groups[put['group']], item)
+
+        drawing_canvas.history.clear()
+        self.recovered.append(path)
+        return len(items)
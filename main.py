@@ -4,8 +4,17 @@ from shapes import Shapes
 from text_box import TextBox
 from file_manager import FileManager
 from object_manipulator import ObjectManipulator
+from input_coalescer import DEFAULT_FRAME_RATE
+from journal import Journal, DEFAULT_JOURNAL_DIRECTORY, FSYNC_POLICIES
+from image_cache import image_cache, DEFAULT_MEMORY_BUDGET
+from export_pipeline import export_formats
+from converter import convert, CANVAS_SIZE
 import tkinter as tk
+from tkinter import messagebox
 import argparse
+import os
+import sys
+import time
 
 
 BUTTONS_BG = 'white'
@@ -17,10 +26,12 @@ class MainWindow(tk.Tk):
     Main Window class and main operator of graphic paintin and desing program.
     Containing all the GUI features (buttons, menus, etc.)
     """
-    def __init__(self):
+    def __init__(self, frame_rate: int =DEFAULT_FRAME_RATE, journal_directory: str =DEFAULT_JOURNAL_DIRECTORY, fsync: str ='interval'):
         """
         Constructor of main window of an illustraion and design progarm.
         This class handles widgets creation and transformation between modes.
+        frame_rate caps how often dragging and drawing update the canvas.
+        The drawing is autosaved to a journal in journal_directory, synced to the disk by the fsync policy.
         """
 
         super().__init__()
@@ -34,10 +45,10 @@ class MainWindow(tk.Tk):
         self.buttons_frame = tk.Frame(self.modes_frame, bg=FRAME_BG)
         self.buttons_frame.pack(anchor='center')
 
-        self.drawing_canvas = DrawingCanvas(self, width=800, height=600)
+        self.drawing_canvas = DrawingCanvas(self, width=CANVAS_SIZE[0], height=CANVAS_SIZE[1], frame_rate=frame_rate)
         self.brush = Brush()
         self.file_manager = FileManager(self.drawing_canvas)
-        self.text_box = TextBox(self.drawing_canvas.canvas)
+        self.text_box = TextBox(self.drawing_canvas)
         self.shapes = Shapes(self.drawing_canvas)
         self.object_manipulator = ObjectManipulator(self.drawing_canvas, self.text_box, self.shapes, self.file_manager)
 
@@ -46,6 +57,42 @@ class MainWindow(tk.Tk):
         self.tools_widgets()
         self.buttons_widgets()
 
+        self.journal = Journal(self.drawing_canvas, journal_directory, fsync)
+        self.recover_drawing()
+        self.journal.start()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+
+
+
+
+    def recover_drawing(self) -> None:
+        """
+        Offers to recover the drawings of the sessions that didn't end normally from their autosave journals, the newest first,
+        until one is recovered. The journals that are turned down are removed.
+        """
+        for path in self.journal.orphans():
+            saved = time.strftime('%Y-%m-%d %H:%M', time.localtime(os.path.getmtime(path)))
+            response = messagebox.askyesno("Recover Drawing", f"A session that didn't end normally left a drawing, saved {saved}.\nDo you want to recover it?")
+            if not response:
+                self.journal.discard(path)
+                continue
+
+            try:
+                self.journal.recover(path)
+            except Exception as error:
+                messagebox.showerror("Error", f"Failed to recover the drawing. Error: {error}")
+                continue
+            break
+
+
+
+    def on_close(self) -> None:
+        """
+        Ends the autosave journal and closes the program.
+        """
+        self.journal.close()
+        self.destroy()
+
 
 
 
@@ -111,18 +158,35 @@ class MainWindow(tk.Tk):
         file_menu.add_command(label="Load Image", command=self.file_manager.open_image)
         file_menu.add_command(label="Export To jpeg", command=lambda: self.file_manager.export_to_graphic_file("JPEG"))
         file_menu.add_command(label="Export To GIF", command=lambda: self.file_manager.export_to_graphic_file("GIF"))
+        file_menu.add_command(label="Export To PNG", command=lambda: self.file_manager.export_to_graphic_file("PNG"))
+        if "WEBP" in export_formats():
+            file_menu.add_command(label="Export To WebP", command=lambda: self.file_manager.export_to_graphic_file("WEBP"))
+        file_menu.add_command(label="Export To All Formats", command=lambda: self.file_manager.export_to_graphic_file(*export_formats()))
+        file_menu.add_command(label="Export For Print...", command=self.file_manager.export_for_print)
+
+
+        edit_menu = tk.Menu(self.menu_bar, tearoff=0, background="light blue")
+        self.menu_bar.add_cascade(label="Edit", menu=edit_menu)
+        edit_menu.add_command(label="Undo", accelerator="Ctrl+Z", command=self.drawing_canvas.undo)
+        edit_menu.add_command(label="Redo", accelerator="Ctrl+Y", command=self.drawing_canvas.redo)
+        self.bind("<Control-z>", self.drawing_canvas.undo)
+        self.bind("<Control-y>", self.drawing_canvas.redo)
 
 
         brush_tools_menu = tk.Menu(self.menu_bar, tearoff=0, background="light blue")
         self.menu_bar.add_cascade(label="Brush Tools", menu=brush_tools_menu)
         brush_tools_menu.add_command(label="Change Color", command=self.brush.choose_color)
         brush_tools_menu.add_command(label="Change Thickness", command=self.brush.set_thickness)
+        brush_tools_menu.add_command(label="Stroke Simplification", command=self.brush.set_simplify_tolerance)
+        brush_tools_menu.add_command(label="Fill Tolerance", command=self.drawing_canvas.change_fill_tolerance)
         brush_tools_menu.add_command(label="Change Dot's Color", command=self.shapes.ask_for_dot_color)
         brush_tools_menu.add_command(label="Change Dots' Thickness", command=self.shapes.ask_for_dot_radius)
 
         eraser_menu = tk.Menu(self.menu_bar, tearoff=0, background="light blue")
         self.menu_bar.add_cascade(label='Eraser Size', menu=eraser_menu)
         eraser_menu.add_command(label='Choose Size', command=self.drawing_canvas.change_eraser_size)
+        eraser_menu.add_command(label='Erase Whole Objects', command=lambda: self.drawing_canvas.set_eraser_mode('object'))
+        eraser_menu.add_command(label='Erase Parts Of Strokes', command=lambda: self.drawing_canvas.set_eraser_mode('partial'))
 
         text_box_tools = tk.Menu(self.menu_bar, tearoff=0, background="light blue")
         self.menu_bar.add_cascade(label='Text Box', menu=text_box_tools)
@@ -241,7 +305,24 @@ if __name__ == '__main__':
                 To be able to use this program, you have diffrent buttons (for modifying the various modes of the program),
                 and menu for tools to change the features as you like (color, thickness, size, etc).
                 Enjoy!""")        
+    parser.add_argument('--fps', type=int, default=DEFAULT_FRAME_RATE, help="Maximum canvas updates per second while drawing and dragging (0 for no limit).")
+    parser.add_argument('--journal-dir', default=DEFAULT_JOURNAL_DIRECTORY, help="The directory of the autosave journals, one per session.")
+    parser.add_argument('--fsync', choices=FSYNC_POLICIES, default='interval', help="When the autosave journal is synced to the disk.")
+    parser.add_argument('--image-cache', type=int, default=DEFAULT_MEMORY_BUDGET // 2 ** 20, help="Memory budget of the decoded images cache, in MB.")
+
+    subparsers = parser.add_subparsers(dest='command')
+    convert_parser = subparsers.add_parser('convert', help="Converts saved drawings to image files without opening a window.")
+    convert_parser.add_argument('inputs', nargs='+', help="Drawing files (.json or binary) or glob patterns in quotes, like 'drawings/**/*.json'.")
+    convert_parser.add_argument('--format', type=str.upper, choices=export_formats(), default='PNG', help="Format of the images.")
+    convert_parser.add_argument('--scale', type=float, default=1.0, help="Size of the images relative to the canvas.")
+    convert_parser.add_argument('--output', help="Directory of the images (next to each drawing by default).")
+    convert_parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Number of worker processes.")
     args = parser.parse_args()
 
-    app = MainWindow()
+    if args.command == 'convert':
+        sys.exit(convert(args.inputs, args.format, args.scale, args.output, args.workers))
+
+    image_cache.memory_budget = args.image_cache * 2 ** 20
+
+    app = MainWindow(args.fps, args.journal_dir, args.fsync)
     app.mainloop()
\ No newline at end of file
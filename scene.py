@@ -0,0 +1,302 @@
+from array import array
+from contextlib import contextmanager
+import gc
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+from geometry import is_near_polyline, point_in_polygon
+from spatial_index import SpatialIndex, BBox
+
+
+
+@contextmanager
+def paused_gc() -> Iterator[None]:
+    """
+    Pauses the garbage collector while many small objects are made at once (a snapshot of the drawing),
+    which would otherwise trigger collections that walk the whole drawing again and again, holding the interpreter lock.
+    The pause is process-wide, so keep it to short stretches on the main thread.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+
+class SceneItem:
+    """
+    A single object of the drawing as the document stores it: its kind (the canvas item type),
+    flat coords, drawing options and tags. Images also keep their PIL image and the file it came from.
+    The ID is the canvas item that shows the object.
+    The coords of lines (strokes) are kept in a contiguous float32 buffer, 8 bytes per point.
+    """
+    __slots__ = ('id', 'kind', 'coords', 'style', 'tags', 'image', 'source')
+
+    def __init__(self, item_id: int, kind: str, coords: Sequence[float], style: Dict[str, Any], tags: Tuple[str, ...],
+                 image: Any =None, source: Optional[Dict[str, Any]] =None) -> None:
+        """
+        A constructor of a scene item.
+        """
+        self.id = item_id
+        self.kind = kind
+        self.coords = array('f', coords) if kind == 'line' else list(coords)
+        self.style = style
+        self.tags = tags
+        self.image = image
+        self.source = source
+
+
+
+    def __repr__(self) -> str:
+        return f"SceneItem({self.id}, {self.kind!r}, tags={self.tags})"
+
+
+
+    def copy(self) -> 'SceneItem':
+        """
+        Returns a copy that can be changed without changing this record (the image itself is shared).
+        """
+        return SceneItem(self.id, self.kind, self.coords, dict(self.style), self.tags,
+                         self.image, dict(self.source) if self.source else None)
+
+
+
+    def snapshot(self) -> 'SceneItem':
+        """
+        Returns a copy that keeps the current state of the record while it changes, for a save or an export in the background.
+        Only the coords are copied: the options, image and source of a record are replaced and never changed in place.
+        """
+        return SceneItem(self.id, self.kind, self.coords, self.style, self.tags, self.image, self.source)
+
+
+
+    def points(self) -> List[Tuple[float, float]]:
+        """
+        Returns the coords as (x, y) pairs.
+        """
+        return list(zip(self.coords[::2], self.coords[1::2]))
+
+
+
+    def set_coords(self, coords: Sequence[float]) -> None:
+        """
+        Replaces the coords, keeping the storage type of the kind.
+        """
+        self.coords = array('f', coords) if self.kind == 'line' else list(coords)
+
+
+
+    def coords_array(self) -> np.ndarray:
+        """
+        Returns the coords as an N x 2 float array (a copy).
+        """
+        return np.array(self.coords, dtype=float).reshape(-1, 2)
+
+
+
+class Scene:
+    """
+    The document model: the records of all the drawn objects, their spatial index and stacking order,
+    and the groups of items that act as one figure.
+    It doesn't depend on Tk, so saving, exporting, copying and hit testing don't ask the canvas anything.
+    """
+    def __init__(self, cell_size: float =32.0) -> None:
+        """
+        A constructor of the scene.
+        """
+        self.items: Dict[int, SceneItem] = {}
+        self.index = SpatialIndex(cell_size)
+        self.groups: Dict[int, Dict[int, None]] = {}
+        self.group_of: Dict[int, int] = {}
+        self.last_group = 0
+
+
+
+    def __contains__(self, item_id: int) -> bool:
+        return item_id in self.items
+
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+    def __getitem__(self, item_id: int) -> SceneItem:
+        return self.items[item_id]
+
+
+    def __iter__(self) -> Iterator[SceneItem]:
+        return iter(self.ordered())
+
+
+    def get(self, item_id: int) -> Optional[SceneItem]:
+        return self.items.get(item_id)
+
+
+
+    def put(self, record: SceneItem, bbox: BBox) -> None:
+        """
+        Adds a record on top of the stack, or replaces the record with the same ID in its place.
+        """
+        self.items[record.id] = record
+        self.index.insert(record.id, bbox)
+
+
+
+    def remove(self, item_id: int) -> Optional[SceneItem]:
+        """
+        Removes a record from the scene (and from its group) and returns it, if it's there.
+        """
+        group = self.group_of.pop(item_id, None)
+        if group is not None:
+            members = self.groups[group]
+            del members[item_id]
+            if not members:
+                del self.groups[group]
+
+        self.index.remove(item_id)
+        return self.items.pop(item_id, None)
+
+
+
+    def move(self, item_id: int, dx: float, dy: float) -> None:
+        """
+        Moves the coords and bounding box of a record.
+        """
+        record = self.items.get(item_id)
+        if record is not None:
+            if isinstance(record.coords, array):
+                np.frombuffer(record.coords, dtype=np.float32).reshape(-1, 2)[:] += (dx, dy)
+            else:
+                record.coords = [coord + (dx if index % 2 == 0 else dy) for index, coord in enumerate(record.coords)]
+            self.index.move(item_id, dx, dy)
+
+
+
+    def extend(self, item_id: int, coords: List[float], bbox: BBox) -> None:
+        """
+        Appends coords to a record (a stroke being drawn) and grows its bounding box.
+        """
+        self.items[item_id].coords.extend(coords)
+        self.index.extend(item_id, bbox)
+
+
+
+    def raise_item(self, item_id: int) -> None:
+        self.index.raise_item(item_id)
+
+
+    def lower_item(self, item_id: int) -> None:
+        self.index.lower_item(item_id)
+
+
+    def stack_like(self, item_id: int, other: int) -> None:
+        self.index.stack_like(item_id, other)
+
+
+
+    def clear(self) -> None:
+        self.items.clear()
+        self.index.clear()
+        self.groups.clear()
+        self.group_of.clear()
+
+
+
+    def new_group(self) -> int:
+        """
+        Starts a new empty group and returns its ID.
+        """
+        self.last_group += 1
+        self.groups[self.last_group] = {}
+        return self.last_group
+
+
+
+    def add_to_group(self, group: int, item_id: int) -> None:
+        self.groups[group][item_id] = None
+        self.group_of[item_id] = group
+
+
+
+    def group_members(self, item_id: int) -> List[int]:
+        """
+        Returns the items of the group the item belongs to, in the order they were added,
+        or only the item itself if it isn't grouped.
+        """
+        group = self.group_of.get(item_id)
+        return list(self.groups[group]) if group is not None else [item_id]
+
+
+
+    def bbox(self, item_id: int) -> Optional[BBox]:
+        return self.index.bboxes.get(item_id)
+
+
+
+    def ordered(self) -> List[SceneItem]:
+        """
+        Returns the records from the bottom of the stack to the top.
+        """
+        stacking = self.index.stacking
+        return sorted(self.items.values(), key=lambda record: stacking[record.id])
+
+
+
+    def snapshot(self) -> List[SceneItem]:
+        """
+        Returns snapshots of the records from the bottom of the stack to the top,
+        which a worker thread can read while the drawing goes on changing.
+        """
+        with paused_gc():
+            return [record.snapshot() for record in self.ordered()]
+
+
+
+    def with_tag(self, tag: str) -> List[SceneItem]:
+        """
+        Returns the records with the given tag, from the bottom of the stack to the top.
+        """
+        return [record for record in self.ordered() if tag in record.tags]
+
+
+
+    def hit_test(self, item_id: int, x: float, y: float, radius: float) -> bool:
+        """
+        Checks if the circle of the given radius around a point touches the item's geometry.
+        """
+        record = self.items[item_id]
+        x1, y1, x2, y2 = self.index.bboxes[item_id]
+
+        if record.kind == 'line':
+            return is_near_polyline((x, y), record.points(), radius + float(record.style.get('width', 1)) / 2)
+
+        if record.kind == 'oval':
+            radius_x, radius_y = (x2 - x1) / 2 + radius, (y2 - y1) / 2 + radius
+            center_x, center_y = (x1 + x2) / 2, (y1 + y2) / 2
+            return ((x - center_x) / radius_x) ** 2 + ((y - center_y) / radius_y) ** 2 <= 1
+
+        if record.kind == 'polygon':
+            outline = record.points()
+            return point_in_polygon((x, y), record.coords) or is_near_polyline((x, y), outline + outline[:1], radius + 1)
+
+        if record.kind == 'image' and record.image is not None and radius <= 1:
+            image = record.image
+            left, top = (x1, y1) if record.style.get('anchor') == 'nw' else ((x1 + x2 - image.width) / 2, (y1 + y2 - image.height) / 2)
+            pixel_x, pixel_y = int(x - left), int(y - top)
+            if image.mode == 'RGBA' and 0 <= pixel_x < image.width and 0 <= pixel_y < image.height:
+                return image.getpixel((pixel_x, pixel_y))[3] > 0
+
+        return x1 - radius <= x <= x2 + radius and y1 - radius <= y <= y2 + radius
+
+
+
+    def item_at(self, x: float, y: float, halo: float =1.0, tag: Optional[str] =None) -> Optional[int]:
+        """
+        Returns the topmost item under the point (with the given tag), or None.
+        """
+        for item_id in self.index.query(x - halo, y - halo, x + halo, y + halo):
+            if (tag is None or tag in self.items[item_id].tags) and self.hit_test(item_id, x, y, halo):
+                return item_id
+        return None
@@ -0,0 +1,412 @@
+from bisect import bisect_left, bisect_right
+from PIL import Image, ImageDraw
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import numpy as np
+from scene import SceneItem, paused_gc
+from image_transform import render_image
+from font_resolver import font_resolver
+from geometry import dot_positions
+
+
+ROW_BLOCK = 64
+TEXT_ANCHORS = {'center': 'mm', 'nw': 'la', 'n': 'ma', 'ne': 'ra', 'w': 'lm', 'e': 'rm', 'sw': 'ld', 's': 'md', 'se': 'rd'}
+
+
+
+def font_to_pil(font_str: str, scale: float =1.0) -> Tuple[Any, int]:
+    """
+    Converts a font specification from Tkinter (like '{Times New Roman} 14 bold italic') to a PIL font object,
+    loaded at a scale of its size, for drawings exported larger than the canvas, and returns it with the scaled size.
+    The font files come from the font resolver's index and the loaded fonts from its cache,
+    so each face is loaded once for all the texts and exports.
+    """
+    return font_resolver.tk_font(font_str, scale)
+
+
+
+def dash_period(dash: Any) -> float:
+    """
+    The length of one repeat of a Tk dash pattern (like '1 9' or (1, 9)): the spacing of the dots of a dotted figure.
+    """
+    if not dash:
+        return 1.0
+    lengths = dash if isinstance(dash, (list, tuple)) else str(dash).split()
+    return sum(float(length) for length in lengths) or 1.0
+
+
+
+class ItemPainter:
+    """
+    Draws scene records on PIL tiles, at a scale of the canvas. It doesn't touch Tk: the colors of the records
+    must be resolved by Tk beforehand into colors, so it can draw on a worker thread or in another process.
+    Fonts come from the shared font resolver, and uploaded images are rendered once per scale from their files.
+    """
+    def __init__(self, colors: Dict[str, Tuple[int, int, int]], scale: float =1.0) -> None:
+        """
+        A constructor of the item painter.
+        """
+        self.colors = colors
+        self.scale = scale
+        self.fonts: Dict[str, Any] = {}
+        self.images: Dict[int, Image.Image] = {}
+
+
+
+    def paint(self, tile: Image.Image, draw: ImageDraw.ImageDraw, record: SceneItem, left: int, top: int) -> None:
+        """
+        Draws a single record on a tile whose top left corner is at (left, top) in the scaled drawing.
+        The coords are rounded to whole pixels first: PIL rounds the negative coords of items that cross
+        the tile's edge differently, which would leave seams between the tiles.
+        """
+        item_type, style, scale = record.kind, record.style, self.scale
+        coords = [round(coord * scale) - (left if index % 2 == 0 else top) for index, coord in enumerate(record.coords)]
+        fill = self.colors[style['fill']] if style.get('fill') else None
+        outline = self.colors[style['outline']] if style.get('outline') else None
+        width = max(1, int(round(float(style.get('width') or 1) * scale)))
+
+        if item_type == 'line' and "dots" in record.tags:
+            self.paint_dots(tile, draw, coords, fill, float(style.get('width') or 1) * scale / 2, dash_period(style.get('dash')) * scale)
+
+        elif item_type == 'line' and len(coords) >= 4:
+            draw.line(coords, fill=fill, width=width, joint='curve')
+
+        elif item_type == 'rectangle':
+            draw.rectangle(self.ordered_box(coords), fill=fill, outline=outline, width=width)
+
+        elif item_type == 'oval':
+            draw.ellipse(self.ordered_box(coords), fill=fill, outline=outline, width=width)
+
+        elif item_type == 'polygon' and len(coords) >= 6:
+            draw.polygon(coords, fill=fill, outline=outline)
+
+        elif item_type == 'text':
+            font = style.get('font', 'Arial 12')
+            if font not in self.fonts:
+                self.fonts[font] = font_to_pil(font, scale)[0]
+            draw.text(coords, style.get('text', ''), fill=fill, font=self.fonts[font], anchor=TEXT_ANCHORS.get(style.get('anchor'), 'mm'))
+
+        elif item_type == 'image':
+            image = self.image(record)
+            if image is not None:
+                if style.get('anchor', 'center') == 'center':
+                    coords = [coords[0] - image.width // 2, coords[1] - image.height // 2]
+                tile.paste(image, (int(coords[0]), int(coords[1])), image)
+
+
+
+    def image(self, record: SceneItem) -> Optional[Image.Image]:
+        """
+        Returns the RGBA image of an image record at the scale. Uploaded images are rendered from their files
+        by their transform; filled regions are enlarged pixel by pixel, as they are masks of the canvas.
+        """
+        image = record.image
+        if image is None:
+            return None
+        if self.scale == 1.0:
+            return image if image.mode == 'RGBA' else image.convert('RGBA')
+
+        if record.id not in self.images:
+            if record.source is not None:
+                image = render_image(record.source, self.scale)
+            else:
+                image = image.resize((max(1, round(image.width * self.scale)), max(1, round(image.height * self.scale))), Image.NEAREST)
+            self.images[record.id] = image if image.mode == 'RGBA' else image.convert('RGBA')
+        return self.images[record.id]
+
+
+
+    @staticmethod
+    def paint_dots(tile: Image.Image, draw: ImageDraw.ImageDraw, coords: List[float], fill: Any, radius: float, spacing: float) -> None:
+        """
+        Draws the dots of a dotted figure where the canvas draws them, only those that fall on the tile.
+        """
+        dots = dot_positions(np.array(coords, dtype=float).reshape(-1, 2), spacing)
+        on_tile = ((dots[:, 0] >= -radius) & (dots[:, 0] <= tile.width + radius) &
+                   (dots[:, 1] >= -radius) & (dots[:, 1] <= tile.height + radius))
+        for x, y in dots[on_tile].tolist():
+            draw.ellipse((x - radius, y - radius, x + radius, y + radius), fill=fill)
+
+
+
+    @staticmethod
+    def ordered_box(coords: List[float]) -> List[float]:
+        return [min(coords[0], coords[2]), min(coords[1], coords[3]), max(coords[0], coords[2]), max(coords[1], coords[3])]
+
+
+
+class SceneRaster:
+    """
+    An off-screen copy of the canvas, kept as packed RGBA pixels (one uint32 per pixel).
+    The raster is divided to tiles, and only the tiles touched by changed items are rendered again.
+    The bucket fill and the export both use it, so after small edits they only pay for the changed tiles.
+    Rendering works on a snapshot of the dirty tiles taken on the main thread, so an export can render on a worker thread
+    while the drawing goes on changing.
+    """
+    def __init__(self, drawing_canvas, tile_size: int =256) -> None:
+        """
+        A constructor of the scene raster.
+        """
+        self.drawing_canvas = drawing_canvas
+        self.canvas = drawing_canvas.canvas
+        self.scene = drawing_canvas.scene
+        self.tile_size = tile_size
+        self.pixels: Optional[np.ndarray] = None
+        self.dirty_tiles: Set[Tuple[int, int]] = set()
+        self.colors: Dict[str, Tuple[int, int, int]] = {}
+        self.painter = ItemPainter(self.colors)
+        self.snapshots: List[Dict[str, Any]] = []
+
+
+
+    def invalidate(self, bbox: Optional[Tuple[float, float, float, float]] =None) -> None:
+        """
+        Marks the tiles of a region as dirty, or the whole raster if no region is given.
+        """
+        if self.pixels is None:
+            return
+
+        rows, cols = self.tile_grid()
+        if bbox is None:
+            tiles = {(col, row) for col in range(cols) for row in range(rows)}
+        else:
+            size = self.tile_size
+            first_col, first_row = max(0, int(bbox[0] // size)), max(0, int(bbox[1] // size))
+            last_col, last_row = min(cols - 1, int(bbox[2] // size)), min(rows - 1, int(bbox[3] // size))
+            tiles = {(col, row) for col in range(first_col, last_col + 1) for row in range(first_row, last_row + 1)}
+
+        self.dirty_tiles.update(tiles)
+        for snapshot in self.snapshots:
+            snapshot['touched'].update(tiles)
+
+
+
+    def item_changed(self, item: int, *bboxes) -> None:
+        """
+        Marks the old and new regions of a changed item as dirty.
+        """
+        for bbox in bboxes:
+            if bbox:
+                self.invalidate(bbox)
+
+
+
+    def item_moved(self, item: int, bbox, dx: float, dy: float) -> None:
+        """
+        Marks the old and new regions of a moved item as dirty.
+        """
+        if bbox:
+            self.invalidate(bbox)
+            self.invalidate((bbox[0] + dx, bbox[1] + dy, bbox[2] + dx, bbox[3] + dy))
+
+
+
+    def image(self) -> Image.Image:
+        """
+        Brings the raster up to date and returns it as an RGB image, as the drawing is exported.
+        """
+        return self.to_image(self.render())
+
+
+
+    @staticmethod
+    def to_image(pixels: np.ndarray) -> Image.Image:
+        height, width = pixels.shape
+        return Image.frombuffer('RGBA', (width, height), pixels, 'raw', 'RGBA', 0, 1).convert('RGB')
+
+
+
+    def tile_grid(self) -> Tuple[int, int]:
+        height, width = self.pixels.shape
+        return -(-height // self.tile_size), -(-width // self.tile_size)
+
+
+    def tile_box(self, col: int, row: int, shape: Tuple[int, int]) -> Tuple[int, int, int, int]:
+        """
+        Returns the left, top, right and bottom of a tile in a raster of the given shape.
+        """
+        height, width = shape
+        left, top = col * self.tile_size, row * self.tile_size
+        return left, top, min(width, left + self.tile_size), min(height, top + self.tile_size)
+
+
+
+    def render(self) -> np.ndarray:
+        """
+        Brings the raster up to date with the canvas and returns its pixels.
+        A new canvas size renders everything again.
+        """
+        self.render_snapshot(self.snapshot(detached=False))
+        return self.pixels
+
+
+
+    def snapshot(self, detached: bool =True) -> Dict[str, Any]:
+        """
+        Takes on the main thread all that rendering the dirty tiles needs from the canvas and the scene:
+        the items over each tile from the bottom of the stack to the top, their records, and their colors resolved by Tk.
+        A detached snapshot has its own copy of the pixels and snapshots of the records, so render_snapshot
+        can draw it on a worker thread; its tiles stay dirty until it's adopted.
+        Otherwise the snapshot draws on the raster itself, right away.
+        """
+        width, height = max(1, self.canvas.winfo_width()), max(1, self.canvas.winfo_height())
+        if self.pixels is None or self.pixels.shape != (height, width):
+            self.pixels = np.zeros((height, width), dtype=np.uint32)
+            self.invalidate()
+
+        tiles: Dict[Tuple[int, int], List[int]] = {}
+        for col, row in sorted(self.dirty_tiles):
+            items = self.scene.index.query(*self.tile_box(col, row, self.pixels.shape))
+            items.reverse()
+            tiles[(col, row)] = items
+
+        scene_items = self.scene.items
+        with paused_gc():
+            records = dict.fromkeys(item for items in tiles.values() for item in items)
+            for item in records:
+                records[item] = scene_items[item].snapshot() if detached else scene_items[item]
+        for style in {id(record.style): record.style for record in records.values()}.values():
+            for option in ('fill', 'outline'):
+                if style.get(option):
+                    self.color(style[option])
+
+        snapshot = {'pixels': self.pixels.copy() if detached else self.pixels, 'tiles': tiles, 'records': records,
+                    'background': self.color(self.canvas['background']), 'touched': set()}
+        if detached:
+            self.snapshots.append(snapshot)
+        else:
+            self.dirty_tiles.clear()
+        return snapshot
+
+
+
+    def render_snapshot(self, snapshot: Dict[str, Any], progress: Optional[Callable[[float], None]] =None) -> np.ndarray:
+        """
+        Draws the tiles of a snapshot on its pixels, without touching Tk or the scene, and returns the pixels.
+        progress, if given, is called with the fraction of the tiles that are done.
+        """
+        pixels, tiles, records = snapshot['pixels'], snapshot['tiles'], snapshot['records']
+        for done, ((col, row), items) in enumerate(tiles.items(), 1):
+            self.render_tile(pixels, col, row, [records[item] for item in items], snapshot['background'])
+            if progress:
+                progress(done / len(tiles))
+        return pixels
+
+
+
+    def adopt(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Takes the tiles a detached snapshot rendered into the raster, except the ones that changed since it was taken.
+        """
+        self.release(snapshot)
+        if self.pixels is None or self.pixels.shape != snapshot['pixels'].shape:
+            return
+
+        for tile in snapshot['tiles']:
+            if tile in self.dirty_tiles and tile not in snapshot['touched']:
+                left, top, right, bottom = self.tile_box(*tile, self.pixels.shape)
+                self.pixels[top:bottom, left:right] = snapshot['pixels'][top:bottom, left:right]
+                self.dirty_tiles.discard(tile)
+
+
+
+    def release(self, snapshot: Dict[str, Any]) -> None:
+        """
+        Forgets a detached snapshot (a cancelled export); its tiles are still dirty.
+        """
+        self.snapshots = [other for other in self.snapshots if other is not snapshot]
+
+
+
+    def render_tile(self, pixels: np.ndarray, col: int, row: int, records: List[SceneItem], background: Tuple[int, int, int]) -> None:
+        """
+        Draws the records of a single tile, from the bottom of the stack to the top.
+        """
+        left, top, right, bottom = self.tile_box(col, row, pixels.shape)
+
+        tile = Image.new('RGBA', (right - left, bottom - top), background + (255,))
+        draw = ImageDraw.Draw(tile)
+
+        for record in records:
+            self.painter.paint(tile, draw, record, left, top)
+
+        pixels[top:bottom, left:right] = np.asarray(tile).view(np.uint32)[:, :, 0]
+
+
+
+    def color(self, color: str) -> Tuple[int, int, int]:
+        """
+        Converts a Tk color name to RGB, once per color.
+        """
+        if color not in self.colors:
+            red, green, blue = self.canvas.winfo_rgb(color)
+            self.colors[color] = (red >> 8, green >> 8, blue >> 8)
+        return self.colors[color]
+
+
+
+def flood_fill_mask(pixels: np.ndarray, x: int, y: int, tolerance: int =0) -> Tuple[np.ndarray, int, int]:
+    """
+    Scanline flood fill over a packed RGBA raster, starting from (x, y).
+    A pixel joins the region if each of its channels is within the tolerance of the starting pixel.
+    Rows are matched in blocks and only when the fill reaches them.
+    Returns the mask of the filled region cropped to its bounding box, and the box's top left corner.
+    """
+    height, width = pixels.shape
+    target = pixels[y, x]
+    target_channels = [int(target >> shift) & 255 for shift in (0, 8, 16)]
+    row_runs: Dict[int, Tuple[List[int], List[int]]] = {}
+
+    def matching(rows: np.ndarray) -> np.ndarray:
+        if tolerance <= 0:
+            return rows == target
+
+        matches = np.ones(rows.shape, dtype=bool)
+        for shift, channel in zip((0, 8, 16), target_channels):
+            values = (rows >> shift) & 255
+            matches &= (values >= channel - tolerance) & (values <= channel + tolerance)
+        return matches
+
+    def runs_of(row: int) -> Tuple[List[int], List[int]]:
+        if row not in row_runs:
+            first_row = row - row % ROW_BLOCK
+            block = matching(pixels[first_row:first_row + ROW_BLOCK])
+
+            padded = np.zeros((len(block), width + 2), dtype=bool)
+            padded[:, 1:-1] = block
+            edge_rows, edge_cols = np.nonzero(padded[:, 1:] != padded[:, :-1])
+            starts, ends = edge_cols[0::2].tolist(), edge_cols[1::2].tolist()
+            splits = np.searchsorted(edge_rows[0::2], np.arange(len(block) + 1)).tolist()
+
+            for offset in range(len(block)):
+                row_runs[first_row + offset] = (starts[splits[offset]:splits[offset + 1]], ends[splits[offset]:splits[offset + 1]])
+
+        return row_runs[row]
+
+    seed_starts, seed_ends = runs_of(y)
+    seed = (y, bisect_right(seed_ends, x))
+    visited = {seed}
+    stack = [seed]
+    filled: List[Tuple[int, int, int]] = []
+
+    while stack:
+        row, index = stack.pop()
+        starts, ends = runs_of(row)
+        start, end = starts[index], ends[index]
+        filled.append((row, start, end))
+
+        for next_row in (row - 1, row + 1):
+            if 0 <= next_row < height:
+                next_starts, next_ends = runs_of(next_row)
+
+                for next_index in range(bisect_right(next_ends, start), bisect_left(next_starts, end)):
+                    if (next_row, next_index) not in visited:
+                        visited.add((next_row, next_index))
+                        stack.append((next_row, next_index))
+
+    top, bottom = min(run[0] for run in filled), max(run[0] for run in filled) + 1
+    left, right = min(run[1] for run in filled), max(run[2] for run in filled)
+    mask = np.zeros((bottom - top, right - left), dtype=bool)
+    for row, start, end in filled:
+        mask[row - top, start - left:end - left] = True
+
+    return mask, left, top
@@ -21,14 +21,11 @@ class Shapes:
         self.rectangle_size = 50.0
         self.oval_size = 50.0
 
-        self.drawn_shapes: Dict[int, Any] = {}
-        self.current_dot: List[int] = []
-        self.drawn_dots: List[List[int]] = []
+        self.current_figure: Optional[int] = None
 
         self.dot_radius = 2.0
         self.dot_color = "black"
         self.dot_spacing = 10
-        self.last_dot_position: Optional[Tuple[int, int]] = None
     
 
 
@@ -39,14 +36,11 @@ class Shapes:
         """
         self.canvas.set_mode('shapes')
         self.current_shape = shape_type
+        self.current_figure = None
 
         if shape_type == 'dots':
-            self.last_dot_position = None
-            self.canvas.canvas.bind('<B1-Motion>', self.dot_drawing_helper)
-
-            if len(self.current_dot) > 0:
-                self.drawn_dots.append(self.current_dot)
-                self.current_dot.clear()
+            self.canvas.canvas.bind('<B1-Motion>', self.canvas.input_coalescer.wrap(self.dot_drawing_points, keep_all=True))
+            self.canvas.canvas.bind("<ButtonRelease-1>", self.add_current_dot)
 
         elif shape_type == 'polygon':
             self.polygon_vertices: List[Tuple[int, int]] = []
@@ -79,7 +73,7 @@ class Shapes:
         """
         shape_id = self.canvas.canvas.create_rectangle(x - self.rectangle_size/2, y - self.rectangle_size/2, x + self.rectangle_size/2, y + self.rectangle_size/2,
                                       outline=self.shape_color, fill=self.fill_color, tags=("movable", "erasable", "shape"))
-        self.drawn_shapes[shape_id] = self
+        self.canvas.index_item(shape_id)
 
 
 
@@ -90,7 +84,7 @@ class Shapes:
         """
         shape_id = self.canvas.canvas.create_oval(x - self.oval_size/2, y - self.oval_size/2, x + self.oval_size/2, y + self.oval_size/2,
                                 outline=self.shape_color, fill=self.fill_color, tags=("movable", "erasable", "shape"))
-        self.drawn_shapes[shape_id] = self
+        self.canvas.index_item(shape_id)
 
 
 
@@ -110,7 +104,7 @@ class Shapes:
         shape_id = self.canvas.canvas.create_polygon(vertex1, vertex2, vertex3, outline=self.shape_color,
                                 fill=self.fill_color, tags=("movable", "erasable", "shape"))
         
-        self.drawn_shapes[shape_id] = self
+        self.canvas.index_item(shape_id)
 
 
 
@@ -125,6 +119,7 @@ class Shapes:
 
             if clicked_shape:
                 self.canvas.canvas.itemconfig(clicked_shape, outline=color_code[1])
+                self.canvas.index_item(clicked_shape)
             else:
                 self.shape_color = color_code[1]
     
@@ -140,6 +135,7 @@ class Shapes:
 
             if clicked_shape:
                 self.canvas.canvas.itemconfig(clicked_shape, fill=color_code[1])
+                self.canvas.index_item(clicked_shape)
 
             else:
                 self.fill_color = color_code[1]
@@ -165,6 +161,7 @@ class Shapes:
         new_coords = [coord for vertex in [vertex1, vertex2, vertex3] for coord in vertex]
 
         self.canvas.canvas.coords(clicked_shape, *new_coords)
+        self.canvas.index_item(clicked_shape)
 
 
 
@@ -179,6 +176,7 @@ class Shapes:
                 
         new_coords = [center_x - new_size / 2, center_y - new_size / 2, center_x + new_size / 2, center_y + new_size / 2]
         self.canvas.canvas.coords(clicked_shape, new_coords)
+        self.canvas.index_item(clicked_shape)
 
 
 
@@ -233,68 +231,57 @@ class Shapes:
 
 
 
-    def draw_dots(self, start: Tuple[int, int], end: Optional[Tuple[int, int]] =None) -> None:
+    def dot_options(self) -> Dict[str, Any]:
         """
-        This method draw dots on the canvas.
-        Been used for drawing dots line and polygon figures.
+        The canvas options of a dotted figure: a single line whose dashes are round dots
+        of the dot radius and color, the dot spacing apart.
         """
-        if end:
-            dx, dy = end[0] - start[0], end[1] - start[1]
-            distance = ((dx ** 2) + (dy ** 2)) ** 0.5
-            steps = max(1, int(distance / self.dot_spacing))
-
+        spacing = max(2, min(int(self.dot_spacing), 256))
+        return {'fill': self.dot_color, 'width': max(1.0, self.dot_radius * 2), 'dash': (1, spacing - 1),
+                'capstyle': tk.ROUND, 'joinstyle': tk.ROUND, 'tags': ("movable", "erasable", "dots")}
 
-            for step in range(steps + 1):
-                x = start[0] + (dx * step / steps)
-                y = start[1] + (dy * step / steps)
-                self.place_dot((x, y))
-        else:
-            self.place_dot(start)
 
 
-
-    def place_dot(self, position: Tuple[float, float]) -> None:
+    def extend_figure(self, positions: List[Tuple[float, float]]) -> None:
         """
-        Places a single dot at the given position.
+        Extends the dotted figure being drawn (a dotted line or polygon) with positions, in one canvas call.
+        The figure starts as a single dot at the first position (or again, if it was undone meanwhile).
         """
-        dot_id = self.canvas.canvas.create_oval(
-                position[0] - self.dot_radius, position[1] - self.dot_radius,
-                position[0] + self.dot_radius, position[1] + self.dot_radius,
-                fill=self.dot_color, outline=self.dot_color,
-                tags=("movable", "erasable", "polygon"))
-                
-        self.current_dot.append(dot_id)
+        if not positions:
+            return
+        if self.current_figure is None or self.current_figure not in self.canvas.scene:
+            x, y = positions[0]
+            self.current_figure = self.canvas.canvas.create_line(x, y, x, y, **self.dot_options())
+            self.canvas.index_item(self.current_figure)
+            positions = positions[1:]
 
+        if positions:
+            self.canvas.append_points(self.current_figure, positions)
 
 
-    def dot_drawing_helper(self, event) -> None:
+
+    def dot_drawing_points(self, events: List[Any]) -> None:
         """
-        Helper method for draw_dots method.
+        Draws the dots of all the mouse positions of a frame.
         """
-        current_x, current_y = event.x, event.y
-    
-        if self.last_dot_position:
-            distance = ((current_x - self.last_dot_position[0])**2 + (current_y - self.last_dot_position[1])**2)**0.5
-            if distance > self.dot_spacing:
-                self.draw_dots((current_x, current_y))
+        self.extend_figure([(event.x, event.y) for event in events])
 
-            else:
-                self.draw_dots(self.last_dot_position, (current_x, current_y))
 
-        else:
-            self.draw_dots((current_x, current_y))
-        self.last_dot_position = (current_x, current_y)
-        self.canvas.canvas.bind("<ButtonRelease-1>", self.add_current_dot)
 
+    def add_current_dot(self, event=None) -> None:
+        """
+        This methods ends the dotted line being drawn, so the next dots start a new one.
+        """
+        self.canvas.input_coalescer.flush(self.dot_drawing_points)
+        self.end_current_figure()
 
 
-    def add_current_dot(self, event=None) -> None:
+
+    def end_current_figure(self) -> None:
         """
-        This methods add the dotted line to a list which stores all lines.
+        Ends the dotted figure being drawn, so the next dots start a new one.
         """
-        if self.current_dot:
-            self.drawn_dots.append(self.current_dot)
-            self.current_dot = []
+        self.current_figure = None
 
 
 
@@ -332,28 +319,20 @@ class Shapes:
 
     def add_polygon_vertex(self, event) -> None:
         """
-        Adds a vertex to the polygon.
+        Adds a vertex to the polygon; the dotted edges between the vertices are drawn as they're added.
         """
         self.polygon_vertices.append((event.x, event.y))
-        polygon_id = self.canvas.canvas.create_oval(event.x - self.dot_radius, event.y - self.dot_radius, event.x + self.dot_radius, event.y + self.dot_radius,
-                                 fill=self.dot_color, outline=self.dot_color, tags=("movable", "erasable", "polygon"))
-        
-        self.current_dot.append(polygon_id)
+        self.extend_figure([(event.x, event.y)])
 
 
 
     def complete_polygon(self, event) -> None:
         """
-        This method completes the polygon creation.
+        This method completes the polygon creation, closing its path back to the first vertex.
         """
         if len(self.polygon_vertices) > 2:
-
-            self.polygon_vertices.append(self.polygon_vertices[0])
-
-            for i in range(len(self.polygon_vertices) - 1):
-
-                self.draw_dots(self.polygon_vertices[i], self.polygon_vertices[i + 1])
-            self.drawn_dots.append(self.current_dot)
+            self.extend_figure([self.polygon_vertices[0]])
+            self.end_current_figure()
             self.polygon_vertices.clear()
 
 
@@ -365,7 +344,7 @@ class Shapes:
         """
         self.dragged_shape_name = shape_type
         self.canvas.canvas.bind("<ButtonPress-1>", self.on_press)
-        self.canvas.canvas.bind("<B1-Motion>", self.on_drag)
+        self.canvas.canvas.bind("<B1-Motion>", self.canvas.input_coalescer.wrap(self.on_drag))
         self.canvas.canvas.bind("<ButtonRelease-1>", self.on_release)
 
         
@@ -393,5 +372,6 @@ class Shapes:
         """
         Finishes the drawing of the shapes.
         """
+        self.canvas.input_coalescer.flush(self.on_drag)
         self.canvas.canvas.coords(self.dragged_shape, self.start_x, self.start_y, event.x, event.y)
-        self.drawn_shapes[self.dragged_shape] = self
+        self.canvas.index_item(self.dragged_shape)
@@ -0,0 +1,171 @@
+from typing import Dict, Hashable, Iterator, List, Set, Tuple
+
+
+BBox = Tuple[float, float, float, float]
+CellRange = Tuple[int, int, int, int]
+
+
+
+class SpatialIndex:
+    """
+    A uniform grid of the items' bounding boxes together with their stacking order.
+    Answers "which items are around this point or in this region" without asking the Tk canvas.
+    """
+    def __init__(self, cell_size: float =32.0) -> None:
+        """
+        A constructor of the spatial index.
+        """
+        self.cell_size = cell_size
+        self.cells: Dict[Tuple[int, int], Set[Hashable]] = {}
+        self.bboxes: Dict[Hashable, BBox] = {}
+        self.stacking: Dict[Hashable, int] = {}
+        self.top = 0
+        self.bottom = 0
+
+
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.bboxes
+
+
+    def __len__(self) -> int:
+        return len(self.bboxes)
+
+
+
+    def cell_range(self, bbox: BBox) -> CellRange:
+        """
+        Returns the first and last grid columns and rows a bounding box touches.
+        """
+        size = self.cell_size
+        return int(bbox[0] // size), int(bbox[1] // size), int(bbox[2] // size), int(bbox[3] // size)
+
+
+
+    @staticmethod
+    def cells_of(cell_range: CellRange) -> Iterator[Tuple[int, int]]:
+        first_col, first_row, last_col, last_row = cell_range
+        for col in range(first_col, last_col + 1):
+            for row in range(first_row, last_row + 1):
+                yield col, row
+
+
+
+    def insert(self, key: Hashable, bbox: BBox) -> None:
+        """
+        Adds an item on top of the stacking order, or updates the bounding box of an indexed item.
+        Only the grid cells that the item enters or leaves are touched.
+        """
+        new_range = self.cell_range(bbox)
+
+        if key in self.bboxes:
+            old_range = self.cell_range(self.bboxes[key])
+            if old_range != new_range:
+                old_cells, new_cells = set(self.cells_of(old_range)), set(self.cells_of(new_range))
+                for cell in old_cells - new_cells:
+                    self.discard_from_cell(cell, key)
+                for cell in new_cells - old_cells:
+                    self.cells.setdefault(cell, set()).add(key)
+        else:
+            for cell in self.cells_of(new_range):
+                self.cells.setdefault(cell, set()).add(key)
+            self.top += 1
+            self.stacking[key] = self.top
+
+        self.bboxes[key] = bbox
+
+
+
+    def extend(self, key: Hashable, bbox: BBox) -> None:
+        """
+        Grows the bounding box of an item to include the given one (a stroke being drawn).
+        """
+        if key in self.bboxes:
+            old = self.bboxes[key]
+            bbox = (min(old[0], bbox[0]), min(old[1], bbox[1]), max(old[2], bbox[2]), max(old[3], bbox[3]))
+        self.insert(key, bbox)
+
+
+
+    def discard_from_cell(self, cell: Tuple[int, int], key: Hashable) -> None:
+        keys = self.cells.get(cell)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.cells[cell]
+
+
+
+    def remove(self, key: Hashable) -> None:
+        """
+        Removes an item from the index, if it's there.
+        """
+        bbox = self.bboxes.pop(key, None)
+        if bbox is not None:
+            for cell in self.cells_of(self.cell_range(bbox)):
+                self.discard_from_cell(cell, key)
+            del self.stacking[key]
+
+
+
+    def move(self, key: Hashable, dx: float, dy: float) -> None:
+        """
+        Moves the bounding box of an item.
+        """
+        if key in self.bboxes:
+            x1, y1, x2, y2 = self.bboxes[key]
+            self.insert(key, (x1 + dx, y1 + dy, x2 + dx, y2 + dy))
+
+
+
+    def raise_item(self, key: Hashable) -> None:
+        if key in self.stacking:
+            self.top += 1
+            self.stacking[key] = self.top
+
+
+    def lower_item(self, key: Hashable) -> None:
+        if key in self.stacking:
+            self.bottom -= 1
+            self.stacking[key] = self.bottom
+
+
+
+    def stack_like(self, key: Hashable, other: Hashable) -> None:
+        """
+        Puts an item at the stacking place of another one (pieces of a cut stroke).
+        """
+        if key in self.stacking and other in self.stacking:
+            self.stacking[key] = self.stacking[other]
+
+
+
+    def clear(self) -> None:
+        self.cells.clear()
+        self.bboxes.clear()
+        self.stacking.clear()
+        self.top = self.bottom = 0
+
+
+
+    def query(self, x1: float, y1: float, x2: float, y2: float, topmost_first: bool =True) -> List[Hashable]:
+        """
+        Returns the items whose bounding boxes overlap the region, topmost first
+        (unordered for region queries that don't care about stacking).
+        """
+        bboxes = self.bboxes
+        seen: Set[Hashable] = set()
+        overlapping = []
+
+        for cell in self.cells_of(self.cell_range((x1, y1, x2, y2))):
+            for key in self.cells.get(cell, ()):
+                if key not in seen:
+                    seen.add(key)
+                    bbox = bboxes[key]
+                    if bbox[0] <= x2 and bbox[2] >= x1 and bbox[1] <= y2 and bbox[3] >= y1:
+                        overlapping.append(key)
+
+        if topmost_first:
+            overlapping.sort(key=self.stacking.__getitem__, reverse=True)
+
+        return overlapping
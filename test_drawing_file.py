@@ -0,0 +1,85 @@
+import base64
+import io
+import random
+import pytest
+from PIL import Image
+from drawing_file import write_drawing, read_drawing, COMPRESSIONS
+
+
+STYLES = [{'type': 'line', 'tags': ["movable", "erasable", "line"], 'config': {'fill': 'black', 'width': 2.0}},
+          {'type': 'text', 'tags': ["movable", "erasable", "text_box"], 'config': {'text': 'Hello', 'font': 'Helvetica 14', 'fill': 'red'}},
+          {'type': 'rectangle', 'tags': ["movable", "erasable", "shape"], 'config': {'outline': 'black', 'fill': 'white'}},
+          {'type': 'oval', 'tags': ["movable", "erasable", "shape"], 'config': {'outline': 'blue', 'fill': 'white'}},
+          {'type': 'image', 'tags': ["movable", "erasable", "fill"], 'config': {'anchor': 'nw'}}]
+
+
+
+def fill_image(color: str) -> str:
+    buffer = io.BytesIO()
+    Image.new('RGBA', (12, 8), color).save(buffer, format='PNG')
+    return base64.b64encode(buffer.getvalue()).decode('ascii')
+
+
+
+def scene_data():
+    """
+    A drawing of lines, texts, shapes and filled regions, with coords that float32 holds exactly (multiples of 1/8).
+    """
+    random.seed(0)
+    coord = lambda: random.randint(-800, 8000) / 8
+    items_data = []
+    for _ in range(50):
+        items_data.append({'style': 0, 'coords': [coord() for _ in range(2 * random.randint(2, 40))]})
+    items_data.append({'style': 1, 'coords': [coord(), coord()]})
+    items_data.append({'style': 2, 'coords': [coord() for _ in range(4)]})
+    items_data.append({'style': 3, 'coords': [coord() for _ in range(4)]})
+    items_data.append({'style': 4, 'coords': [coord(), coord()], 'image_id': 7, 'fill_image': fill_image('red')})
+    items_data.append({'style': 4, 'coords': [coord(), coord()], 'image_id': 8, 'fill_image': fill_image('green')})
+    images_data = [{'image_id': 3, 'path': 'photo.png', 'coords': [200, 200], 'transform': {'rotation': 90, 'flip': False}}]
+    return items_data, images_data
+
+
+
+@pytest.mark.parametrize('compression', sorted(COMPRESSIONS))
+@pytest.mark.parametrize('coordinate_step', [None, 0.01, 0.5])
+def test_round_trip(tmp_path, compression, coordinate_step):
+    items_data, images_data = scene_data()
+    path = str(tmp_path / 'drawing.gdraw')
+    write_drawing(path, items_data, images_data, STYLES, compression, coordinate_step)
+    data = read_drawing(path)
+
+    assert data['styles'] == STYLES
+    assert data['images'] == images_data
+    assert len(data['drawings']) == len(items_data)
+    for written, read in zip(items_data, data['drawings']):
+        assert read['style'] == written['style']
+        assert read.get('fill_image') == written.get('fill_image')
+        assert len(read['coords']) == len(written['coords'])
+        if coordinate_step:
+            assert max(abs(a - b) for a, b in zip(read['coords'], written['coords'])) <= coordinate_step / 2 + 1e-9
+        else:
+            assert read['coords'] == written['coords']
+
+
+
+@pytest.mark.parametrize('compression', sorted(COMPRESSIONS))
+def test_truncated_file(tmp_path, compression):
+    items_data, images_data = scene_data()
+    path = tmp_path / 'drawing.gdraw'
+    write_drawing(str(path), items_data, images_data, STYLES, compression)
+    path.write_bytes(path.read_bytes()[:len(path.read_bytes()) // 2])
+
+    with pytest.raises(ValueError, match="truncated"):
+        read_drawing(str(path))
+
+
+
+def test_bad_magic(tmp_path):
+    path = tmp_path / 'drawing.gdraw'
+    path.write_bytes(b'{"drawings": [], "images": []}')
+    with pytest.raises(ValueError, match="isn't a drawing file"):
+        read_drawing(str(path))
+
+    path.write_bytes(b'GD')
+    with pytest.raises(ValueError, match="isn't a drawing file"):
+        read_drawing(str(path))
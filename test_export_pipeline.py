@@ -0,0 +1,47 @@
+import numpy as np
+from PIL import Image, ImageDraw
+from export_pipeline import PaletteCache
+
+
+def drawing() -> Image.Image:
+    image = Image.new('RGB', (300, 200), 'white')
+    draw = ImageDraw.Draw(image)
+    for index in range(20):
+        draw.line((10, 10 + index * 9, 290, 20 + index * 7), fill=(0, 0, 255 - index * 10), width=3)
+    return image
+
+
+
+def test_palette_reused_for_the_same_colors():
+    cache = PaletteCache()
+    image = drawing()
+    cache.quantize(image)
+    moved = Image.new('RGB', image.size, 'white')
+    moved.paste(image.crop((0, 0, 290, 200)), (10, 0))
+    quantized = cache.quantize(moved)
+
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert np.array_equal(np.asarray(quantized.convert('RGB')), np.asarray(moved))
+
+
+
+def test_thin_line_in_a_new_color_gets_a_new_palette():
+    cache = PaletteCache()
+    image = drawing()
+    cache.quantize(image)
+    ImageDraw.Draw(image).line((0, 101, 299, 101), fill=(255, 0, 0), width=2)
+    quantized = cache.quantize(image).convert('RGB')
+
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert quantized.getpixel((150, 101)) == (255, 0, 0)
+
+
+
+def test_close_new_color_gets_a_new_palette():
+    cache = PaletteCache()
+    image = drawing()
+    cache.quantize(image)
+    image.putpixel((5, 5), (1, 0, 0))
+    cache.quantize(image)
+
+    assert cache.misses == 2
@@ -0,0 +1,46 @@
+import os
+import stat
+import pytest
+from file_manager import FileManager
+
+
+def write_text(path: str) -> None:
+    with open(path, 'w') as file:
+        file.write('{}')
+
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="POSIX permissions")
+def test_new_file_mode_follows_umask(tmp_path):
+    path = str(tmp_path / 'drawing.json')
+    umask = os.umask(0o022)
+    try:
+        FileManager.replace_file(path, write_text)
+    finally:
+        os.umask(umask)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+
+
+
+@pytest.mark.skipif(os.name != 'posix', reason="POSIX permissions")
+def test_replaced_file_keeps_its_mode(tmp_path):
+    path = str(tmp_path / 'drawing.json')
+    write_text(path)
+    os.chmod(path, 0o664)
+    FileManager.replace_file(path, write_text)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o664
+
+
+
+def test_failed_write_keeps_the_old_file(tmp_path):
+    path = tmp_path / 'drawing.json'
+    path.write_text('old')
+
+    def fail(temporary_path: str) -> None:
+        write_text(temporary_path)
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        FileManager.replace_file(str(path), fail)
+    assert path.read_text() == 'old'
+    assert os.listdir(tmp_path) == ['drawing.json']
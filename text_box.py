@@ -1,25 +1,26 @@
-import tkinter as tk
-from tkinter import simpledialog, colorchooser, font, Canvas
-from typing import Dict, Tuple, List, Optional, Any
+from tkinter import simpledialog, colorchooser, font
+from typing import Tuple, List, Optional, Any
+from canvas import DrawingCanvas
+from font_picker import FamilySearch, FontPicker
+from font_resolver import font_resolver
 
 
 class TextBox:
     """
     A class that responsible of text box creation and modifying them.
     """
-    def __init__(self, canvas: Canvas, index_x: int=500, index_y: int=200, text: str="Text", font: Tuple=("Helvetica", 14), color: str="black"):
+    def __init__(self, canvas: DrawingCanvas, index_x: int=500, index_y: int=200, text: str="Text", font: Tuple=("Helvetica", 14), color: str="black"):
         """
         A constructor to the text box class.
         """
-        self.canvas = canvas
+        self.canvas = canvas.canvas
+        self.drawing_canvas = canvas
         self.x = index_x
         self.y = index_y
         self.text = text
         self.font = font
         self.color = color
-
-        self.text_styles: Dict[int, Dict[str, bool]] = {}
-        self.text_boxes: Dict[int, Dict[str, Any]] = {}
+        self.family_search: Optional[FamilySearch] = None
         
         
     def update_text(self, new_text: str) -> None:
@@ -58,6 +59,7 @@ class TextBox:
 
             if clicked_text:
                 self.canvas.itemconfig(clicked_text, fill=new_color)
+                self.drawing_canvas.index_item(clicked_text)
 
             else:
                 self.update_color(new_color)   
@@ -75,6 +77,7 @@ class TextBox:
                 font_attributes = self.text_font_sync(clicked_text)
                 font_attributes[1] = size
                 self.canvas.itemconfig(clicked_text, font=tuple(font_attributes))
+                self.drawing_canvas.index_item(clicked_text)
 
             else:
                 self.font = (self.font[0], size)
@@ -84,8 +87,8 @@ class TextBox:
 
     def create_text_box(self) -> None:
         """
-        This method creates a the id for new text box created.
-        Stores it in a dictionary.
+        This method creates a new text box,
+        and records it in the scene.
         """
         text_id = self.canvas.create_text(
         self.x, 
@@ -94,8 +97,7 @@ class TextBox:
         font=self.font, 
         fill=self.color, 
         tags=("movable", "erasable", "text_box"))
-        self.text_boxes[text_id] = {"text": self.text, "font": self.font, "fill": self.color}
-        self.text_styles[text_id] = {"bold": False, "italic": False}
+        self.drawing_canvas.index_item(text_id)
 
 
     
@@ -103,7 +105,7 @@ class TextBox:
         """
         This method will help to keep track on text's font attributes.
         """
-        font_attr_string = self.canvas.itemcget(clicked_text, "font")
+        font_attr_string = self.drawing_canvas.scene[clicked_text].style['font']
         font_attributes = font_attr_string.split()
         
         font_name_parts: List[str]= []
@@ -118,7 +120,7 @@ class TextBox:
             else:
                 font_name_parts.append(attr)
         
-        font_name = " ".join(font_name_parts)
+        font_name = " ".join(font_name_parts).strip("{}")
         
         size_index = font_attributes.index(str(font_size))
         styles = font_attributes[size_index + 1:]
@@ -130,18 +132,17 @@ class TextBox:
 
 
 
-    def text_font_sync(self, clicked_text: int) -> List[Any]:
+    def text_font_sync(self, clicked_text: int, toggled_style: Optional[str] =None) -> List[Any]:
         """
-        Making list of font attirbutes of text box.
+        Making list of font attirbutes of text box, with the toggled style (bold or italic) switched.
         """
         font_name, font_size, font_style_1, font_style_2 = self.split_text_font_attributes(clicked_text)
         font_attributes: List[Any] = [font_name, font_size]
 
-        if self.text_styles[clicked_text]["bold"]:
-            font_attributes.append("bold")
-
-        if self.text_styles[clicked_text]["italic"]:
-            font_attributes.append("italic")
+        styles = {font_style_1, font_style_2} ^ ({toggled_style} if toggled_style else set())
+        for style in ("bold", "italic"):
+            if style in styles:
+                font_attributes.append(style)
         
         return font_attributes
 
@@ -152,53 +153,34 @@ class TextBox:
         """
         This method changes the text's style to bold or italic.
         """
-        if clicked_text not in self.text_styles:
-            self.text_styles[clicked_text] = {"bold": False, "italic": False}
-
-        self.text_styles[clicked_text][style] = not self.text_styles[clicked_text][style]
-        font_attributes = self.text_font_sync(clicked_text)
+        font_attributes = self.text_font_sync(clicked_text, style)
 
         self.canvas.itemconfig(clicked_text, font=tuple(font_attributes))
+        self.drawing_canvas.index_item(clicked_text)
 
 
 
     def choose_font_family(self, clicked_text: Optional[int] =None) -> None:
         """
-        This method open window of scroll bar for font choosing.
+        This method opens the font picker for font choosing.
+        The families are listed by Tk once (and kept by the font resolver between sessions), and searched through a FamilySearch
+        that's kept for the next time the picker opens.
         """
-        self.font_window = tk.Toplevel(self.canvas)
-        self.font_window.title("Choose Font")
-        
-
-        self.font_listbox = tk.Listbox(self.font_window)
-        self.font_listbox.pack(side="right", fill="both", expand=True)
-
-        scrollbar = tk.Scrollbar(self.font_window, orient="vertical", command=self.font_listbox.yview)
-        scrollbar.pack(side="top", fill="y")
-        self.font_listbox.config(yscrollcommand=scrollbar.set)
+        if self.family_search is None:
+            self.family_search = FamilySearch(font_resolver.tk_families(lambda: font.families(self.canvas)))
+        self.font_picker = FontPicker(self.canvas, self.family_search, lambda family: self.update_font(family, clicked_text))
 
-        for family in font.families():
-            self.font_listbox.insert("end", family)
-        self.font_listbox.bind("<<ListboxSelect>>", lambda event: self.update_font(event, clicked_text))
 
 
-
-    def update_font(self, event=None, clicked_text: Optional[int] =None) -> None:
+    def update_font(self, family: str, clicked_text: Optional[int] =None) -> None:
         """
         This method updates the font attribute of the text.
         """
-        if not self.font_listbox.curselection():
-            return
-        
-        selected_font = self.font_listbox.get(self.font_listbox.curselection())
         if clicked_text:
             font_attributes = self.text_font_sync(clicked_text)
-            font_attributes[0] = selected_font
+            font_attributes[0] = family
             self.canvas.itemconfig(clicked_text, font=tuple(font_attributes))
+            self.drawing_canvas.index_item(clicked_text)
 
         else:
-            self.font = selected_font
-        self.font_window.destroy()
-
-    
-
+            self.font = (family,) + tuple(self.font[1:])
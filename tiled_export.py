@@ -0,0 +1,257 @@
+import math
+import multiprocessing
+import os
+import struct
+import tempfile
+import zlib
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, BinaryIO, Callable, Deque, Dict, List, Optional, Tuple
+import numpy as np
+from PIL import Image, ImageDraw
+from scene import SceneItem
+from scene_raster import ItemPainter
+from spatial_index import BBox
+
+
+SCREEN_DPI = 96
+EXPORT_TILE_SIZE = 512
+EXPORT_FORMATS = ('PNG', 'JPEG', 'GIF', 'WEBP')
+PNG_CHUNK = 2 ** 20
+
+worker_export: Optional['TiledExport'] = None
+
+
+
+def start_worker(export: 'TiledExport') -> None:
+    """
+    Keeps the export in a worker process of the pool; it's sent once to each worker, not with every band.
+    """
+    global worker_export
+    worker_export = export
+
+
+
+def render_worker_band(row: int) -> np.ndarray:
+    return worker_export.render_band(row)
+
+
+
+class PngStream:
+    """
+    Writes a PNG file row by row, so an image is encoded as it's rendered without ever being whole in memory.
+    Rows are filtered by the row above them ('up'), which suits drawings with large flat areas.
+    """
+    def __init__(self, file: BinaryIO, width: int, height: int, dpi: float) -> None:
+        """
+        A constructor of the PNG stream. Writes the header of an 8-bit RGB image.
+        """
+        self.file = file
+        self.width = width
+        self.compressor = zlib.compressobj(6)
+        self.pending: list = []
+        self.pending_size = 0
+        self.last_row = np.zeros((width, 3), dtype=np.uint8)
+
+        file.write(b'\x89PNG\r\n\x1a\n')
+        self.chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        pixels_per_meter = round(dpi / 0.0254)
+        self.chunk(b'pHYs', struct.pack('>IIB', pixels_per_meter, pixels_per_meter, 1))
+
+
+
+    def chunk(self, kind: bytes, data: bytes) -> None:
+        self.file.write(struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data)))
+
+
+
+    def write_rows(self, rows: np.ndarray) -> None:
+        """
+        Adds rows of RGB pixels (height x width x 3).
+        """
+        filtered = np.empty((len(rows), self.width * 3 + 1), dtype=np.uint8)
+        filtered[:, 0] = 2
+        filtered[:, 1:] = (rows - np.concatenate((self.last_row[None], rows[:-1]))).reshape(len(rows), -1)
+        self.last_row = rows[-1].copy()
+
+        self.pending.append(self.compressor.compress(filtered.tobytes()))
+        self.pending_size += len(self.pending[-1])
+        if self.pending_size >= PNG_CHUNK:
+            self.flush()
+
+
+
+    def flush(self) -> None:
+        data = b''.join(self.pending)
+        if data:
+            self.chunk(b'IDAT', data)
+        self.pending, self.pending_size = [], 0
+
+
+
+    def close(self) -> None:
+        self.pending.append(self.compressor.flush())
+        self.flush()
+        self.chunk(b'IEND', b'')
+
+
+
+class TiledExport:
+    """
+    Exports the whole drawing at a scale of the canvas (print sizes like 20000x20000), tile by tile.
+    Each tile draws only the items whose bounding boxes overlap it. The rows of tiles (bands) are rendered
+    in parallel by a pool of processes, at most two per process at a time, and handed in order to the encoder:
+    PNG is streamed to the file; JPEG is encoded by PIL from a raster mapped on a temporary file (GIF and WebP from the image in memory).
+    So the memory it takes grows with the width of the drawing and the tile size, not with the whole output.
+    The state of the drawing is taken on the main thread (take_snapshot); the rest touches neither Tk nor the scene.
+    """
+    def __init__(self, scale: float =1.0, dpi: Optional[float] =None, tile_size: int =EXPORT_TILE_SIZE, workers: Optional[int] =None) -> None:
+        """
+        A constructor of the tiled export. A DPI sets the scale (the canvas is taken to be at 96 DPI)
+        and is written to the file; otherwise the DPI is the scale's.
+        """
+        self.scale = dpi / SCREEN_DPI if dpi else scale
+        self.dpi = dpi or SCREEN_DPI * scale
+        self.tile_size = tile_size
+        self.workers = workers or os.cpu_count() or 1
+
+        self.records: list = []
+        self.bboxes = np.zeros((0, 4))
+        self.colors: Dict[str, Tuple[int, int, int]] = {}
+        self.background = (255, 255, 255)
+        self.size = (1, 1)
+        self.painter: Optional[ItemPainter] = None
+
+
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = dict(self.__dict__)
+        state['painter'] = None
+        return state
+
+
+
+    def take_snapshot(self, drawing_canvas) -> None:
+        """
+        Takes on the main thread what the export needs: snapshots of the records from the bottom of the stack to the top,
+        their bounding boxes, their colors resolved by Tk, the background and the size of the canvas.
+        """
+        scene, scene_raster, canvas = drawing_canvas.scene, drawing_canvas.scene_raster, drawing_canvas.canvas
+        records = scene.snapshot()
+        self.set_drawing(records, [scene.index.bboxes[record.id] for record in records], scene_raster.color,
+                         canvas['background'], (canvas.winfo_width(), canvas.winfo_height()))
+
+
+
+    def set_drawing(self, records: List[SceneItem], bboxes: List[BBox], color: Callable[[str], Tuple[int, int, int]],
+                    background: str, canvas_size: Tuple[int, int]) -> None:
+        """
+        Sets the drawing to export: its records from the bottom of the stack to the top, their bounding boxes,
+        a function that resolves color names, the background color and the size of the canvas.
+        """
+        self.records = records
+        self.bboxes = np.array(bboxes, dtype=float).reshape(-1, 4)
+
+        for style in {id(record.style): record.style for record in records}.values():
+            for option in ('fill', 'outline'):
+                if style.get(option):
+                    self.colors[style[option]] = color(style[option])
+        self.background = color(background)
+
+        width, height = max(1, canvas_size[0]), max(1, canvas_size[1])
+        self.size = (max(1, math.ceil(width * self.scale)), max(1, math.ceil(height * self.scale)))
+
+
+
+    def band_count(self) -> int:
+        return -(-self.size[1] // self.tile_size)
+
+
+
+    def render_band(self, row: int) -> np.ndarray:
+        """
+        Renders a row of tiles and returns its RGB pixels. Runs in a worker process.
+        The items of the band are picked first, then the items of each tile among them, in stacking order.
+        """
+        if self.painter is None:
+            self.painter = ItemPainter(self.colors, self.scale)
+
+        width, tile_size, scale = self.size[0], self.tile_size, self.scale
+        top, bottom = row * tile_size, min(self.size[1], (row + 1) * tile_size)
+        band = np.empty((bottom - top, width, 3), dtype=np.uint8)
+
+        bboxes = self.bboxes * scale
+        in_band = np.flatnonzero((bboxes[:, 1] <= bottom) & (bboxes[:, 3] >= top))
+        band_bboxes = bboxes[in_band]
+
+        for left in range(0, width, tile_size):
+            right = min(width, left + tile_size)
+            tile = Image.new('RGB', (right - left, bottom - top), self.background)
+            draw = ImageDraw.Draw(tile)
+            for index in in_band[(band_bboxes[:, 0] <= right) & (band_bboxes[:, 2] >= left)]:
+                self.painter.paint(tile, draw, self.records[index], left, top)
+            band[:, left:right] = np.asarray(tile)
+
+        return band
+
+
+
+    def bands(self, progress: Optional[Callable[[float], None]] =None):
+        """
+        Yields the rendered bands from the top down, rendering the ones after them meanwhile.
+        Uses a pool of processes (started fresh, so they don't inherit Tk), or this thread when there's one worker.
+        """
+        count = self.band_count()
+        if self.workers <= 1:
+            for row in range(count):
+                yield self.render_band(row)
+                if progress:
+                    progress((row + 1) / count)
+            return
+
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(self.workers, mp_context=context, initializer=start_worker, initargs=(self,)) as pool:
+            pending: Deque[Future] = deque()
+            next_row = done = 0
+            try:
+                while done < count:
+                    while next_row < count and len(pending) < 2 * self.workers:
+                        pending.append(pool.submit(render_worker_band, next_row))
+                        next_row += 1
+                    yield pending.popleft().result()
+                    done += 1
+                    if progress:
+                        progress(done / count)
+            finally:
+                pool.shutdown(wait=True, cancel_futures=True)
+
+
+
+    def write(self, file_path: str, export_format: str, progress: Optional[Callable[[float], None]] =None) -> None:
+        """
+        Renders the drawing into an image file in the format (PNG, JPEG, GIF or WebP).
+        GIF and WebP are encoded from the whole image in memory (GIF's palette is made for the whole image).
+        """
+        width, height = self.size
+        if export_format == 'PNG':
+            with open(file_path, 'wb') as file:
+                stream = PngStream(file, width, height, self.dpi)
+                for band in self.bands(progress):
+                    stream.write_rows(band)
+                stream.close()
+            return
+
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format: {export_format}")
+
+        with tempfile.TemporaryFile() as raster_file:
+            raster = np.memmap(raster_file, dtype=np.uint8, mode='w+', shape=(height, width, 4))
+            top = 0
+            for band in self.bands(progress):
+                raster[top:top + len(band), :, :3] = band
+                top += len(band)
+            image = Image.frombuffer('RGBX', (width, height), raster, 'raw', 'RGBX', 0, 1)
+            if export_format != 'JPEG':
+                image = image.convert('RGB')
+            image.save(file_path, format=export_format, dpi=(self.dpi, self.dpi))
+            del image, raster